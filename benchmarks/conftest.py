@@ -0,0 +1,46 @@
+from pathlib import Path
+
+import pytest
+from pytest_benchmark.utils import parse_compare_fail
+
+import goals.goals_utils as Utils
+from goals.goals_model import Model
+
+## Shared fixtures for performance benchmarks. Benchmarks run against the
+## example workbook and the Malawi 2023 workbook so that regressions show up
+## for both small and realistic inputs.
+##
+## Baselines are saved under benchmarks/baselines, one directory per machine
+## and Python version. When comparing against a baseline (--benchmark-compare),
+## a benchmark fails if its median time regresses by more than COMPARE_FAIL
+## unless --benchmark-compare-fail is given explicitly.
+
+COMPARE_FAIL = ['median:25%']
+
+INPUTS = Path(__file__).parent.parent / "inputs"
+
+WORKBOOKS = {
+    'example'  : INPUTS / "example-inputs.xlsx",
+    'mwi-2023' : INPUTS / "mwi-2023-inputs.xlsx",
+}
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_configure(config):
+    if config.getoption('benchmark_compare', None) and not config.getoption('benchmark_compare_fail', None):
+        config.option.benchmark_compare_fail = [parse_compare_fail(check) for check in COMPARE_FAIL]
+
+@pytest.fixture(scope="session", params=list(WORKBOOKS.keys()))
+def workbook(request):
+    return WORKBOOKS[request.param]
+
+@pytest.fixture(scope="session")
+def raw_inputs(workbook):
+    return Utils.xlsx_load_inputs(workbook)
+
+@pytest.fixture(scope="session")
+def model(raw_inputs):
+    """! A projected model. Benchmarks that change inputs must restore them."""
+    goals = Model()
+    goals._init_from_inputs(raw_inputs)
+    goals.project(goals.year_final)
+    return goals
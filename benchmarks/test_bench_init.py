@@ -0,0 +1,14 @@
+from goals.goals_model import Model
+
+## Benchmarks for reading inputs and initializing models
+
+def test_init_from_xlsx(benchmark, workbook):
+    benchmark.pedantic(lambda: Model().init_from_xlsx(workbook), rounds=3, iterations=1)
+
+def test_init_from_inputs(benchmark, raw_inputs):
+    benchmark.pedantic(lambda: Model()._init_from_inputs(raw_inputs), rounds=5, iterations=1)
+
+def test_reinit_from_inputs(benchmark, raw_inputs):
+    model = Model()
+    model._init_from_inputs(raw_inputs)
+    benchmark.pedantic(lambda: model.reinit_from_inputs(raw_inputs), rounds=5, iterations=1)
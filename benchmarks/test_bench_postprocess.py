@@ -0,0 +1,37 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+import goals.goals_indicators as Indicators
+import goals.goals_observation as Observation
+from goals.goals_results import Results
+
+## Benchmarks for summarizing projections and evaluating the likelihood
+
+def test_bigpop(benchmark, model):
+    # A new Results object each round, so that no reductions are cached
+    benchmark(lambda: Results(model).bigpop())
+
+def test_indicators(benchmark, model):
+    benchmark(lambda: Indicators.calc_indicators(model))
+
+def test_fill_hivprev_template(benchmark, model):
+    pd = pytest.importorskip("pandas")
+    template = pd.read_csv(Path(__file__).parent.parent / "inputs" / "mwi-2023-hiv-prev.csv")
+    plan = Observation.PrevalencePlan(template, model.year_first)
+    benchmark(plan.fill, model, template)
+
+@pytest.fixture(scope="module")
+def fitter():
+    pytest.importorskip("percussion")
+    sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+    from calibrate import GoalsFitter
+    inputs = Path(__file__).parent.parent / "inputs"
+    return GoalsFitter(str(inputs / "mwi-2023-inputs.xlsx"), str(inputs / "mwi-2023-anc-prev.csv"),
+                       str(inputs / "mwi-2023-hiv-prev.csv"), None)
+
+def test_fitter_posterior(benchmark, fitter):
+    params = np.array([fitter._pardat[key].initial_value for key in fitter._par_keys])
+    benchmark.pedantic(fitter.posterior, args=(params,), setup=lambda: fitter.hivsim.invalidate(-1), rounds=5, iterations=1)
@@ -0,0 +1,17 @@
+## Benchmarks for projection. The model fixture is projected through its
+## final year, so each benchmark invalidates the years it needs to recalculate.
+
+def test_project_full(benchmark, model):
+    benchmark.pedantic(model.project, args=(model.year_final,), setup=lambda: model.invalidate(-1), rounds=5, iterations=1)
+
+def test_project_partial(benchmark, model):
+    year_stop = model.year_first + 30
+    benchmark.pedantic(model.project, args=(year_stop,), setup=lambda: model.invalidate(-1), rounds=5, iterations=1)
+    model.project(model.year_final)
+
+def test_invalidate_reproject(benchmark, model):
+    year = model.year_final - 20
+    def reproject():
+        model.invalidate(year)
+        model.project(model.year_final)
+    benchmark.pedantic(reproject, rounds=5, iterations=1)
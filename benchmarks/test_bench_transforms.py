@@ -0,0 +1,23 @@
+import goals.goals_model as Goals
+
+## Benchmarks for transformations of raw inputs into calculation engine inputs
+
+def test_calc_partner_rates(benchmark, model):
+    benchmark(model.calc_partner_rates, model.partner_time_trend, model.partner_age_params, model.partner_pop_ratios)
+
+def test_calc_partner_prefs(benchmark, model, raw_inputs):
+    # Clear cached preferences so that every round calculates them
+    def clear():
+        Goals.calc_partner_prefs_cached.cache_clear()
+        Goals.calc_oppo_kernel.cache_clear()
+        Goals.calc_same_kernel.cache_clear()
+    benchmark.pedantic(model.calc_partner_prefs, args=(raw_inputs['age_prefs'],), setup=clear, rounds=20, iterations=1)
+
+def test_calc_pop_assort(benchmark, model, raw_inputs):
+    benchmark(model.calc_pop_assort, raw_inputs['pop_prefs'])
+
+def test_calc_mix_levels(benchmark, model, raw_inputs):
+    benchmark(model.calc_mix_levels, raw_inputs['mix_levels'])
+
+def test_calc_sti_prev(benchmark, model, raw_inputs):
+    benchmark(model.calc_sti_prev, raw_inputs['sti_trend'], raw_inputs['sti_age'])
@@ -0,0 +1,41 @@
+import argparse
+import time
+from calibrate import GoalsFitter
+
+## Compare direct Nelder-Mead calibration with emulator-assisted calibration
+## (GoalsFitter.calibrate_emulator). Reports the projections each needs, the
+## projections the emulator saves, and how far the emulator's fit is from the
+## direct fit in log posterior and in each parameter value.
+
+def run(fitter, func, **kwargs):
+    fitter.hivsim.invalidate(-1) # start every run from an unprojected model
+    time_start = time.time()
+    _, optres = func(**kwargs)
+    return optres, time.time() - time_start
+
+def main(xlsx_name, anc_file, hiv_file, deaths_file, max_evals, polish, seed):
+    fitter = GoalsFitter(xlsx_name, anc_file, hiv_file, deaths_file)
+    print("%d fitted parameters: %s" % (len(fitter._par_keys), ", ".join(fitter._par_keys)))
+
+    direct, direct_time = run(fitter, fitter.calibrate, method='Nelder-Mead')
+    emulated, emulated_time = run(fitter, fitter.calibrate_emulator, max_evals=max_evals, polish=polish, seed=seed)
+
+    print("%-12s %8s %12s %10s" % ('method', 'projs', 'log post', 'seconds'))
+    print("%-12s %8d %12.2f %10.1f" % ('direct', direct.nfev, -direct.fun, direct_time))
+    print("%-12s %8d %12.2f %10.1f" % ('emulator', emulated.nfev, -emulated.fun, emulated_time))
+    print("projections saved: %d (%0.1f%%)" % (direct.nfev - emulated.nfev, 100.0 * (direct.nfev - emulated.nfev) / direct.nfev))
+    print("log posterior difference (emulator - direct): %0.3f" % (direct.fun - emulated.fun))
+    for key, x_direct, x_emulated in zip(fitter._par_keys, direct.x, emulated.x):
+        print("  %-24s %12.6g %12.6g" % (key, x_direct, x_emulated))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('input_xlsx', nargs='?', default="inputs/mwi-2023-inputs.xlsx", help="Excel model input workbook")
+    parser.add_argument("--ancprev",   default="inputs/mwi-2023-anc-prev.csv", help="CSV file with HIV prevalence from ANC surveillance")
+    parser.add_argument("--svyprev",   default="inputs/mwi-2023-hiv-prev.csv", help="CSV file with HIV prevalence from surveys")
+    parser.add_argument("--alldeaths", help="CSV file with all-cause deaths counts")
+    parser.add_argument('--max-evals', default=200, type=int, help="Maximum number of projections for emulator-assisted calibration")
+    parser.add_argument('--polish',    action='store_true', help="Refine the emulator's best candidate with Nelder-Mead")
+    parser.add_argument('--seed',      default=0, type=int, help="Random number generator seed")
+    args = parser.parse_args()
+    main(args.input_xlsx, args.ancprev, args.svyprev, args.alldeaths, args.max_evals, args.polish, args.seed)
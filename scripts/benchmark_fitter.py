@@ -0,0 +1,51 @@
+import argparse
+import timeit
+import numpy as np
+import goals.goals_const as CONST
+from calibrate import GoalsFitter
+
+## Micro-benchmark of the per-evaluation overhead of GoalsFitter.project,
+## excluding the projection itself. Compares three ways to pass fitted
+## parameter values to the model:
+##   repush: set values then re-send every input that any fitted parameter can
+##           change, as GoalsFitter.project did before parameter bindings
+##   sync:   set values then check every tracked input for changes
+##   bound:  set values then check only the inputs bound to fitted parameters
+
+def repush(fitter, params):
+    hivsim = fitter.hivsim
+    fitter.set_parameters(params)
+    hivsim._proj.init_transmission(*[hivsim.epi_pars[key] for key in CONST.EPI_TRANSMISSION])
+    hivsim._proj.init_epidemic_seed(hivsim.epi_pars[CONST.EPI_INITIAL_YEAR] - hivsim.year_first, hivsim.epi_pars[CONST.EPI_INITIAL_PREV])
+    hivsim.partner_rate[:] = hivsim.calc_partner_rates(hivsim.partner_time_trend, hivsim.partner_age_params, hivsim.partner_pop_ratios)
+    frr_age = hivsim.hiv_frr['age'] * hivsim.hiv_frr['laf']
+    frr_art = hivsim.hiv_frr['art'] * hivsim.hiv_frr['laf']
+    hivsim._proj.init_hiv_fertility(frr_age[fitter.year_range,:], hivsim.hiv_frr['cd4'], frr_art)
+    fitter.set_ancdat_parameters()
+
+def sync(fitter, params):
+    fitter.set_parameters(params)
+    fitter.hivsim.sync_inputs()
+
+def bound(fitter, params):
+    fitter.set_parameters(params)
+    fitter.hivsim.sync_inputs(fitter._sync_inputs)
+
+def main(xlsx_name, number):
+    fitter = GoalsFitter(xlsx_name, None, None, None)
+    p_init = np.array([fitter._pardat[key].initial_value for key in fitter._par_keys])
+    rng = np.random.default_rng(0)
+    p_sets = [p_init * rng.uniform(0.95, 1.05, len(p_init)) for k in range(number)]
+
+    print("%d fitted parameters: %s" % (len(fitter._par_keys), ", ".join(fitter._par_keys)))
+    for name, func in [('repush', repush), ('sync', sync), ('bound', bound)]:
+        p_iter = iter(p_sets)
+        elapsed = timeit.timeit(lambda func=func, p_iter=p_iter: func(fitter, next(p_iter)), number=number)
+        print("%-8s %8.1f us/evaluation" % (name, 1e6 * elapsed / number))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('input_xlsx', nargs='?', default="inputs/mwi-2023-inputs.xlsx", help="Excel model input workbook")
+    parser.add_argument('--number', default=1000, type=int, help="Number of evaluations to time")
+    args = parser.parse_args()
+    main(args.input_xlsx, args.number)
@@ -0,0 +1,41 @@
+import argparse
+import time
+from calibrate import GoalsFitter, FIT_BINDINGS
+
+## Compare calibration with Nelder-Mead to L-BFGS-B with finite-difference
+## gradients (GoalsFitter.posterior_gradient). Each run starts from the
+## initial values in the FittingInputs tab and reports the number of
+## objective evaluations, the number of model projections they required, the
+## final log posterior and wall-clock time to convergence. Each gradient
+## evaluation projects the model once plus up to two partial projections per
+## fitted parameter that changes model inputs.
+
+def run(fitter, name, **kwargs):
+    fitter.hivsim.invalidate(-1) # start every run from an unprojected model
+    time_start = time.time()
+    _, optres = fitter.calibrate(**kwargs)
+    elapsed = time.time() - time_start
+    if kwargs.get('gradient', False):
+        num_model = sum([1 for key in fitter._par_keys if FIT_BINDINGS[key][1]])
+        projections = optres.nfev * (1 + 2 * num_model)
+    else:
+        projections = optres.nfev
+    print("%-12s %6d %8d %12.2f %10.1f %s" % (name, optres.nfev, projections, -optres.fun, elapsed, optres.success))
+
+def main(xlsx_name, anc_file, hiv_file, deaths_file, maxiter, threads):
+    fitter = GoalsFitter(xlsx_name, anc_file, hiv_file, deaths_file)
+    print("%d fitted parameters: %s" % (len(fitter._par_keys), ", ".join(fitter._par_keys)))
+    print("%-12s %6s %8s %12s %10s %s" % ('method', 'evals', 'projs', 'log post', 'seconds', 'converged'))
+    run(fitter, 'Nelder-Mead', method='Nelder-Mead', maxiter=maxiter)
+    run(fitter, 'L-BFGS-B', method='L-BFGS-B', maxiter=maxiter, gradient=True, threads=threads)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('input_xlsx', nargs='?', default="inputs/mwi-2023-inputs.xlsx", help="Excel model input workbook")
+    parser.add_argument("--ancprev",   default="inputs/mwi-2023-anc-prev.csv", help="CSV file with HIV prevalence from ANC surveillance")
+    parser.add_argument("--svyprev",   default="inputs/mwi-2023-hiv-prev.csv", help="CSV file with HIV prevalence from surveys")
+    parser.add_argument("--alldeaths", help="CSV file with all-cause deaths counts")
+    parser.add_argument('--maxiter',   type=int, help="Maximum number of optimization iterations to perform")
+    parser.add_argument('--threads',   type=int, help="Threads used to project perturbed models. Defaults to the number of CPUs")
+    args = parser.parse_args()
+    main(args.input_xlsx, args.ancprev, args.svyprev, args.alldeaths, args.maxiter, args.threads)
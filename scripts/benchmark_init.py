@@ -0,0 +1,57 @@
+import argparse
+import timeit
+import numpy as np
+import goals.goals_utils as Utils
+from goals.goals_model import Model
+
+## Micro-benchmark of the cost of passing inputs to the calculation engine.
+## Times each calculation engine init method that calibration and scenario
+## sweeps may call repeatedly, then compares initializing a new model against
+## re-initializing an existing one (see Model.reinit_from_inputs).
+
+def engine_calls(model, inputs):
+    """! Return (name, call) pairs for engine init methods, called with the model's current inputs"""
+    year_range = range(0, model.year_final - model.year_first + 1)
+    proj = model._proj
+    frr_age = (model.hiv_frr['age'] * model.hiv_frr['laf'])[year_range,:]
+    frr_art = model.hiv_frr['art'] * model.hiv_frr['laf']
+    calls = [('init_male_circumcision_uptake', lambda: proj.init_male_circumcision_uptake(inputs['uptake_mc'][year_range,:])),
+             ('init_hiv_fertility',            lambda: proj.init_hiv_fertility(frr_age, model.hiv_frr['cd4'], frr_art))]
+    if not model._direct_incidence:
+        condom_freq = np.ascontiguousarray(model.condom_freq[year_range,:])
+        calls += [('init_sti_prev',      lambda: proj.init_sti_prev(model.sti_prev)),
+                  ('init_condom_freq',   lambda: proj.init_condom_freq(condom_freq)),
+                  ('init_mixing_matrix', lambda: proj.init_mixing_matrix(model.mix_levels)),
+                  ('init_sex_acts',      lambda: proj.init_sex_acts(model.sex_acts))]
+    return calls
+
+def main(xlsx_name, number):
+    inputs = Utils.xlsx_load_inputs(xlsx_name)
+    model = Model()
+    model._init_from_inputs(inputs)
+
+    print("Calculation engine init methods")
+    for name, call in engine_calls(model, inputs):
+        elapsed = timeit.timeit(call, number=number)
+        print("%-30s %10.1f us/call" % (name, 1e6 * elapsed / number))
+
+    ## Alternate between two input sets so that every re-initialization has changes to pass
+    other = dict(inputs)
+    other['uptake_mc'] = 0.5 * inputs['uptake_mc']
+    input_sets = [inputs, other]
+    reps = max(1, number // 100)
+
+    print("Model initialization")
+    k = iter(range(2 * reps))
+    elapsed = timeit.timeit(lambda: Model()._init_from_inputs(input_sets[next(k) % 2]), number=reps)
+    print("%-30s %10.1f ms/call" % ('new model', 1e3 * elapsed / reps))
+    k = iter(range(2 * reps))
+    elapsed = timeit.timeit(lambda: model.reinit_from_inputs(input_sets[next(k) % 2]), number=reps)
+    print("%-30s %10.1f ms/call" % ('reinit_from_inputs', 1e3 * elapsed / reps))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('input_xlsx', nargs='?', default="inputs/example-inputs.xlsx", help="Excel model input workbook")
+    parser.add_argument('--number', default=1000, type=int, help="Number of calls to time per method")
+    args = parser.parse_args()
+    main(args.input_xlsx, args.number)
@@ -1,74 +1,43 @@
+import argparse
 import os
-import pandas as pd
 import sys
 import time
+import goals.goals_indicators as Indicators
+import goals.goals_io as Io
 from goals.goals_model import Model
 
-## Convert a numpy ndarray to a long data frame
-## @param array a numpy ndarray
-## @param names a list of names, one per dimension of ndarray
-## @return a long data frame with one column per dimension of ndarray
-def array2frame(array, names):
-    if len(names) > 1:
-        array_index = pd.MultiIndex.from_product([range(s) for s in array.shape], names=names)
-        array_frame = pd.DataFrame({'Value' : array.flatten()}, index=array_index)['Value']
-    else:
-        array_index = pd.Index(range(array.shape[0]), name=names[0])
-        array_frame = pd.DataFrame({'Value' : array}, index=array_index)['Value']
-    return array_frame
-
-def main(xlsx_name, data_path):
+def main(xlsx_name, data_path, fmt='parquet'):
     """! Main program entry point
-    @param xlsx_name Excel file with Goals ARM inputs
-    @param data_path Path to write output CSV files
+    @param xlsx_name Excel file with Goals ARM inputs, or a snapshot compiled from one (see scripts/snapshot.py)
+    @param data_path Path to write output files
+    @param fmt output file format (see goals_io.write_outputs)
     """
     t0 = time.time()
     model = Model()
     t1 = time.time()
-    model.init_from_xlsx(xlsx_name)
+    if xlsx_name.endswith(".npz"):
+        model.init_from_snapshot(xlsx_name)
+    else:
+        model.init_from_xlsx(xlsx_name)
     t2 = time.time()
     model.project(model.year_final)
     t3 = time.time()
 
-    birth_all_frame = array2frame(model.births, ['Year', 'Sex'])
-    birth_exp_frame = array2frame(model.births_exposed, ['Year'])
-    pop_child_neg = array2frame(model.pop_child_neg, ['Year', 'Sex', 'Age'])
-    pop_child_hiv = array2frame(model.pop_child_hiv, ['Year', 'Sex', 'Age', 'CD4', 'ART'])
-    pop_adult_neg = array2frame(model.pop_adult_neg, ['Year', 'Sex', 'Age', 'Risk'])
-    pop_adult_hiv = array2frame(model.pop_adult_hiv, ['Year', 'Sex', 'Age', 'Risk', 'CD4', 'ART'])
-    deaths_child_neg = array2frame(model.deaths_child_neg, ['Year', 'Sex', 'Age'])
-    deaths_child_hiv = array2frame(model.deaths_child_hiv, ['Year', 'Sex', 'Age', 'CD4', 'ART'])
-    deaths_adult_neg = array2frame(model.deaths_adult_neg, ['Year', 'Sex', 'Age', 'Risk'])
-    deaths_adult_hiv = array2frame(model.deaths_adult_hiv, ['Year', 'Sex', 'Age', 'Risk', 'CD4', 'ART'])
-    new_hiv = array2frame(model.new_infections, ['Year', 'Sex', 'Age', 'Risk'])
+    indicators = Indicators.calc_indicators(model)
     t4 = time.time()
 
-    birth_all_frame.to_csv(data_path + "/births.csv")
-    birth_exp_frame.to_csv(data_path + "/births-exposed.csv")
-    pop_child_neg.to_csv(data_path + "/child-neg.csv")
-    pop_child_hiv.to_csv(data_path + "/child-hiv.csv")
-    pop_adult_neg.to_csv(data_path + "/adult-neg.csv")
-    pop_adult_hiv.to_csv(data_path + "/adult-hiv.csv")
-    deaths_child_neg.to_csv(data_path + "/deaths-child-neg.csv")
-    deaths_child_hiv.to_csv(data_path + "/deaths-child-hiv.csv")
-    deaths_adult_neg.to_csv(data_path + "/deaths-adult-neg.csv")
-    deaths_adult_hiv.to_csv(data_path + "/deaths-adult-hiv.csv")
-    new_hiv.to_csv(data_path + "/new-hiv.csv")
+    files = Io.write_outputs(model, data_path, fmt) + Io.write_indicators(indicators, data_path, fmt)
     t5 = time.time()
 
-    sys.stdout.write("Construct\t%0.2fs\nInitialize\t%0.2fs\nProject\t\t%0.2fs\nAnalysis\t%0.2fs\nCSV write\t%0.2fs\n" % (t1-t0, t2-t1, t3-t2, t4-t3, t5-t4))
+    sys.stdout.write("Construct\t%0.2fs\nInitialize\t%0.2fs\nProject\t\t%0.2fs\nIndicators\t%0.2fs\nWrite %s\t%0.2fs (%d files)\n" % (t1-t0, t2-t1, t3-t2, t4-t3, fmt, t5-t4, len(files)))
 
     pass
 
 if __name__ == "__main__":
     sys.stderr.write("Process %d\n" % (os.getpid()))
-    if len(sys.argv) == 1:
-        xlsx_name = "inputs/example-inputs.xlsx"
-        data_path = "."
-        main(xlsx_name, data_path)
-    elif len(sys.argv) < 3:
-        sys.stderr.write("USAGE: %s <input_param>.xlsx <output_path>" % (sys.argv[0]))
-    else:
-        xlsx_name = sys.argv[1]
-        data_path = sys.argv[2]
-        main(xlsx_name, data_path)
+    parser = argparse.ArgumentParser()
+    parser.add_argument('input_xlsx', nargs='?', default="inputs/example-inputs.xlsx", help="Excel model input workbook or snapshot")
+    parser.add_argument('output_path', nargs='?', default=".", help="Path to write output files")
+    parser.add_argument('--format', default='parquet', choices=list(Io.FORMATS.keys()), help="Output file format. CSV is much slower")
+    args = parser.parse_args()
+    main(args.input_xlsx, args.output_path, args.format)
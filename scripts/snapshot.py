@@ -0,0 +1,24 @@
+import sys
+import time
+import goals.goals_snapshot as Snapshot
+
+## Compile an Excel input workbook into a binary snapshot that Model.init_from_snapshot
+## can load without parsing Excel.
+
+def main(xlsx_name, snap_name):
+    """! Main program entry point
+    @param xlsx_name Excel file with Goals ARM inputs
+    @param snap_name Snapshot file to create
+    """
+    t0 = time.time()
+    Snapshot.compile_snapshot(xlsx_name, snap_name)
+    t1 = time.time()
+    sys.stdout.write("Compiled %s to %s in %0.2fs\n" % (xlsx_name, snap_name, t1 - t0))
+
+if __name__ == "__main__":
+    if len(sys.argv) == 2:
+        main(sys.argv[1], Snapshot.snapshot_name(sys.argv[1]))
+    elif len(sys.argv) == 3:
+        main(sys.argv[1], sys.argv[2])
+    else:
+        sys.stderr.write("USAGE: %s <input_param>.xlsx [<snapshot>.npz]" % (sys.argv[0]))
@@ -0,0 +1,142 @@
+import collections
+import hashlib
+import io
+import pathlib
+import sqlite3
+import threading
+import numpy as np
+
+import goals_proj as Goals
+
+## Evaluation cache for calibration. Optimizers and samplers often evaluate the
+## same parameter vector more than once (e.g., Nelder-Mead shrink steps, or
+## re-evaluating the optimum after a fit). EvaluationCache stores the values
+## calculated for each parameter vector, such as likelihood components, with an
+## optional compact summary of model outputs, keyed by a hash of the vector and
+## a fingerprint of the inputs it was calculated from.
+##
+## Recent entries are kept in memory with least-recently-used eviction. An
+## optional SQLite file keeps every entry on disk. The file can be shared by
+## processes on one machine, so workers in a process pool share evaluations, and
+## a restarted fit finds the evaluations of earlier runs. Deterministic
+## optimizers restarted from the same initial values replay their earlier
+## evaluations from the cache without projecting the model.
+
+## Change this when the layout of cached values changes
+CACHE_VERSION = 1
+
+def fingerprint(*file_names):
+    """! Hash the contents of input files. Use this to key cache entries to the inputs they were calculated from
+    @param file_names file names. None entries are allowed (e.g., for data that is not used)
+    @return a hexadecimal digest
+    """
+    digest = hashlib.sha256()
+    for file_name in file_names:
+        digest.update(b'\0')
+        if file_name is not None:
+            with open(file_name, 'rb') as fh:
+                for chunk in iter(lambda: fh.read(1 << 20), b''):
+                    digest.update(chunk)
+    return digest.hexdigest()
+
+def code_fingerprint(*file_names):
+    """! Hash the code that cached values are calculated with: CACHE_VERSION, the goals package
+    sources and the calculation engine module. Use this with fingerprint so that entries calculated
+    by other versions of the code (e.g., after an update or an engine built from another GoalsARM tag)
+    are not returned
+    @param file_names other source files that values depend on (e.g., the calling script)
+    @return a hexadecimal digest
+    """
+    sources = sorted(pathlib.Path(__file__).parent.glob('*.py'))
+    return fingerprint(*sources, Goals.__file__, *file_names) + '-%d' % (CACHE_VERSION)
+
+class EvaluationCache:
+    """! Bounded cache of values calculated from parameter vectors. The cache is thread-safe."""
+
+    def __init__(self, capacity=4096, path=None, fingerprint=''):
+        """! Create a cache
+        @param capacity maximum number of entries kept in memory
+        @param path optional SQLite database file that keeps every entry on disk. Created if it does not exist
+        @param fingerprint a string that identifies the inputs values are calculated from (see fingerprint).
+        Entries stored with other fingerprints are not returned
+        """
+        self.capacity = capacity
+        self.path = path
+        self._prefix = fingerprint.encode()
+        self._memory = collections.OrderedDict() # key -> (values, summary)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._db = None
+        if path is not None:
+            self._db = sqlite3.connect(path, timeout=60.0, check_same_thread=False)
+            self._db.execute('PRAGMA journal_mode=WAL') # lets processes read while another writes
+            self._db.execute('CREATE TABLE IF NOT EXISTS evaluations (key TEXT PRIMARY KEY, params BLOB, vals BLOB, summary BLOB)')
+            self._db.commit()
+
+    def __len__(self):
+        return len(self._memory)
+
+    def close(self):
+        """! Close the database file, if any"""
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def key(self, params):
+        """! Hash a parameter vector and the cache's fingerprint"""
+        return hashlib.sha256(self._prefix + np.ascontiguousarray(params, dtype=np.float64).tobytes()).hexdigest()
+
+    def get(self, params):
+        """! Look up a parameter vector
+        @return None if the vector has not been evaluated. Otherwise, a tuple of the stored
+        values as a float array and the stored summary (a dict of arrays, or None)
+        """
+        key = self.key(params)
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+            elif self._db is not None:
+                row = self._db.execute('SELECT vals, summary FROM evaluations WHERE key=?', (key,)).fetchone()
+                if row is not None:
+                    entry = (np.frombuffer(row[0], dtype=np.float64), _unpack(row[1]))
+                    self._remember(key, entry)
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return entry
+
+    def put(self, params, values, summary=None):
+        """! Store values for a parameter vector, replacing any earlier entry
+        @param values a sequence of numbers (e.g., log-likelihood components)
+        @param summary an optional dict from names to arrays (e.g., indicator summaries)
+        """
+        key = self.key(params)
+        entry = (np.array(values, dtype=np.float64), summary)
+        with self._lock:
+            self._remember(key, entry)
+            if self._db is not None:
+                self._db.execute('INSERT OR REPLACE INTO evaluations VALUES (?, ?, ?, ?)',
+                                 (key, np.asarray(params, dtype=np.float64).tobytes(), entry[0].tobytes(), _pack(summary)))
+                self._db.commit()
+
+    def _remember(self, key, entry):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.capacity:
+            self._memory.popitem(last=False)
+
+def _pack(summary):
+    if summary is None:
+        return None
+    buffer = io.BytesIO()
+    np.savez(buffer, **summary)
+    return buffer.getvalue()
+
+def _unpack(blob):
+    if blob is None:
+        return None
+    with np.load(io.BytesIO(blob)) as data:
+        return {name : data[name] for name in data.files}
@@ -49,6 +49,18 @@ EPI_ART_MORT_WEIGHT  = "art.mort.weight"
 EPI_INITIAL_YEAR     = "seed.time"
 EPI_INITIAL_PREV     = "seed.prev"
 
+## Transmission parameters in the order expected by the calculation engine
+EPI_TRANSMISSION = [EPI_TRANSMIT_F2M,
+                    EPI_TRANSMIT_M2F,
+                    EPI_TRANSMIT_M2M,
+                    EPI_TRANSMIT_PRIMARY,
+                    EPI_TRANSMIT_CHRONIC,
+                    EPI_TRANSMIT_SYMPTOM,
+                    EPI_TRANSMIT_ART_VS,
+                    EPI_TRANSMIT_ART_VF,
+                    EPI_TRANSMIT_STI_POS,
+                    EPI_TRANSMIT_STI_NEG]
+
 ## LikelihoodInputs tab tags
 LHOOD_ANCSS_BIAS     = "ancss.bias"
 LHOOD_ANCRT_BIAS     = "ancrt.bias"
@@ -206,6 +218,39 @@ DTX_ART_MAX = 5
 N_DTX = DTX_MAX - DTX_MIN + 1
 N_ART = DTX_ART_MAX - DTX_ART_MIN + 1
 
+## +-+ Model output constants +------------------------------------------------+
+
+## Dimension labels of Model output arrays
+OUTPUT_DIMS = {
+    'births'           : ['Year', 'Sex'],
+    'births_exposed'   : ['Year'],
+    'pop_child_neg'    : ['Year', 'Sex', 'Age'],
+    'pop_child_hiv'    : ['Year', 'Sex', 'Age', 'CD4', 'ART'],
+    'pop_adult_neg'    : ['Year', 'Sex', 'Age', 'Risk'],
+    'pop_adult_hiv'    : ['Year', 'Sex', 'Age', 'Risk', 'CD4', 'ART'],
+    'deaths_child_neg' : ['Year', 'Sex', 'Age'],
+    'deaths_child_hiv' : ['Year', 'Sex', 'Age', 'CD4', 'ART'],
+    'deaths_adult_neg' : ['Year', 'Sex', 'Age', 'Risk'],
+    'deaths_adult_hiv' : ['Year', 'Sex', 'Age', 'Risk', 'CD4', 'ART'],
+    'new_infections'   : ['Year', 'Sex', 'Age', 'Risk'],
+}
+
+## Model outputs that store deaths
+OUTPUT_DEATHS = ['deaths_child_neg', 'deaths_child_hiv', 'deaths_adult_neg', 'deaths_adult_hiv']
+
+## Age of the first Age index of Model output arrays
+OUTPUT_AGE_MIN = {
+    'pop_child_neg'    : AGE_CHILD_MIN,
+    'pop_child_hiv'    : AGE_CHILD_MIN,
+    'pop_adult_neg'    : AGE_ADULT_MIN,
+    'pop_adult_hiv'    : AGE_ADULT_MIN,
+    'deaths_child_neg' : AGE_CHILD_MIN,
+    'deaths_child_hiv' : AGE_CHILD_MIN,
+    'deaths_adult_neg' : AGE_ADULT_MIN,
+    'deaths_adult_hiv' : AGE_ADULT_MIN,
+    'new_infections'   : AGE_MIN,
+}
+
 ## +===+ Fitting constants +===================================================+
 DIST_LOGNORMAL = 'Lognormal'
 DIST_NORMAL    = 'Normal'
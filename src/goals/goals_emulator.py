@@ -0,0 +1,196 @@
+import numpy as np
+import scipy.linalg as linalg
+import scipy.optimize as optimize
+import scipy.stats as stats
+
+## Surrogate-assisted minimization. Calibration objectives are sums of a few
+## expensive components (e.g., log-likelihoods of each data set, each needing a
+## model projection) and cheap terms (e.g., log prior densities). An Emulator
+## fits a Gaussian process to each expensive component from the points
+## evaluated so far. minimize evaluates a space-filling design first, then
+## repeatedly fits the emulator, minimizes a lower confidence bound on the
+## emulated objective, and evaluates the objective at that candidate. Every
+## value it reports comes from a true evaluation; the emulator only chooses
+## where to evaluate next.
+##
+## Inputs are expected to be scaled to similar ranges, such as the unit cube.
+
+class GaussianProcess:
+    """! Gaussian process regression with a squared-exponential kernel that has
+    one length scale per input dimension. Kernel hyperparameters and a noise
+    variance are chosen by maximizing the marginal likelihood of the training data.
+    """
+
+    def __init__(self, noise=1e-6):
+        """! Create an unfitted Gaussian process
+        @param noise initial noise variance, relative to the variance of training outputs
+        """
+        self.noise = noise
+        self._theta = None
+
+    def fit(self, x, y):
+        """! Fit the Gaussian process to training data
+        @param x training inputs, one row per point
+        @param y training outputs, one per row of x
+        @return this object
+        """
+        x = np.atleast_2d(np.asarray(x, dtype=float))
+        y = np.asarray(y, dtype=float)
+        self._y_mean = y.mean()
+        self._y_scale = y.std() if y.std() > 0.0 else 1.0
+        z = (y - self._y_mean) / self._y_scale
+
+        # Hyperparameters are log length scales, log signal variance and log noise variance.
+        # Refits start from the previous fit, which is usually close.
+        num_dims = x.shape[1]
+        if self._theta is None or len(self._theta) != num_dims + 2:
+            self._theta = np.concatenate((np.full(num_dims, np.log(0.3)), [0.0, np.log(self.noise)]))
+        bounds = [(np.log(1e-2), np.log(1e2))] * num_dims + [(np.log(1e-2), np.log(1e2)), (np.log(1e-10), np.log(1e-1))]
+        res = optimize.minimize(self._nll, self._theta, args=(x, z), jac=True, method='L-BFGS-B', bounds=bounds)
+        self._theta = res.x
+        self._x = x
+        self._chol, self._alpha = self._factor(self._theta, x, z)[0:2]
+        return self
+
+    def predict(self, x):
+        """! Predict outputs at new inputs
+        @param x inputs, one row per point
+        @return the predictive mean at each point
+        @return the predictive standard deviation at each point
+        """
+        x = np.atleast_2d(np.asarray(x, dtype=float))
+        ell, var_signal = np.exp(self._theta[:-2]), np.exp(self._theta[-2])
+        k_star = var_signal * np.exp(-0.5 * _sqdist(x / ell, self._x / ell))
+        mean = k_star @ self._alpha
+        v = linalg.solve_triangular(self._chol, k_star.T, lower=True)
+        var = np.maximum(var_signal - np.sum(v * v, axis=0), 0.0)
+        return self._y_mean + self._y_scale * mean, self._y_scale * np.sqrt(var)
+
+    def _factor(self, theta, x, z):
+        """! Cholesky factor of the training covariance and the weights it implies"""
+        ell, var_signal, var_noise = np.exp(theta[:-2]), np.exp(theta[-2]), np.exp(theta[-1])
+        k_signal = var_signal * np.exp(-0.5 * _sqdist(x / ell, x / ell))
+        chol = linalg.cholesky(k_signal + var_noise * np.eye(len(x)), lower=True)
+        alpha = linalg.cho_solve((chol, True), z)
+        return chol, alpha, k_signal
+
+    def _nll(self, theta, x, z):
+        """! Negative log marginal likelihood and its gradient with respect to theta"""
+        try:
+            chol, alpha, k_signal = self._factor(theta, x, z)
+        except linalg.LinAlgError:
+            return 1e10, np.zeros_like(theta)
+        nll = 0.5 * z @ alpha + np.log(np.diag(chol)).sum() + 0.5 * len(z) * np.log(2.0 * np.pi)
+
+        # d(nll)/d(theta) = -tr((alpha alpha' - inv(K)) dK/dtheta) / 2
+        inner = np.outer(alpha, alpha) - linalg.cho_solve((chol, True), np.eye(len(z)))
+        ell = np.exp(theta[:-2])
+        grad = np.zeros_like(theta)
+        for j in range(len(ell)):
+            grad[j] = -0.5 * np.sum(inner * k_signal * _sqdist(x[:,[j]] / ell[j], x[:,[j]] / ell[j]))
+        grad[-2] = -0.5 * np.sum(inner * k_signal)
+        grad[-1] = -0.5 * np.exp(theta[-1]) * np.trace(inner)
+        return nll, grad
+
+def _sqdist(a, b):
+    """! Squared Euclidean distances between rows of a and rows of b"""
+    return np.maximum((a * a).sum(1)[:,None] + (b * b).sum(1)[None,:] - 2.0 * a @ b.T, 0.0)
+
+class Emulator:
+    """! Gaussian process emulator of the sum of several objective components"""
+
+    def __init__(self, num_components):
+        self.processes = [GaussianProcess() for k in range(num_components)]
+
+    def fit(self, x, y):
+        """! Fit one Gaussian process per component
+        @param x inputs, one row per point
+        @param y component values, one row per point and one column per component
+        @return this object
+        """
+        y = np.atleast_2d(y)
+        for k, process in enumerate(self.processes):
+            process.fit(x, y[:,k])
+        return self
+
+    def predict(self, x):
+        """! Predict the sum of components. Components are treated as independent
+        @return the predictive mean of the sum at each point
+        @return the predictive standard deviation of the sum at each point
+        """
+        means, sds = zip(*[process.predict(x) for process in self.processes])
+        return np.sum(means, axis=0), np.sqrt(np.sum(np.square(sds), axis=0))
+
+def minimize(func, lower, upper, exact=None, num_design=None, max_evals=200, kappa=2.0, tol=1e-3,
+             patience=10, seed=None):
+    """! Minimize an expensive objective with the help of a Gaussian process emulator
+    @param func function of an input vector returning a vector of objective components. The
+    objective is the sum of the components plus exact(x)
+    @param lower, upper input bounds. Both must be finite
+    @param exact optional cheap function of an input vector added to the objective, which is
+    calculated directly instead of being emulated
+    @param num_design number of points in the initial Latin hypercube design. Defaults to 10 per input.
+    The design is capped at half of max_evals so that at least half of the evaluations are chosen
+    with the emulator
+    @param max_evals maximum number of calls to func, including the initial design. Must be at least 4
+    @param kappa weight on the emulator's standard deviation when choosing candidates. Larger
+    values explore more
+    @param tol a candidate counts as an improvement if it lowers the best objective by more than tol
+    @param patience stop after this many consecutive candidates without improvement
+    @param seed random number generator seed
+    @return a scipy.optimize.OptimizeResult. x and fun are the best point evaluated and its
+    objective, nfev counts calls to func, and nit counts candidates chosen with the emulator
+    """
+    lower, upper = np.asarray(lower, dtype=float), np.asarray(upper, dtype=float)
+    exact = (lambda x : 0.0) if exact is None else exact
+    num_dims = len(lower)
+    if max_evals < 4:
+        raise ValueError('minimize needs at least 4 evaluations')
+    num_design = 10 * num_dims if num_design is None else num_design
+    num_design = max(2, min(num_design, max_evals // 2))
+    rng = np.random.default_rng(seed)
+
+    # Emulators work in the unit cube
+    to_x = lambda u : lower + u * (upper - lower)
+    design = stats.qmc.LatinHypercube(d=num_dims, seed=rng).random(num_design)
+    units, values, totals = [], [], []
+    def evaluate(u):
+        x = to_x(u)
+        vals = np.asarray(func(x), dtype=float)
+        units.append(u)
+        values.append(vals)
+        totals.append(vals.sum() + exact(x))
+    for u in design:
+        evaluate(u)
+
+    emulator = None
+    num_stall = 0
+    nit = 0
+    while len(units) < max_evals and num_stall < patience:
+        ok = np.isfinite(totals)
+        if not ok.any():
+            raise ValueError('The objective was not finite at any design point')
+        if emulator is None:
+            emulator = Emulator(values[0].size)
+        emulator.fit(np.array(units)[ok], np.array(values)[ok])
+
+        def bound(u, emulator):
+            mean, sd = emulator.predict(u)
+            return mean[0] - kappa * sd[0] + exact(to_x(u))
+        best_u = np.array(units)[ok][np.argsort(np.array(totals)[ok])[:5]]
+        starts = np.concatenate((best_u, rng.uniform(size=(5, num_dims))))
+        results = [optimize.minimize(bound, u, args=(emulator,), method='L-BFGS-B', bounds=[(0.0, 1.0)] * num_dims)
+                   for u in starts]
+        candidate = min(results, key=lambda res : res.fun).x
+        nit += 1
+
+        best = np.min(np.array(totals)[ok])
+        evaluate(candidate)
+        num_stall = num_stall + 1 if not totals[-1] < best - tol else 0
+
+    totals = np.array(totals)
+    ibest = np.nanargmin(np.where(np.isfinite(totals), totals, np.nan))
+    return optimize.OptimizeResult(x=to_x(units[ibest]), fun=totals[ibest], nfev=len(units), nit=nit,
+                                   success=num_stall >= patience, emulator=emulator,
+                                   message='No improvement in %d candidates' % (patience) if num_stall >= patience
+                                   else 'Maximum number of evaluations reached')
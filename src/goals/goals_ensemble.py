@@ -0,0 +1,65 @@
+import concurrent.futures
+import os
+import goals.goals_snapshot as Snapshot
+import goals.goals_utils as Utils
+from goals.goals_model import Model
+
+class Ensemble:
+    """! Run several independently-initialized Goals models on a thread pool. The
+    calculation engine releases the GIL while projecting, so models project in
+    parallel. Each model owns its own input and output arrays, so threads never
+    write to the same buffers.
+    """
+
+    def __init__(self, num_models, xlsx_name=None, snap_name=None, max_workers=None):
+        """! Create and initialize the ensemble's models
+        @param num_models number of models in the ensemble
+        @param xlsx_name An Excel workbook with Goals ARM inputs
+        @param snap_name A snapshot compiled from xlsx_name (see goals_snapshot). If specified, inputs are read
+        from the snapshot instead of Excel
+        @param max_workers maximum number of threads. Defaults to the number of CPUs
+        @details Inputs are read once, then every model is initialized from the same raw inputs.
+        """
+        if snap_name is not None:
+            inputs = Snapshot.load_snapshot(snap_name, xlsx_name)
+        elif xlsx_name is not None:
+            inputs = Utils.xlsx_load_inputs(xlsx_name)
+        else:
+            raise ValueError('Ensemble requires an Excel workbook or snapshot')
+
+        self._pool = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers or os.cpu_count())
+        self.models = [Model() for k in range(num_models)]
+        self.map(lambda model, k : model._init_from_inputs(inputs))
+
+    def __len__(self):
+        return len(self.models)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """! Shut down the thread pool"""
+        self._pool.shutdown()
+
+    def map(self, func):
+        """! Call func(model, k) for each model k on the thread pool
+        @param func a function of a model and its index in the ensemble
+        @return a list of func's return values, in model order
+        """
+        futures = [self._pool.submit(func, model, k) for k, model in enumerate(self.models)]
+        return [future.result() for future in futures]
+
+    def project(self, year_stop, setup=None):
+        """! Project every model in parallel
+        @param year_stop the last year to project
+        @param setup optional function setup(model, k) called on the worker thread before model k is projected.
+        This can be used to vary inputs across the ensemble.
+        """
+        def run(model, k):
+            if setup is not None:
+                setup(model, k)
+            model.project(year_stop)
+        self.map(run)
@@ -0,0 +1,127 @@
+import collections
+import numpy as np
+import goals.goals_const as CONST
+from goals.goals_results import Results
+
+## Standard indicators. Indicators are calculated from a few reductions of
+## model outputs (source marginals), each calculated in one pass over its
+## output array and cached by goals_results.Results. Every requested indicator
+## is then derived from those small marginals, so the full output arrays are
+## traversed at most once no matter how many indicators are requested.
+##
+## Indicators are reported by year and sex (female, male). Adult populations
+## by age group use five-year groups 15-19, 20-24, ..., 75-79 and 80+.
+
+## An indicator's values with its dimension labels and the coordinates along each dimension
+Indicator = collections.namedtuple('Indicator', ['values', 'dims', 'coords'])
+
+## Dimensions kept when reducing each source array
+SOURCES = {
+    'pop_adult_neg'    : ('Year', 'Sex', 'Age'),
+    'pop_adult_hiv'    : ('Year', 'Sex', 'Age', 'ART'),
+    'new_infections'   : ('Year', 'Sex', 'Age'),
+    'deaths_adult_hiv' : ('Year', 'Sex', 'Age'),
+}
+
+SEX_LABELS = ['Female', 'Male']
+AGE_GROUP_MIN = list(range(CONST.AGE_ADULT_MIN, CONST.AGE_ADULT_MAX + 1, 5))
+AGE_GROUP_LABELS = ['%d-%d' % (age, age + 4) for age in AGE_GROUP_MIN[:-1]] + ['%d+' % (AGE_GROUP_MIN[-1])]
+
+def _adult_ages(age_min, age_max):
+    return slice(age_min - CONST.AGE_ADULT_MIN, age_max - CONST.AGE_ADULT_MIN + 1)
+
+def _by_sex(vals):
+    """! Combine circumcised and uncircumcised males. vals must be indexed by year then sex"""
+    rval = np.zeros((vals.shape[0], CONST.N_SEX) + vals.shape[2:], dtype=vals.dtype)
+    rval[:,CONST.SEX_FEMALE] = vals[:,CONST.SEX_FEMALE]
+    rval[:,CONST.SEX_MALE] = vals[:,CONST.SEX_MALE_U:].sum(axis=1)
+    return rval
+
+def _ratio(num, den):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return num / den
+
+def calc_plhiv(src):
+    """! Adults (15+) living with HIV"""
+    return src['pop_adult_hiv'].sum(axis=(2,3))
+
+def calc_plhiv_15_49(src):
+    """! Adults aged 15-49 living with HIV"""
+    return src['pop_adult_hiv'][:,:,_adult_ages(15, 49),:].sum(axis=(2,3))
+
+def calc_plhiv_by_age(src):
+    """! Adults living with HIV by five-year age group"""
+    return np.add.reduceat(src['pop_adult_hiv'].sum(axis=3), np.array(AGE_GROUP_MIN) - CONST.AGE_ADULT_MIN, axis=2)
+
+def calc_prevalence_15_49(src):
+    """! HIV prevalence among adults aged 15-49"""
+    hiv = calc_plhiv_15_49(src)
+    neg = src['pop_adult_neg'][:,:,_adult_ages(15, 49)].sum(axis=2)
+    return _ratio(hiv, hiv + neg)
+
+def calc_new_infections(src):
+    """! New HIV infections at all ages"""
+    return src['new_infections'].sum(axis=2)
+
+def calc_incidence_15_49(src):
+    """! HIV incidence among adults aged 15-49: new infections during the year per
+    HIV-negative adult aged 15-49 at the end of the previous year. Not available for the first year."""
+    inci = np.full(src['pop_adult_neg'].shape[0:2], np.nan)
+    age_min = CONST.OUTPUT_AGE_MIN['new_infections']
+    infections = src['new_infections'][:,:,(15 - age_min):(49 - age_min + 1)].sum(axis=2)
+    neg = src['pop_adult_neg'][:,:,_adult_ages(15, 49)].sum(axis=2)
+    inci[1:] = _ratio(infections[1:], neg[:-1])
+    return inci
+
+def calc_art_adult(src):
+    """! Adults (15+) on ART"""
+    return src['pop_adult_hiv'][:,:,:,CONST.DTX_ART_MIN:(CONST.DTX_ART_MAX+1)].sum(axis=(2,3))
+
+def calc_art_coverage(src):
+    """! Proportion of adults (15+) living with HIV who are on ART"""
+    return _ratio(calc_art_adult(src), calc_plhiv(src))
+
+def calc_deaths_plhiv(src):
+    """! All-cause deaths among adults (15+) living with HIV"""
+    return src['deaths_adult_hiv'].sum(axis=2)
+
+## Indicator name -> (calculation, source arrays, dimensions after Year and Sex)
+INDICATORS = {
+    'plhiv'           : (calc_plhiv,            ['pop_adult_hiv'],                   []),
+    'plhiv_15_49'     : (calc_plhiv_15_49,      ['pop_adult_hiv'],                   []),
+    'plhiv_by_age'    : (calc_plhiv_by_age,     ['pop_adult_hiv'],                   ['AgeGroup']),
+    'prevalence_15_49': (calc_prevalence_15_49, ['pop_adult_hiv', 'pop_adult_neg'],  []),
+    'new_infections'  : (calc_new_infections,   ['new_infections'],                  []),
+    'incidence_15_49' : (calc_incidence_15_49,  ['new_infections', 'pop_adult_neg'], []),
+    'art_adult'       : (calc_art_adult,        ['pop_adult_hiv'],                   []),
+    'art_coverage'    : (calc_art_coverage,     ['pop_adult_hiv'],                   []),
+    'deaths_plhiv'    : (calc_deaths_plhiv,     ['deaths_adult_hiv'],                []),
+}
+
+def calc_indicators(results, names=None):
+    """! Calculate indicators for every year of projection
+    @param results a goals_results.Results object, or a Goals model to create one for
+    @param names list of indicators to calculate (keys of INDICATORS). Defaults to all indicators
+    @return a dict from indicator names to Indicator tuples
+    """
+    if not isinstance(results, Results):
+        results = Results(results)
+    model = results._model
+    names = list(INDICATORS.keys()) if names is None else names
+    for name in names:
+        if name not in INDICATORS:
+            raise ValueError('Unrecognized indicator %s' % (name))
+
+    # One reduction per source array shared by all requested indicators
+    sources = {source for name in names for source in INDICATORS[name][1]}
+    src = {source : _by_sex(results.marginal(source, SOURCES[source])) for source in sources}
+
+    coords = {'Year' : list(range(model.year_first, model.year_final + 1)),
+              'Sex' : SEX_LABELS,
+              'AgeGroup' : AGE_GROUP_LABELS}
+    rval = {}
+    for name in names:
+        calc, _, extra = INDICATORS[name]
+        dims = ['Year', 'Sex'] + extra
+        rval[name] = Indicator(calc(src), dims, {dim : coords[dim] for dim in dims})
+    return rval
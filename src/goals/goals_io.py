@@ -0,0 +1,171 @@
+import json
+import os
+import numpy as np
+import goals.goals_const as CONST
+
+## Model output writers. Parquet and Arrow IPC files store each output array
+## in long format, with one integer column per array dimension and a Value
+## column. Files are written one year at a time, so the long table is never
+## materialized in memory. Dimension labels, the array shape and the first
+## year of projection are stored in the file's schema metadata so that
+## read_output can restore the original array. CSV output is much slower and
+## is provided for compatibility with older workflows.
+##
+## pyarrow is needed for Parquet and Arrow output, and pandas is needed for CSV
+## output. Neither is required by the goals package itself.
+
+## Output arrays written by default: Model attribute -> (file name stem, dimension labels)
+OUTPUTS = {
+    'births'           : ('births',           CONST.OUTPUT_DIMS['births']),
+    'births_exposed'   : ('births-exposed',   CONST.OUTPUT_DIMS['births_exposed']),
+    'pop_child_neg'    : ('child-neg',        CONST.OUTPUT_DIMS['pop_child_neg']),
+    'pop_child_hiv'    : ('child-hiv',        CONST.OUTPUT_DIMS['pop_child_hiv']),
+    'pop_adult_neg'    : ('adult-neg',        CONST.OUTPUT_DIMS['pop_adult_neg']),
+    'pop_adult_hiv'    : ('adult-hiv',        CONST.OUTPUT_DIMS['pop_adult_hiv']),
+    'deaths_child_neg' : ('deaths-child-neg', CONST.OUTPUT_DIMS['deaths_child_neg']),
+    'deaths_child_hiv' : ('deaths-child-hiv', CONST.OUTPUT_DIMS['deaths_child_hiv']),
+    'deaths_adult_neg' : ('deaths-adult-neg', CONST.OUTPUT_DIMS['deaths_adult_neg']),
+    'deaths_adult_hiv' : ('deaths-adult-hiv', CONST.OUTPUT_DIMS['deaths_adult_hiv']),
+    'new_infections'   : ('new-hiv',          CONST.OUTPUT_DIMS['new_infections']),
+}
+
+FORMATS = {'parquet' : '.parquet', 'arrow' : '.arrow', 'csv' : '.csv'}
+
+OUTPUT_META = b"goals"
+
+def write_outputs(model, data_path, fmt='parquet', names=None, **kwargs):
+    """! Write model outputs to files, one file per output array
+    @param model a projected Goals model
+    @param data_path directory to write files to
+    @param fmt file format: 'parquet', 'arrow' or 'csv'
+    @param names list of Model output attributes to write. Defaults to all keys of OUTPUTS
+    @param kwargs passed to the format's writer (e.g., compression for Parquet)
+    @return a list of files written
+    """
+    if fmt not in FORMATS:
+        raise ValueError('Unrecognized output format %s' % (fmt))
+    files = []
+    for name in OUTPUTS.keys() if names is None else names:
+        stem, dims = OUTPUTS[name]
+        file_name = os.path.join(data_path, stem + FORMATS[fmt])
+        match fmt:
+            case 'parquet': write_parquet(file_name, getattr(model, name), dims, model.year_first, **kwargs)
+            case 'arrow':   write_arrow(file_name, getattr(model, name), dims, model.year_first, **kwargs)
+            case 'csv':     write_csv(file_name, getattr(model, name), dims, **kwargs)
+        files.append(file_name)
+    return files
+
+def write_indicators(indicators, data_path, fmt='parquet', year_first=None, **kwargs):
+    """! Write indicators to files, one file per indicator named indicator-<name>
+    @param indicators a dict of indicators, as returned by goals_indicators.calc_indicators
+    @param data_path directory to write files to
+    @param fmt file format: 'parquet', 'arrow' or 'csv'
+    @param year_first the first year of projection, stored as metadata. Defaults to the first year in each indicator's coordinates
+    @param kwargs passed to the format's writer
+    @return a list of files written
+    """
+    if fmt not in FORMATS:
+        raise ValueError('Unrecognized output format %s' % (fmt))
+    files = []
+    for name, indicator in indicators.items():
+        file_name = os.path.join(data_path, 'indicator-' + name.replace('_', '-') + FORMATS[fmt])
+        first = indicator.coords['Year'][0] if year_first is None else year_first
+        match fmt:
+            case 'parquet': write_parquet(file_name, indicator.values, indicator.dims, first, **kwargs)
+            case 'arrow':   write_arrow(file_name, indicator.values, indicator.dims, first, **kwargs)
+            case 'csv':     write_csv(file_name, indicator.values, indicator.dims, **kwargs)
+        files.append(file_name)
+    return files
+
+def write_parquet(file_name, array, dims, year_first=None, compression='snappy'):
+    """! Write an output array to a Parquet file, one row group per year
+    @param file_name the file to create
+    @param array an output array indexed first by year
+    @param dims dimension labels, one per array dimension
+    @param year_first the first year of projection, stored as metadata
+    @param compression Parquet compression codec, or None for no compression
+    """
+    import pyarrow.parquet as pq
+    schema = _output_schema(array, dims, year_first)
+    # Dictionary-encoding the index columns makes them tiny. Values rarely repeat,
+    # so dictionary-encoding them is slow and does not save space.
+    with pq.ParquetWriter(file_name, schema, compression=compression, use_dictionary=list(dims)) as writer:
+        for batch in _year_batches(array, schema):
+            writer.write_batch(batch)
+
+def write_arrow(file_name, array, dims, year_first=None):
+    """! Write an output array to an Arrow IPC file, one record batch per year
+    @param file_name the file to create
+    @param array an output array indexed first by year
+    @param dims dimension labels, one per array dimension
+    @param year_first the first year of projection, stored as metadata
+    """
+    import pyarrow as pa
+    schema = _output_schema(array, dims, year_first)
+    with pa.OSFile(file_name, 'wb') as sink, pa.ipc.new_file(sink, schema) as writer:
+        for batch in _year_batches(array, schema):
+            writer.write_batch(batch)
+
+def write_csv(file_name, array, dims, **kwargs):
+    """! Write an output array to a CSV file in long format. This is much slower than
+    write_parquet or write_arrow and produces much larger files.
+    @param kwargs passed to pandas.DataFrame.to_csv (e.g., float_format)
+    """
+    array2frame(array, dims).to_csv(file_name, **kwargs)
+
+def read_output(file_name):
+    """! Read an output array written by write_parquet or write_arrow
+    @param file_name the file to read
+    @return the output array
+    @return a dict of metadata with keys 'dims' (dimension labels), 'shape' and 'year_first'
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    if file_name.endswith(FORMATS['arrow']):
+        with pa.memory_map(file_name, 'r') as source:
+            table = pa.ipc.open_file(source).read_all()
+    else:
+        table = pq.read_table(file_name)
+    meta = json.loads(table.schema.metadata[OUTPUT_META])
+    values = table.column('Value').to_numpy()
+    return values.reshape(meta['shape']), meta
+
+def array2frame(array, names):
+    """! Convert a numpy ndarray to a long data frame
+    @param array a numpy ndarray
+    @param names a list of names, one per dimension of ndarray
+    @return a long data frame with one column per dimension of ndarray
+    """
+    import pandas as pd
+    if len(names) > 1:
+        array_index = pd.MultiIndex.from_product([range(s) for s in array.shape], names=names)
+        array_frame = pd.DataFrame({'Value' : array.flatten()}, index=array_index)['Value']
+    else:
+        array_index = pd.Index(range(array.shape[0]), name=names[0])
+        array_frame = pd.DataFrame({'Value' : array}, index=array_index)['Value']
+    return array_frame
+
+def _output_schema(array, dims, year_first):
+    import pyarrow as pa
+    if len(dims) != array.ndim:
+        raise ValueError('%d dimension labels given for a %d-dimensional array' % (len(dims), array.ndim))
+    meta = {'dims' : dims, 'shape' : list(array.shape), 'year_first' : year_first}
+    fields = [pa.field(dim, pa.from_numpy_dtype(_index_dtype(size))) for dim, size in zip(dims, array.shape)]
+    fields.append(pa.field('Value', pa.from_numpy_dtype(array.dtype)))
+    return pa.schema(fields, metadata={OUTPUT_META : json.dumps(meta)})
+
+def _year_batches(array, schema):
+    """! Generate one record batch per year. Index columns for the non-year dimensions
+    are the same for every year, so they are calculated once."""
+    import pyarrow as pa
+    shape = array.shape[1:]
+    size = int(np.prod(shape))
+    index = [pa.array(col.ravel().astype(_index_dtype(n))) for col, n in zip(np.indices(shape), shape)]
+    year_dtype = _index_dtype(array.shape[0])
+    for t in range(array.shape[0]):
+        year = pa.array(np.full(size, t, dtype=year_dtype))
+        value = pa.array(np.ascontiguousarray(array[t]).ravel())
+        yield pa.record_batch([year] + index + [value], schema=schema)
+
+def _index_dtype(size):
+    return np.int16 if size <= np.iinfo(np.int16).max else np.int32
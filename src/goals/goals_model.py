@@ -1,9 +1,11 @@
+import copy
+import functools
 import math
 import numpy as np
 import scipy as sp
-import openpyxl as xlsx
 import goals.goals_const as CONST
 import goals.goals_utils as Utils
+import goals.goals_snapshot as Snapshot
 import goals_proj as Goals
 
 ## TODO:
@@ -13,16 +15,95 @@ import goals_proj as Goals
 ## engine. The C++ transfer layer and calculation engine ideally should not do
 ## any input transformations.
 
+## Partner age mixing preferences are deterministic functions of a few scalar
+## inputs, so we cache them. Kernels are cached separately so that varying
+## one kind of partnership does not recalculate the other.
+@functools.lru_cache(maxsize=64)
+def calc_oppo_kernel(diff_avg, diff_var):
+    """! Calculate the distribution of age differences in male-female partnerships
+    @param diff_avg mean age difference (male age - female age)
+    @param diff_var variance of age differences
+    @return array k where k[d] is the probability that the age difference is in [d-n+1, d-n+2), n=N_AGE_ADULT-1
+    """
+    ## Use Newton-Raphson to approximate shape and scale parameters of the Fisk
+    ## distribution given the specified mean and variance.
+    num_iter = 5
+    shift = -10 # assuming negligible partnerships with females who are 10 years older than their male partners
+    m, v = diff_avg - shift, diff_var
+    target = m * m / (m * m + v)
+    x = 0.5 * math.pi - target
+    for k in range(num_iter):
+        cot_x = 1.0 / math.tan(x)
+        csc_x = 1.0 / math.sin(x)
+        fx = x * cot_x - target
+        dx = cot_x - x * csc_x * csc_x
+        x = x - fx / dx
+
+    shape = math.pi / x
+    scale = m * math.sin(x) / x
+    return _age_diff_kernel(sp.stats.fisk(shape, shift, scale))
+
+@functools.lru_cache(maxsize=64)
+def calc_same_kernel(diff_var):
+    """! Calculate the distribution of age differences in male-male partnerships
+    @param diff_var variance of age differences. Differences have mean zero.
+    @return array indexed like calc_oppo_kernel
+    """
+    return _age_diff_kernel(sp.stats.norm(0.0, math.sqrt(diff_var)))
+
+def _age_diff_kernel(dist):
+    n = CONST.N_AGE_ADULT - 1 # intentionally omits the 80+ age group
+    kernel = np.diff(dist.cdf(np.arange(-(n - 1), n + 1)))
+    kernel.flags.writeable = False
+    return kernel
+
+@functools.lru_cache(maxsize=64)
+def calc_partner_prefs_cached(oppo_diff_avg, oppo_diff_var, male_diff_var):
+    """! Calculate partner age mixing preferences. See Model.calc_partner_prefs
+    @return a read-only mixing matrix. Copy it before modifying or sharing it with the calculation engine.
+    """
+    n = CONST.N_AGE_ADULT - 1
+
+    ## Calculate unnormalized mixing preferences. raw[b,c] is the preference of a
+    ## person of age b for partners of age c, which depends on the age difference c-b
+    diff = np.arange(n)[np.newaxis,:] - np.arange(n)[:,np.newaxis] + (n - 1)
+    oppo_raw = np.zeros((CONST.N_AGE_ADULT, CONST.N_AGE_ADULT))
+    same_raw = np.zeros((CONST.N_AGE_ADULT, CONST.N_AGE_ADULT))
+    oppo_raw[:n,:n] = calc_oppo_kernel(oppo_diff_avg, oppo_diff_var)[diff]
+    same_raw[:n,:n] = calc_same_kernel(male_diff_var)[diff]
+
+    ## Fill in normalized mixing matrix
+    mix = np.zeros((CONST.N_SEX, CONST.N_AGE_ADULT, CONST.N_SEX, CONST.N_AGE_ADULT))
+    mix[CONST.SEX_FEMALE, :n, CONST.SEX_MALE,   :] = oppo_raw[:n,:] / oppo_raw[:n,:].sum(axis=1, keepdims=True)
+    mix[CONST.SEX_MALE,   :n, CONST.SEX_FEMALE, :] = (oppo_raw[:,:n] / oppo_raw[:,:n].sum(axis=0, keepdims=True)).transpose()
+    mix[CONST.SEX_MALE,   :n, CONST.SEX_MALE,   :] = same_raw[:n,:] / same_raw[:n,:].sum(axis=1, keepdims=True)
+    mix.flags.writeable = False
+    return mix
+
+def _same_input(new, old):
+    """! Check if two raw input values (arrays, scalars or dicts of options) are equal"""
+    if isinstance(new, np.ndarray) or isinstance(old, np.ndarray):
+        return (isinstance(new, np.ndarray) and isinstance(old, np.ndarray) and new.shape == old.shape
+                and np.array_equal(new, old, equal_nan=True))
+    return new == old
+
 class Model:
     """! Goals model class. This is wraps an external Goals ARM core projection object
     so that calling applications should not need to care about the Python-C++ API
     """
 
+    ## Names of output arrays shared with the calculation engine
+    _output_names = ['pop_adult_neg', 'pop_adult_hiv', 'pop_child_neg', 'pop_child_hiv', 'births',
+                     'deaths_adult_neg', 'deaths_adult_hiv', 'deaths_child_neg', 'deaths_child_hiv',
+                     'new_infections', 'births_exposed']
+
     def __init__(self):
         self._dtype = np.float64
         self._order = "C"
         self._initialized = False # True if projection inputs have been initialized, False otherwise
         self._projected   = -1    # The latest year that the projection has been calculated through (-1 if not done)
+        self._dirty       = None  # The earliest year affected by input changes since the last projection (None if unchanged)
+        self._synced      = {}    # Copies of the inputs the calculation engine last received, used to detect changes
     
     def is_initialized(self):
         """! Check if the projection has been initialized"""
@@ -37,152 +118,541 @@ class Model:
         @param xlsx_name An Excel workbook with Goals ARM inputs
         @return An initialized Goals ARM model instance
         """
+        self._init_from_inputs(Utils.xlsx_load_inputs(xlsx_name))
+
+    def init_from_snapshot(self, snap_name, xlsx_name=None):
+        """! Initialize a Goals ARM model instance from a compiled input snapshot
+        @param snap_name A snapshot file created by goals_snapshot.compile_snapshot
+        @param xlsx_name The Excel workbook the snapshot was compiled from. If None, the
+        workbook recorded in the snapshot is used. The snapshot is recompiled if that
+        workbook has changed, or created if it does not exist yet.
+        """
+        self._init_from_inputs(Snapshot.load_snapshot(snap_name, xlsx_name))
 
-        wb = xlsx.load_workbook(filename=xlsx_name, read_only=True)
-        cfg_opts = Utils.xlsx_load_config(wb[CONST.XLSX_TAB_CONFIG])
-        self.epi_pars = Utils.xlsx_load_epi(wb[CONST.XLSX_TAB_EPI])
-
-        # Conver % epi parameters to proportions
-        self.epi_pars[CONST.EPI_INITIAL_PREV   ] *= 0.01
-        self.epi_pars[CONST.EPI_TRANSMIT_F2M   ] *= 0.01
-        self.epi_pars[CONST.EPI_EFFECT_VMMC    ] *= 0.01
-        self.epi_pars[CONST.EPI_EFFECT_CONDOM  ] *= 0.01
-        self.epi_pars[CONST.EPI_ART_MORT_WEIGHT] *= 0.01
+    def reinit_from_xlsx(self, xlsx_name):
+        """! Re-initialize the model from inputs stored in Excel, reusing its calculation engine and outputs
+        @param xlsx_name An Excel workbook with Goals ARM inputs
+        @details See reinit_from_inputs
+        """
+        self.reinit_from_inputs(Utils.xlsx_load_inputs(xlsx_name))
 
-        self.year_first = cfg_opts[CONST.CFG_FIRST_YEAR]
-        self.year_final = cfg_opts[CONST.CFG_FINAL_YEAR]
+    def reinit_from_snapshot(self, snap_name, xlsx_name=None):
+        """! Re-initialize the model from a compiled input snapshot, reusing its calculation engine and outputs
+        @param snap_name A snapshot file created by goals_snapshot.compile_snapshot
+        @param xlsx_name The Excel workbook the snapshot was compiled from (see init_from_snapshot)
+        @details See reinit_from_inputs
+        """
+        self.reinit_from_inputs(Snapshot.load_snapshot(snap_name, xlsx_name))
+
+    def reinit_from_inputs(self, inputs):
+        """! Re-initialize the model from raw inputs, reusing its calculation engine, UPD demography and outputs
+        @param inputs a dict of raw inputs as returned by goals_utils.xlsx_load_inputs
+        @details Output arrays are zeroed in place, and only inputs that differ from the ones the
+        model was last initialized from are passed to the calculation engine again. Model inputs
+        changed since then (e.g., epi_pars) are reset. The model is initialized from scratch
+        instead if it is uninitialized or the configuration differs (e.g., the projection years
+        or UPD file). The UPD file is not reread, so changes to it on disk are not detected.
+        """
+        if not self._initialized or inputs['config'] != self._raw_inputs['config']:
+            self._init_from_inputs(inputs)
+            return
+
+        changed = {key for key, val in inputs.items() if not _same_input(val, self._raw_inputs.get(key))}
+        self._init_options(inputs)
+        self.invalidate(-1)
+        for name in self._output_names:
+            getattr(self, name)[...] = 0.0
+        self._init_engine_inputs(inputs, changed)
+
+        # Pass tracked inputs that differ from what the calculation engine last received.
+        # This covers changes made through the model (e.g., during calibration) that
+        # do not show up as differences between raw inputs.
+        self.sync_inputs()
+        self._dirty = None
+        self._raw_inputs = inputs
+
+    def _init_from_inputs(self, inputs):
+        """! Initialize the model from raw inputs
+        @param inputs a dict of raw inputs as returned by goals_utils.xlsx_load_inputs
+        """
+        self._init_options(inputs)
 
         num_years = self.year_final - self.year_first + 1
-        year_range = range(0, num_years)
+
+        # Counts how many times each year's outputs have been calculated, so that
+        # clients like goals_results.Results can tell which cached values are stale.
+        # Counts continue past earlier initializations of this model, so values cached
+        # before re-initialization never match the new outputs' counts.
+        start = self._year_version.max() + 1 if hasattr(self, '_year_version') else 0
+        self._year_version = np.full(num_years, start, dtype=np.int64)
 
         shp_adult_neg = (num_years, CONST.N_SEX_MC, CONST.N_AGE_ADULT, CONST.N_POP)
         shp_adult_hiv = (num_years, CONST.N_SEX_MC, CONST.N_AGE_ADULT, CONST.N_POP, CONST.N_HIV_ADULT, CONST.N_DTX)
         shp_child_neg = (num_years, CONST.N_SEX_MC, CONST.N_AGE_CHILD)
         shp_child_hiv = (num_years, CONST.N_SEX_MC, CONST.N_AGE_CHILD, CONST.N_HIV_CHILD, CONST.N_DTX)
 
-        self.pop_adult_neg = np.zeros(shp_adult_neg, dtype=self._dtype, order=self._order)
-        self.pop_adult_hiv = np.zeros(shp_adult_hiv, dtype=self._dtype, order=self._order)
-        self.pop_child_neg = np.zeros(shp_child_neg, dtype=self._dtype, order=self._order)
-        self.pop_child_hiv = np.zeros(shp_child_hiv, dtype=self._dtype, order=self._order)
+        self.pop_adult_neg = self._alloc_output('pop_adult_neg', shp_adult_neg)
+        self.pop_adult_hiv = self._alloc_output('pop_adult_hiv', shp_adult_hiv)
+        self.pop_child_neg = self._alloc_output('pop_child_neg', shp_child_neg)
+        self.pop_child_hiv = self._alloc_output('pop_child_hiv', shp_child_hiv)
 
-        self.deaths_adult_neg = np.zeros(shp_adult_neg, dtype=self._dtype, order=self._order)
-        self.deaths_adult_hiv = np.zeros(shp_adult_hiv, dtype=self._dtype, order=self._order)
-        self.deaths_child_neg = np.zeros(shp_child_neg, dtype=self._dtype, order=self._order)
-        self.deaths_child_hiv = np.zeros(shp_child_hiv, dtype=self._dtype, order=self._order)
+        self.deaths_adult_neg = self._alloc_output('deaths_adult_neg', shp_adult_neg)
+        self.deaths_adult_hiv = self._alloc_output('deaths_adult_hiv', shp_adult_hiv)
+        self.deaths_child_neg = self._alloc_output('deaths_child_neg', shp_child_neg)
+        self.deaths_child_hiv = self._alloc_output('deaths_child_hiv', shp_child_hiv)
 
-        self.births = np.zeros((num_years, CONST.N_SEX), dtype=self._dtype, order=self._order)
-        self.births_exposed = np.zeros((num_years), dtype=self._dtype, order=self._order)
+        self.births = self._alloc_output('births', (num_years, CONST.N_SEX))
+        self.births_exposed = self._alloc_output('births_exposed', (num_years,))
 
-        self.new_infections = np.zeros((num_years, CONST.N_SEX_MC, CONST.N_AGE, CONST.N_POP), dtype=self._dtype, order=self._order)
+        self.new_infections = self._alloc_output('new_infections', (num_years, CONST.N_SEX_MC, CONST.N_AGE, CONST.N_POP))
 
         self._proj = Goals.Projection(self.year_first, self.year_final)
-        self._proj.initialize(cfg_opts[CONST.CFG_UPD_NAME])
-        self._proj.share_output_population(self.pop_adult_neg, self.pop_adult_hiv, self.pop_child_neg, self.pop_child_hiv)
-        self._proj.share_output_births(self.births)
-        self._proj.share_output_deaths(self.deaths_adult_neg, self.deaths_adult_hiv, self.deaths_child_neg, self.deaths_child_hiv)
-        self._proj.share_output_new_infections(self.new_infections)
-        self._proj.share_output_births_exposed(self.births_exposed)
+        self._proj.initialize(inputs['config'][CONST.CFG_UPD_NAME])
+        self._share_outputs()
+        self._projected = -1
+
+        self._init_engine_inputs(inputs)
+        self._synced = self._tracked_inputs()
+        self._dirty = None
+        self._raw_inputs = inputs
+        self._initialized = True
+
+    def _init_options(self, inputs):
+        """! Set configuration options and scalar parameters from raw inputs"""
+        cfg_opts = inputs['config']
+        self.epi_pars = dict(inputs['epi'])
+        self._direct_incidence = cfg_opts[CONST.CFG_USE_DIRECT_INCI]
+
+        # Conver % epi parameters to proportions
+        self.epi_pars[CONST.EPI_INITIAL_PREV   ] *= 0.01
+        self.epi_pars[CONST.EPI_TRANSMIT_F2M   ] *= 0.01
+        self.epi_pars[CONST.EPI_EFFECT_VMMC    ] *= 0.01
+        self.epi_pars[CONST.EPI_EFFECT_CONDOM  ] *= 0.01
+        self.epi_pars[CONST.EPI_ART_MORT_WEIGHT] *= 0.01
+
+        self.year_first = cfg_opts[CONST.CFG_FIRST_YEAR]
+        self.year_final = cfg_opts[CONST.CFG_FINAL_YEAR]
+        self.likelihood_par = dict(inputs['likelihood'])
+
+    def _init_engine_inputs(self, inputs, changed=None):
+        """! Set model inputs from raw inputs and pass them to the calculation engine
+        @param inputs a dict of raw inputs as returned by goals_utils.xlsx_load_inputs
+        @param changed names of raw inputs that changed since the engine last received them, or
+        None to pass every input. If not None, arrays shared with the calculation engine are
+        updated in place, and tracked inputs (see sync_inputs) are left for sync_inputs to pass.
+        Tracked inputs are always reset from raw inputs, since they may have been modified.
+        """
+        cfg_opts = inputs['config']
+        year_range = range(0, self.year_final - self.year_first + 1)
+        reinit = changed is not None
+        def need(*keys):
+            return not reinit or not changed.isdisjoint(keys)
 
-        med_age_debut, med_age_union, avg_dur_union, kp_size, kp_stay, kp_turnover = Utils.xlsx_load_popsize(wb[CONST.XLSX_TAB_POPSIZE])
-        self._initialize_population_sizes(med_age_debut, med_age_union, avg_dur_union, kp_size, kp_stay, kp_turnover)
+        if need('med_age_debut', 'med_age_union', 'avg_dur_union', 'kp_size', 'kp_stay', 'kp_turnover'):
+            self._initialize_population_sizes(inputs['med_age_debut'], inputs['med_age_union'], inputs['avg_dur_union'],
+                                              inputs['kp_size'], inputs['kp_stay'], inputs['kp_turnover'])
 
-        if not cfg_opts[CONST.CFG_USE_UPD_PASFRS]:
-            pasfrs = Utils.xlsx_load_pasfrs(wb[CONST.XLSX_TAB_PASFRS])
-            self._proj.init_pasfrs_from_5yr(pasfrs[year_range,:])
+        if not cfg_opts[CONST.CFG_USE_UPD_PASFRS] and need('pasfrs'):
+            self._proj.init_pasfrs_from_5yr(inputs['pasfrs'][year_range,:])
 
-        if not cfg_opts[CONST.CFG_USE_UPD_MIGR]:
-            migr_net, migr_dist_m, migr_dist_f = Utils.xlsx_load_migr(wb[CONST.XLSX_TAB_MIGR])
-            self._proj.init_migr_from_5yr(migr_net[year_range,:], migr_dist_f[year_range,:], migr_dist_m[year_range,:])
+        if not cfg_opts[CONST.CFG_USE_UPD_MIGR] and need('migr_net', 'migr_dist_f', 'migr_dist_m'):
+            self._proj.init_migr_from_5yr(inputs['migr_net'][year_range,:], inputs['migr_dist_f'][year_range,:], inputs['migr_dist_m'][year_range,:])
 
-        self._proj.init_effect_vmmc(self.epi_pars[CONST.EPI_EFFECT_VMMC])
-        self._proj.init_effect_condom(self.epi_pars[CONST.EPI_EFFECT_CONDOM])
+        if need('epi'):
+            self._proj.init_effect_vmmc(self.epi_pars[CONST.EPI_EFFECT_VMMC])
+            self._proj.init_effect_condom(self.epi_pars[CONST.EPI_EFFECT_CONDOM])
         if cfg_opts[CONST.CFG_USE_DIRECT_INCI]:
-            inci, sirr, airr_m, airr_f, rirr_m, rirr_f = Utils.xlsx_load_inci(wb[CONST.XLSX_TAB_INCI])
-            self._proj.use_direct_incidence(True)
-            self._proj.init_direct_incidence(0.01 * inci[year_range], sirr[year_range], airr_f[year_range,:], airr_m[year_range,:], rirr_f[year_range,:], rirr_m[year_range,:])
+            if not reinit:
+                self._proj.use_direct_incidence(True)
+            if need('inci', 'sirr', 'airr_f', 'airr_m', 'rirr_f', 'rirr_m'):
+                self._proj.init_direct_incidence(0.01 * inputs['inci'][year_range], inputs['sirr'][year_range],
+                                                 inputs['airr_f'][year_range,:], inputs['airr_m'][year_range,:],
+                                                 inputs['rirr_f'][year_range,:], inputs['rirr_m'][year_range,:])
         else:
-            self.partner_time_trend, self.partner_age_params, self.partner_pop_ratios = Utils.xlsx_load_partner_rates(wb[CONST.XLSX_TAB_PARTNER])
-            age_prefs, pop_prefs, self.p_married = Utils.xlsx_load_partner_prefs(wb[CONST.XLSX_TAB_PARTNER])
-            mix_raw = Utils.xlsx_load_mixing_levels(wb[CONST.XLSX_TAB_MIXNG_MATRIX])
-            self.sex_acts, condom_freq, self.pwid_force, needle_sharing = Utils.xlsx_load_contact_params(wb[CONST.XLSX_TAB_CONTACT])
-            self.partner_rate = self.calc_partner_rates(self.partner_time_trend, self.partner_age_params, self.partner_pop_ratios)
-            self.age_mixing = self.calc_partner_prefs(age_prefs)
-            self.pop_assort = self.calc_pop_assort(pop_prefs)
-            self.mix_levels = self.calc_mix_levels(mix_raw)
-            self.condom_freq = 0.01 * condom_freq
-            self.needle_sharing = 0.01 * needle_sharing
-            self.p_married = 0.01 * np.array([self.p_married[CONST.SEX_FEMALE, CONST.POP_PWID - CONST.POP_KEY_MIN],
-                                              self.p_married[CONST.SEX_MALE,   CONST.POP_PWID - CONST.POP_KEY_MIN],
-                                              self.p_married[CONST.SEX_FEMALE, CONST.POP_FSW  - CONST.POP_KEY_MIN],
-                                              self.p_married[CONST.SEX_MALE,   CONST.POP_CSW  - CONST.POP_KEY_MIN],
-                                              self.p_married[CONST.SEX_MALE,   CONST.POP_MSM  - CONST.POP_KEY_MIN],
-                                              self.p_married[CONST.SEX_FEMALE, CONST.POP_TGW  - CONST.POP_KEY_MIN]])            
-            sti_trend, sti_age = Utils.xlsx_load_sti_prev(wb[CONST.XLSX_TAB_STIPREV])
-            self.sti_prev = self.calc_sti_prev(sti_trend, sti_age)
-            
+            # Arrays shared with the calculation engine are overwritten in place on
+            # re-initialization so that the engine keeps using the model's storage.
+            def set_shared(name, value):
+                if reinit:
+                    getattr(self, name)[...] = value
+                else:
+                    setattr(self, name, value)
+
+            self.partner_time_trend = inputs['partner_time_trend'].copy()
+            self.partner_age_params = inputs['partner_age_params'].copy()
+            self.partner_pop_ratios = inputs['partner_pop_ratios'].copy()
+            self.sex_acts = inputs['sex_acts'].copy()
+            set_shared('partner_rate', self.calc_partner_rates(self.partner_time_trend, self.partner_age_params, self.partner_pop_ratios))
+            set_shared('age_mixing', self.calc_partner_prefs(inputs['age_prefs']))
+            set_shared('pop_assort', self.calc_pop_assort(inputs['pop_prefs']))
+            self.mix_levels = self.calc_mix_levels(inputs['mix_levels'])
+            self.condom_freq = 0.01 * inputs['condom_freq']
+            p_married = inputs['p_married']
+            self.p_married = 0.01 * np.array([p_married[CONST.SEX_FEMALE, CONST.POP_PWID - CONST.POP_KEY_MIN],
+                                              p_married[CONST.SEX_MALE,   CONST.POP_PWID - CONST.POP_KEY_MIN],
+                                              p_married[CONST.SEX_FEMALE, CONST.POP_FSW  - CONST.POP_KEY_MIN],
+                                              p_married[CONST.SEX_MALE,   CONST.POP_CSW  - CONST.POP_KEY_MIN],
+                                              p_married[CONST.SEX_MALE,   CONST.POP_MSM  - CONST.POP_KEY_MIN],
+                                              p_married[CONST.SEX_FEMALE, CONST.POP_TGW  - CONST.POP_KEY_MIN]])
+            self.sti_prev = self.calc_sti_prev(inputs['sti_trend'], inputs['sti_age'])
+
             # Resize arrays before sharing memory with the calculation engine, otherwise
             # modifying self.pwid_force or self.needle_sharing won't change the inputs
             # the calculation engine uses.
-            self.pwid_force = self.pwid_force[year_range,:]
-            self.needle_sharing = self.needle_sharing[year_range]
-
-            self._proj.share_input_partner_rate(self.partner_rate)
-            self._proj.share_input_age_mixing(self.age_mixing)
-            self._proj.share_input_pop_assort(self.pop_assort)
-            self._proj.share_input_pwid_risk(self.pwid_force, self.needle_sharing)
-            self._proj.use_direct_incidence(False)
-            self._proj.init_epidemic_seed(self.epi_pars[CONST.EPI_INITIAL_YEAR] - self.year_first, self.epi_pars[CONST.EPI_INITIAL_PREV])
-            self._proj.init_transmission(
-                self.epi_pars[CONST.EPI_TRANSMIT_F2M],
-                self.epi_pars[CONST.EPI_TRANSMIT_M2F],
-                self.epi_pars[CONST.EPI_TRANSMIT_M2M],
-                self.epi_pars[CONST.EPI_TRANSMIT_PRIMARY],
-                self.epi_pars[CONST.EPI_TRANSMIT_CHRONIC],
-                self.epi_pars[CONST.EPI_TRANSMIT_SYMPTOM],
-                self.epi_pars[CONST.EPI_TRANSMIT_ART_VS],
-                self.epi_pars[CONST.EPI_TRANSMIT_ART_VF],
-                self.epi_pars[CONST.EPI_TRANSMIT_STI_POS],
-                self.epi_pars[CONST.EPI_TRANSMIT_STI_NEG])
-            self._proj.init_keypop_married(self.p_married)
-            self._proj.init_mixing_matrix(self.mix_levels)
-            self._proj.init_sex_acts(self.sex_acts)
-            self._proj.init_condom_freq(self.condom_freq[year_range,:])
-            self._proj.init_sti_prev(self.sti_prev)
-
-        if cfg_opts[CONST.CFG_USE_DIRECT_CLHIV]:
-            direct_clhiv = Utils.xlsx_load_direct_clhiv(wb[CONST.XLSX_TAB_DIRECT_CLHIV])
-            self._proj.init_clhiv_agein(direct_clhiv[year_range,:])
-
-        self.hiv_frr = Utils.xlsx_load_hiv_fert(wb[CONST.XLSX_TAB_HIV_FERT])
-        dist, prog, mort, art1, art2, art3 = Utils.xlsx_load_adult_prog(wb[CONST.XLSX_TAB_ADULT_PROG])
-        art_elig, art_num, art_pct, art_stop, art_mrr, art_vs = Utils.xlsx_load_adult_art(wb[CONST.XLSX_TAB_ADULT_ART])
-        uptake_mc = Utils.xlsx_load_mc_uptake(wb[CONST.XLSX_TAB_MALE_CIRC])
-
-        self.likelihood_par = Utils.xlsx_load_likelihood_pars(wb[CONST.XLSX_TAB_LIKELIHOOD])
-
-        frr_age = self.hiv_frr['age'] * self.hiv_frr['laf']
-        frr_art = self.hiv_frr['art'] * self.hiv_frr['laf']
-        self._proj.init_hiv_fertility(frr_age[year_range,:], self.hiv_frr['cd4'], frr_art)
-        self._proj.init_adult_prog_from_10yr(0.01 * dist, prog, mort)
-        self._proj.init_adult_art_mort_from_10yr(art1, art2, art3, art_mrr[year_range,:])
-        self._proj.init_adult_art_eligibility(art_elig[year_range])
-        self._proj.init_adult_art_curr(art_num[year_range,:], 0.01 * art_pct[year_range,:])
-        self._proj.init_adult_art_allocation(self.epi_pars[CONST.EPI_ART_MORT_WEIGHT])
-        self._proj.init_adult_art_interruption(-np.log(1.0 - 0.01 * art_stop[year_range,:])) # convert %/year to an event rate
-        self._proj.init_adult_art_suppressed(0.01 * art_vs[year_range,:])
-
-        self._proj.init_male_circumcision_uptake(uptake_mc[year_range,:])
-        self._initialized = True
+            set_shared('pwid_force', inputs['pwid_force'][year_range,:])
+            set_shared('needle_sharing', 0.01 * inputs['needle_sharing'][year_range])
+
+            if not reinit:
+                self._share_inputs()
+                self._proj.use_direct_incidence(False)
+                self._proj.init_epidemic_seed(self.epi_pars[CONST.EPI_INITIAL_YEAR] - self.year_first, self.epi_pars[CONST.EPI_INITIAL_PREV])
+                self._proj.init_transmission(*[self.epi_pars[key] for key in CONST.EPI_TRANSMISSION])
+                self._proj.init_condom_freq(self.condom_freq[year_range,:])
+                self._proj.init_sti_prev(self.sti_prev)
+            if need('p_married'):
+                self._proj.init_keypop_married(self.p_married)
+            if need('mix_levels'):
+                self._proj.init_mixing_matrix(self.mix_levels)
+            if need('sex_acts'):
+                self._proj.init_sex_acts(self.sex_acts)
+
+        if cfg_opts[CONST.CFG_USE_DIRECT_CLHIV] and need('direct_clhiv'):
+            self._proj.init_clhiv_agein(inputs['direct_clhiv'][year_range,:])
+
+        self.hiv_frr = {'age' : inputs['hiv_frr_age'],
+                        'cd4' : inputs['hiv_frr_cd4'],
+                        'art' : inputs['hiv_frr_art'],
+                        'laf' : inputs['hiv_frr_laf']}
+        dist, prog, mort = inputs['prog_dist'], inputs['prog_rate'], inputs['prog_mort']
+        art1, art2, art3 = inputs['art_mort1'], inputs['art_mort2'], inputs['art_mort3']
+        art_elig = inputs['art_elig']
+        art_stop, art_mrr, art_vs = inputs['art_stop'], inputs['art_mrr'], inputs['art_vs']
+        uptake_mc = inputs['uptake_mc']
+        self.art_num = inputs['art_num'][year_range,:]
+        self.art_prop = 0.01 * inputs['art_pct'][year_range,:]
+
+        if not reinit:
+            frr_age = self.hiv_frr['age'] * self.hiv_frr['laf']
+            frr_art = self.hiv_frr['art'] * self.hiv_frr['laf']
+            self._proj.init_hiv_fertility(frr_age[year_range,:], self.hiv_frr['cd4'], frr_art)
+        if need('prog_dist', 'prog_rate', 'prog_mort'):
+            self._proj.init_adult_prog_from_10yr(0.01 * dist, prog, mort)
+        if need('art_mort1', 'art_mort2', 'art_mort3', 'art_mrr'):
+            self._proj.init_adult_art_mort_from_10yr(art1, art2, art3, art_mrr[year_range,:])
+        if need('art_elig'):
+            self._proj.init_adult_art_eligibility(art_elig[year_range])
+        if not reinit:
+            self._proj.init_adult_art_curr(self.art_num, self.art_prop)
+        if need('epi'):
+            self._proj.init_adult_art_allocation(self.epi_pars[CONST.EPI_ART_MORT_WEIGHT])
+        if need('art_stop'):
+            self._proj.init_adult_art_interruption(-np.log(1.0 - 0.01 * art_stop[year_range,:])) # convert %/year to an event rate
+        if need('art_vs'):
+            self._proj.init_adult_art_suppressed(0.01 * art_vs[year_range,:])
+
+        if need('uptake_mc'):
+            self._proj.init_male_circumcision_uptake(uptake_mc[year_range,:])
+
+    def _share_outputs(self):
+        """! Pass output storage to the calculation engine"""
+        self._proj.share_output_population(self.pop_adult_neg, self.pop_adult_hiv, self.pop_child_neg, self.pop_child_hiv)
+        self._proj.share_output_births(self.births)
+        self._proj.share_output_deaths(self.deaths_adult_neg, self.deaths_adult_hiv, self.deaths_child_neg, self.deaths_child_hiv)
+        self._proj.share_output_new_infections(self.new_infections)
+        self._proj.share_output_births_exposed(self.births_exposed)
 
-        wb.close()
+    def _share_inputs(self):
+        """! Pass input storage to the calculation engine. Only used when incidence is calculated mechanistically"""
+        self._proj.share_input_partner_rate(self.partner_rate)
+        self._proj.share_input_age_mixing(self.age_mixing)
+        self._proj.share_input_pop_assort(self.pop_assort)
+        self._proj.share_input_pwid_risk(self.pwid_force, self.needle_sharing)
+
+    def fork(self):
+        """! Create an independent copy of this model, including its inputs, outputs and calculation state
+        @return a new model with this model's outputs. Projecting the new model resumes from this model's
+        last valid year if the calculation engine can be copied (see goals_proj.enable_projection_copies),
+        and from the first year otherwise
+        @details Changing the copy's inputs or projecting it does not affect this model, and vice versa.
+        If the calculation engine cannot be copied, the copy's engine is initialized from the raw inputs
+        this model was initialized from, then passed this model's current inputs. Inputs changed through
+        the calculation engine directly are not copied in that case.
+        """
+        other = type(self)()
+        skip = set(other.__dict__) | set(self._output_names) | {'_proj', '_raw_inputs'}
+        state = copy.deepcopy({key : val for key, val in self.__dict__.items() if key not in skip})
+        other.__dict__.update(state)
+        other._raw_inputs = self._raw_inputs # raw inputs are not modified, so they can be shared
+        for name in self._output_names:
+            array = other._alloc_output(name, getattr(self, name).shape)
+            array[...] = getattr(self, name)
+            setattr(other, name, array)
+
+        other._initialized = self._initialized
+        other._projected = self._projected
+        other._dirty = self._dirty
+        copied = Goals.projection_copies_enabled()
+        if copied:
+            other._proj = self._proj.clone()
+            other._synced = copy.deepcopy(self._synced)
+        else:
+            other._proj = Goals.Projection(self.year_first, self.year_final)
+            other._proj.initialize(self._raw_inputs['config'][CONST.CFG_UPD_NAME])
+            other._init_engine_inputs(self._raw_inputs)
+            other._synced = other._tracked_inputs()
+
+            # Restore this model's inputs, which _init_engine_inputs reset, and pass
+            # the ones that differ. The next projection recalculates from the first year.
+            other.__dict__.update(copy.deepcopy(state))
+        other._share_outputs()
+        if not self._direct_incidence:
+            other._share_inputs()
+        if not copied:
+            other.sync_inputs()
+            other.mark_dirty()
+        return other
+
+    def checkpoint(self, year):
+        """! Project through a given year, then save the projection state in that year
+        @param year the checkpoint year
+        @return a model valid through year. Call fork() on it to create models that share
+        the projection through year and resume from there (e.g., to run scenarios that
+        differ only after year). Forks only resume from year if the calculation engine
+        can be copied (see fork)
+        @details If this model has been projected past year, it is not reprojected.
+        """
+        self.project(year)
+        base = self.fork()
+        if base.last_valid_year() > year:
+            base.invalidate(year)
+        return base
+
+    def _alloc_output(self, name, shape):
+        """! Allocate a zero-filled output array that will be shared with the calculation engine.
+        Subclasses can override this to place outputs in other kinds of memory.
+        @param name the name of the Model attribute that will store the array
+        @param shape the array shape
+        """
+        return np.zeros(shape, dtype=self._dtype, order=self._order)
 
-    def project(self, year_stop):
+    def project(self, year_stop, inputs=None, callback=None):
         """! Calculate the projection from the first year to the requested final year. The
         projection must be initialized (e.g., via init_from_xlsx) and the year_final must
         not exceed 
+        @param inputs names of tracked inputs that may have changed since the last projection
+        (see sync_inputs). None checks all tracked inputs.
+        @param callback optional function callback(year, outputs) called after each year is
+        projected, with outputs as in year_outputs. If it returns False, projection stops after
+        that year and last_valid_year() reports the last year projected.
+        @details Changes to tracked inputs are passed to the calculation engine first. The
+        projection resumes from the earliest year those changes affect, and is skipped if it
+        is already valid through year_stop.
+        """
+        if callback is not None:
+            for year, outputs in self.project_years(year_stop, inputs):
+                if callback(year, outputs) is False:
+                    break
+            return
+
+        self._prepare_projection(inputs)
+        if year_stop > self._projected:
+            year_start = max(self._projected + 1, self.year_first)
+            self._proj.project(year_stop)
+            self._year_version[(year_start - self.year_first):(year_stop - self.year_first + 1)] += 1
+            self._projected = year_stop
+
+    def project_years(self, year_stop, inputs=None):
+        """! Calculate the projection one year at a time
+        @param year_stop the last year to project
+        @param inputs names of tracked inputs that may have changed, as in project
+        @return a generator that yields (year, outputs) after each year is projected, with outputs as
+        in year_outputs. Stopping iteration early leaves the projection valid through the last year yielded.
+        @details The calculation engine resumes from the last calculated year, so stepping
+        through years gives the same results as projecting through year_stop at once.
+        Inputs should not be modified until iteration finishes.
+        """
+        self._prepare_projection(inputs)
+        for year in range(max(self._projected + 1, self.year_first), year_stop + 1):
+            self._proj.project(year)
+            self._year_version[year - self.year_first] += 1
+            self._projected = year
+            yield year, self.year_outputs(year)
+
+    def year_outputs(self, year):
+        """! Return read-only views of one year of every output array
+        @param year a calendar year
+        @return a dict from output names (e.g., 'pop_adult_hiv') to arrays without the year dimension
+        """
+        outputs = {}
+        for name in self._output_names:
+            view = getattr(self, name)[year - self.year_first]
+            if isinstance(view, np.ndarray):
+                view = view.view()
+                view.flags.writeable = False
+            outputs[name] = view
+        return outputs
+
+    def _prepare_projection(self, inputs):
+        """! Pass changed inputs to the calculation engine and invalidate the years they affect"""
+        self.sync_inputs(inputs)
+        if self._dirty is not None:
+            self.invalidate(self._dirty - 1 if self._dirty > self.year_first else -1)
+            self._dirty = None
+
+    def mark_dirty(self, year=None):
+        """! Record that inputs affecting projections from a given year onward have changed.
+        Call this after changing inputs through the calculation engine directly.
+        @param year the earliest affected year. None means the first year of projection
+        """
+        year = self.year_first if year is None else max(int(year), self.year_first)
+        self._dirty = year if self._dirty is None else min(self._dirty, year)
+
+    def sync_inputs(self, inputs=None):
+        """! Pass modified inputs to the calculation engine and record the earliest year they affect
+        @param inputs names of tracked inputs to check for changes. None checks all tracked inputs.
+        Callers that know which inputs they modify can pass them here to skip the other checks.
+        @details Tracked inputs are 'seed' and 'transmission' (the epidemic seed and transmission
+        parameters in epi_pars), 'partner_time_trend', 'partner_age_params', 'partner_pop_ratios',
+        'partner_rate', 'pop_assort', 'pwid_force', 'needle_sharing', 'sti_prev', 'condom_freq',
+        'frr_age', 'frr_cd4', 'frr_art' (from hiv_frr), and 'art_num' and 'art_prop' (adults
+        on ART by year as numbers and proportions). Tracked inputs can be modified in place and
+        are passed to the calculation engine only when they change. Other members of epi_pars
+        and likelihood_par do not affect projections. HIV is absent before the epidemic seed
+        year, so inputs that only influence transmission, HIV-related fertility or ART do not
+        affect earlier years.
         """
-        self._proj.project(year_stop)
-        self._projected = year_stop
+        old = self._synced
+        if inputs is None:
+            keys = old.keys()
+        else:
+            # Changes to partner rate parameters are checked by their effect on partner_rate,
+            # and the seed year is needed to find affected years.
+            keys = set(inputs) | {'seed'}
+            if keys & {'partner_time_trend', 'partner_age_params', 'partner_pop_ratios'}:
+                keys.add('partner_rate')
+            keys = [key for key in keys if key in old]
+        fresh = self._tracked_inputs(keys)
+        changed = {key for key in fresh if not np.array_equal(fresh[key], old[key], equal_nan=True)}
+        if not changed:
+            return
+        new = old | fresh
+
+        if not self._direct_incidence:
+            # Track the earlier of the old and new seed years so that moving the seed
+            # later still invalidates years that used to include HIV
+            hiv_start = int(min(old['seed'][0], new['seed'][0]))
+            if 'seed' in changed:
+                self._proj.init_epidemic_seed(self.epi_pars[CONST.EPI_INITIAL_YEAR] - self.year_first, self.epi_pars[CONST.EPI_INITIAL_PREV])
+                self.mark_dirty(hiv_start)
+            if 'transmission' in changed:
+                self._proj.init_transmission(*new['transmission'])
+                self.mark_dirty(hiv_start)
+            if changed & {'partner_time_trend', 'partner_age_params', 'partner_pop_ratios'}:
+                self.calc_partner_rates(self.partner_time_trend, self.partner_age_params, self.partner_pop_ratios, out=self.partner_rate)
+                new['partner_rate'] = self.partner_rate.copy()
+                if not np.array_equal(new['partner_rate'], old['partner_rate'], equal_nan=True):
+                    changed.add('partner_rate')
+            if 'pop_assort' in changed:
+                self.mark_dirty(hiv_start)
+            if 'sti_prev' in changed:
+                self._proj.init_sti_prev(new['sti_prev'])
+            if 'condom_freq' in changed:
+                self._proj.init_condom_freq(new['condom_freq'][0:(self.year_final - self.year_first + 1),:])
+            for key in ['partner_rate', 'pwid_force', 'needle_sharing', 'sti_prev', 'condom_freq']:
+                if key in changed:
+                    self.mark_dirty(max(hiv_start, self._first_change(old[key], new[key])))
+        else:
+            hiv_start = self.year_first
+
+        if changed & {'frr_age', 'frr_cd4', 'frr_art'}:
+            self._proj.init_hiv_fertility(new['frr_age'], new['frr_cd4'], new['frr_art'])
+            if changed & {'frr_cd4', 'frr_art'}:
+                self.mark_dirty(hiv_start)
+            else:
+                self.mark_dirty(max(hiv_start, self._first_change(old['frr_age'], new['frr_age'])))
+
+        art_changed = changed & {'art_num', 'art_prop'}
+        if art_changed:
+            self._proj.init_adult_art_curr(new['art_num'], new['art_prop'])
+            self.mark_dirty(max(hiv_start, min([self._first_change(old[key], new[key]) for key in art_changed])))
+
+        self._synced = new
+
+    def _tracked_inputs(self, keys=None):
+        """! Copy the current values of inputs that sync_inputs passes to the calculation engine
+        @param keys names of inputs to copy. None copies all tracked inputs.
+        """
+        if keys is None:
+            keys = ['frr_age', 'frr_cd4', 'frr_art', 'art_num', 'art_prop']
+            if not self._direct_incidence:
+                keys += ['seed', 'transmission', 'partner_time_trend', 'partner_age_params', 'partner_pop_ratios',
+                         'partner_rate', 'pop_assort', 'pwid_force', 'needle_sharing', 'sti_prev', 'condom_freq']
+        return {key : self._tracked_value(key) for key in keys}
+
+    def _tracked_value(self, key):
+        match key:
+            case 'seed':
+                return np.array([self.epi_pars[CONST.EPI_INITIAL_YEAR], self.epi_pars[CONST.EPI_INITIAL_PREV]])
+            case 'transmission':
+                return np.array([self.epi_pars[key] for key in CONST.EPI_TRANSMISSION])
+            case 'frr_age':
+                return (self.hiv_frr['age'] * self.hiv_frr['laf'])[0:(self.year_final - self.year_first + 1),:]
+            case 'frr_cd4':
+                return np.copy(self.hiv_frr['cd4'])
+            case 'frr_art':
+                return self.hiv_frr['art'] * self.hiv_frr['laf']
+            case _:
+                return getattr(self, key).copy()
+
+    def _first_change(self, old, new):
+        """! Return the first year in which two arrays indexed by year differ"""
+        diff = (old != new).reshape((old.shape[0], -1)).any(axis=1)
+        return self.year_first + int(np.argmax(diff))
+
+    def batch_inputs(self, num_sets):
+        """! Create inputs for project_batch by stacking copies of the model's current inputs
+        @param num_sets number of input sets
+        @return a dict of stacked inputs that callers can modify before passing to project_batch
+        @details Batches require mechanistic incidence calculations, so this raises ValueError
+        if the model uses direct incidence inputs.
+        """
+        if self._direct_incidence:
+            raise ValueError('Batched projections need mechanistic incidence, but this model uses direct incidence inputs')
+        transmission = np.array([self.epi_pars[key] for key in CONST.EPI_TRANSMISSION], dtype=self._dtype)
+        return {'partner_rate' : np.repeat(self.partner_rate[np.newaxis], num_sets, axis=0),
+                'pop_assort'   : np.repeat(self.pop_assort[np.newaxis], num_sets, axis=0),
+                'pwid_force'   : np.repeat(self.pwid_force[np.newaxis], num_sets, axis=0),
+                'transmission' : np.repeat(transmission[np.newaxis], num_sets, axis=0),
+                'seed_prev'    : np.full(num_sets, self.epi_pars[CONST.EPI_INITIAL_PREV], dtype=self._dtype)}
+
+    def project_batch(self, year_stop, inputs):
+        """! Calculate projections for several sets of inputs in one call to the calculation engine
+        @param year_stop the last year to project
+        @param inputs a dict of stacked inputs, as returned by batch_inputs
+        @return a dict of stacked outputs by input set. Keys match the names of Model output arrays
+        @details Only partner rates, assortativity, PWID force of infection, transmission
+        parameters and seed prevalence may vary between sets. This method does not change the
+        model's own inputs or outputs, but the next call to project will start from the first year.
+        """
+        num_sets = len(inputs['seed_prev'])
+        outputs = {name : np.zeros((num_sets,) + getattr(self, name).shape, dtype=self._dtype, order=self._order) for name in self._output_names}
+        batch = {key : np.ascontiguousarray(val, dtype=self._dtype) for key, val in inputs.items()}
+        self._proj.project_batch(year_stop,
+                                 batch['partner_rate'],
+                                 batch['pop_assort'],
+                                 batch['pwid_force'],
+                                 batch['transmission'],
+                                 batch['seed_prev'],
+                                 outputs['pop_adult_neg'], outputs['pop_adult_hiv'], outputs['pop_child_neg'], outputs['pop_child_hiv'],
+                                 outputs['births'],
+                                 outputs['deaths_adult_neg'], outputs['deaths_adult_hiv'], outputs['deaths_child_neg'], outputs['deaths_child_hiv'],
+                                 outputs['new_infections'],
+                                 outputs['births_exposed'])
+        self._projected = -1
+
+        ## The engine keeps the final set's transmission parameters, so restore ours
+        self._proj.init_transmission(*[self.epi_pars[key] for key in CONST.EPI_TRANSMISSION])
+        self._proj.init_epidemic_seed(self.epi_pars[CONST.EPI_INITIAL_YEAR] - self.year_first, self.epi_pars[CONST.EPI_INITIAL_PREV])
+        return outputs
 
     def invalidate(self, year):
         """! Invalidate projections from a given year onward. Call this after project(year_stop) if
@@ -199,94 +669,53 @@ class Model:
         self._proj.init_mean_duration_union(avg_dur_union)
         self._proj.init_keypop_size_params(0.01 * kp_size, kp_stay, kp_turnover)
 
-    def calc_partner_rates(self, time_trend, age_params, pop_ratios):
+    def calc_partner_rates(self, time_trend, age_params, pop_ratios, out=None):
         """! Calculate partnership rates by year, sex, age, and behavioral risk group
         @param time_trend lifetime partnership-years by sex and year
         @param age_params beta distribution mean and size parameters that specify partner rates by age
         @param pop_params rate ratios by behavioral risk group, excluding the sexually naive group
+        @param out optional array to store rates in (e.g., self.partner_rate), so that no output array is allocated
+        @return partner rates, stored in out if given
         """
-        
-        ## Calculate age-specific rate ratios from age_params
-        age_ratios = np.zeros((CONST.N_SEX, CONST.N_AGE_ADULT), dtype=self._dtype, order=self._order)
-        raw_ages = np.array(range(CONST.AGE_ADULT_MIN, CONST.AGE_ADULT_MAX + 1))
-        std_ages = (raw_ages - CONST.AGE_ADULT_MIN) / (CONST.AGE_ADULT_MAX - CONST.AGE_ADULT_MIN)
-        for s in [CONST.SEX_FEMALE, CONST.SEX_MALE]: # not idiomatic...
-            raw_mean = age_params[0,s]
-            std_mean = (raw_mean - CONST.AGE_ADULT_MIN) / (CONST.AGE_ADULT_MAX - CONST.AGE_ADULT_MIN)
-            dist = sp.stats.beta(age_params[1,s] * std_mean, age_params[1,s] * (1.0 - std_mean))
-
-            ## This intentionally excludes CONST.AGE_ADULT_MAX so that its age_ratio is 0
-            age_ratios[s,0:(CONST.N_AGE_ADULT - 1)] = np.diff(dist.cdf(std_ages))
-
-        ## Calculate the full partner rate matrix
         num_yrs = self.year_final - self.year_first + 1
         yr_bgn = self.year_first - CONST.XLSX_FIRST_YEAR
         yr_end = self.year_final - CONST.XLSX_FIRST_YEAR + 1
-        partner_rate = np.zeros((num_yrs, CONST.N_SEX, CONST.N_AGE_ADULT, CONST.N_POP), dtype=self._dtype, order=self._order)
+        if out is None:
+            out = np.zeros((num_yrs, CONST.N_SEX, CONST.N_AGE_ADULT, CONST.N_POP), dtype=self._dtype, order=self._order)
+
+        ## Calculate age-specific rate ratios from age_params as differences of beta
+        ## distribution CDFs, for both sexes at once. This intentionally excludes
+        ## CONST.AGE_ADULT_MAX so that its age_ratio is 0
+        std_ages = (np.arange(CONST.AGE_ADULT_MIN, CONST.AGE_ADULT_MAX + 1) - CONST.AGE_ADULT_MIN) / (CONST.AGE_ADULT_MAX - CONST.AGE_ADULT_MIN)
+        std_mean = (age_params[0,0:CONST.N_SEX] - CONST.AGE_ADULT_MIN) / (CONST.AGE_ADULT_MAX - CONST.AGE_ADULT_MIN)
+        size = age_params[1,0:CONST.N_SEX]
+        cdf = sp.special.betainc((size * std_mean)[:,None], (size * (1.0 - std_mean))[:,None], std_ages[None,:])
+        age_ratios = np.zeros((CONST.N_SEX, CONST.N_AGE_ADULT), dtype=self._dtype)
+        age_ratios[:,0:(CONST.N_AGE_ADULT - 1)] = np.diff(cdf, axis=1)
 
         ## Reorganize pop_ratios to include sexually inactive people and to map gender
         ## identity to assigned sex at birth
-        pop_ratios_aug = np.zeros((CONST.N_POP, CONST.N_SEX), dtype=self._dtype, order=self._order)
-        pop_ratios_aug[CONST.POP_NEVER:(CONST.POP_FSW+1), CONST.SEX_FEMALE] = pop_ratios[0:5, CONST.SEX_FEMALE]
-        pop_ratios_aug[CONST.POP_NEVER:(CONST.POP_MSM+1), CONST.SEX_MALE  ] = pop_ratios[0:6, CONST.SEX_MALE  ] 
-        pop_ratios_aug[CONST.POP_TGW, CONST.SEX_MALE] = pop_ratios[6, CONST.SEX_FEMALE]
-
-        # ## Loop variant (readable)
-        # for s in range(CONST.N_SEX):
-        #     for a in range(CONST.N_AGE_ADULT):
-        #         for r in range(CONST.N_POP):
-        #             partner_rate[:,s,a,r] = time_trend[s,yr_bgn:yr_end] * age_ratios[s,a] * pop_ratios_aug[r,s]
-
-        ## Vectorized variant (much faster)
-        partner_rate = np.zeros((num_yrs, CONST.N_SEX, CONST.N_AGE_ADULT, CONST.N_POP), dtype=self._dtype, order=self._order)
-        for s in range(CONST.N_SEX):
-            partner_rate[:,s,:,:] = np.outer(time_trend[s,yr_bgn:yr_end], np.outer(age_ratios[s,:], pop_ratios_aug[:,s])).reshape((num_yrs, CONST.N_AGE_ADULT, CONST.N_POP))
-
-        return partner_rate
+        pop_ratios_aug = np.zeros((CONST.N_SEX, CONST.N_POP), dtype=self._dtype)
+        pop_ratios_aug[CONST.SEX_FEMALE, CONST.POP_NEVER:(CONST.POP_FSW+1)] = pop_ratios[0:5, CONST.SEX_FEMALE]
+        pop_ratios_aug[CONST.SEX_MALE,   CONST.POP_NEVER:(CONST.POP_MSM+1)] = pop_ratios[0:6, CONST.SEX_MALE  ]
+        pop_ratios_aug[CONST.SEX_MALE,   CONST.POP_TGW] = pop_ratios[6, CONST.SEX_FEMALE]
+
+        ## partner_rate[t,s,a,r] = time_trend[s,t] * age_ratios[s,a] * pop_ratios_aug[s,r]
+        np.multiply(time_trend[0:CONST.N_SEX,yr_bgn:yr_end].T[:,:,None,None],
+                    (age_ratios[:,:,None] * pop_ratios_aug[:,None,:])[None,:,:,:], out=out)
+        return out
     
     def calc_partner_prefs(self, age_prefs):
-        ## age differences mean and variance
-        oppo_diff_avg, oppo_diff_var = age_prefs[0], age_prefs[1] # male-female partnerships
-        male_diff_var = age_prefs[2]                              # male-male partnerships
-        mix = np.zeros((CONST.N_SEX, CONST.N_AGE_ADULT, CONST.N_SEX, CONST.N_AGE_ADULT), dtype=self._dtype, order=self._order)
-
-	    ## Use Newton-Raphson to approximate shape and scale parameters of the Fisk
-	    ## distribution given the specified mean and variance.
-        num_iter = 5
-        shift = -10 # assuming negligible partnerships with females who are 10 years older than their male partners
-        m, v = oppo_diff_avg - shift, oppo_diff_var
-        target = m * m / (m * m + v)
-        x = 0.5 * math.pi - target
-        for k in range(num_iter):
-            cot_x = 1.0 / math.tan(x)
-            csc_x = 1.0 / math.sin(x)
-            fx = x * cot_x - target
-            dx = cot_x - x * csc_x * csc_x
-            x = x - fx / dx
-
-        shape = math.pi / x
-        scale = m * math.sin(x) / x
-        oppo_dist = sp.stats.fisk(shape, shift, scale)
-        same_dist = sp.stats.norm(0.0, math.sqrt(male_diff_var))
-        
-        ## This could be vectorized for speed. Beware Brian Kernighan's debugging insight.
-        ## Calculate unnormalized mixing preferences 
-        oppo_raw = np.zeros((CONST.N_AGE_ADULT, CONST.N_AGE_ADULT), dtype=self._dtype, order=self._order)
-        same_raw = np.zeros((CONST.N_AGE_ADULT, CONST.N_AGE_ADULT), dtype=self._dtype, order=self._order)
-        for a in range(CONST.AGE_ADULT_MIN, CONST.AGE_ADULT_MAX): # intentionally omits the 80+ age group
-            b = a - CONST.AGE_ADULT_MIN
-            min_age_diff = CONST.AGE_ADULT_MIN - a
-            max_age_diff = CONST.AGE_ADULT_MAX - a
-            oppo_raw[b,:-1] = np.diff(oppo_dist.cdf(range(min_age_diff, max_age_diff + 1)))
-            same_raw[b,:-1] = np.diff(same_dist.cdf(range(min_age_diff, max_age_diff + 1)))
-
-        ## Fill in normalized mixing matrix. This could be vectorized further
-        for b in range(CONST.N_AGE_ADULT - 1):
-            mix[CONST.SEX_FEMALE, b, CONST.SEX_MALE,   :] = oppo_raw[b,:] / oppo_raw[b,:].sum()
-            mix[CONST.SEX_MALE,   b, CONST.SEX_FEMALE, :] = oppo_raw[:,b] / oppo_raw[:,b].sum()
-            mix[CONST.SEX_MALE,   b, CONST.SEX_MALE,   :] = same_raw[b,:] / same_raw[b,:].sum()
-        
-        return mix
+        """! Calculate partner age mixing preferences
+        @param age_prefs mean and variance of age differences in male-female partnerships, and
+        variance of age differences in male-male partnerships. Any shape with three elements is
+        accepted, such as the (3,1) array read from Excel
+        @return mixing matrix by sex and age of each partner (see goals_proj share_input_age_mixing)
+        @details Results are cached by age_prefs, so repeated calls with the same preferences are cheap.
+        """
+        prefs = np.asarray(age_prefs, dtype=float).ravel()
+        mix = calc_partner_prefs_cached(prefs[0], prefs[1], prefs[2])
+        return np.array(mix, dtype=self._dtype, order=self._order)
     
     def calc_pop_assort(self, pop_prefs):
         """"! Convert raw assortativity inputs from Excel into usable inputs by converting
@@ -317,28 +746,42 @@ class Model:
 
         return mix.reshape((CONST.N_SEX, CONST.N_POP, CONST.N_SEX, CONST.N_POP))
 
-    def calc_sti_prev(self, sti_trend, sti_age):
-        """! Calculate STI prevalence inputs from input trends and age patterns """
+    def calc_sti_prev(self, sti_trend, sti_age, out=None):
+        """! Calculate STI prevalence inputs from input trends and age patterns
+        @param sti_trend STI prevalence by year, sex and population at the reference age 27.5
+        @param sti_age beta distribution mean and size parameters of STI prevalence age patterns by sex and population
+        @param out optional array to store STI prevalence in (e.g., self.sti_prev), so that no output array is allocated
+        @return STI prevalence by year, sex, age and population, stored in out if given
+        """
         n_years = self.year_final - self.year_first + 1
         yr_bgn = self.year_first - CONST.XLSX_FIRST_YEAR
         yr_end = self.year_final - CONST.XLSX_FIRST_YEAR + 1
+        if out is None:
+            out = np.zeros((n_years, CONST.N_SEX, CONST.N_AGE_ADULT, CONST.N_POP), dtype=self._dtype, order=self._order)
+        else:
+            out[:,:,CONST.N_AGE_ADULT-1,:] = 0.0
+            out[:,:,:,0:CONST.POP_NEVER] = 0.0
 
-        sti = np.zeros((n_years, CONST.N_SEX, CONST.N_AGE_ADULT, CONST.N_POP), dtype=self._dtype, order=self._order)
-        scale_age = (np.array(range(CONST.AGE_ADULT_MIN, CONST.AGE_ADULT_MAX)) + 0.5 - 15.0) / (80.0 - 15.0)
+        scale_age = (np.arange(CONST.AGE_ADULT_MIN, CONST.AGE_ADULT_MAX) + 0.5 - 15.0) / (80.0 - 15.0)
         scale_ref = (27.5 - 15.0) / (80 - 15.0)
 
-        for sex in range(CONST.N_SEX):
-            for pop in range(CONST.POP_NEVER, CONST.N_POP):
-                # This will calculate patterns for some populations we don't model
-                # like female MSM, but the code is not on the critical path and
-                # should continue to work if we add or change the number of risk groups.
-                par_mean = (sti_age[sex, pop, 0] - 15.0) / (80.0 - 15.0)
-                par_size = sti_age[sex, pop, 1]
-                dist = sp.stats.beta(1.0 + par_mean * par_size, 1.0 + (1.0 - par_mean) * par_size)
-
-                a_mtx = np.tile(dist.pdf(scale_age) / dist.pdf(scale_ref), (n_years, 1))
-                t_mtx = np.tile(sti_trend[yr_bgn:yr_end,sex,pop], (CONST.N_AGE_ADULT - 1, 1)).transpose()
-
-                sti[:, sex, 0:(CONST.N_AGE_ADULT-1), pop] = t_mtx * a_mtx / (1.0 - t_mtx + t_mtx * a_mtx)
-
-        return sti
+        # Age patterns are ratios of beta densities to the density at the reference age,
+        # calculated for every sex and population at once. This includes some populations
+        # we don't model, like female MSM, so that it continues to work if we add or
+        # change the number of risk groups.
+        par_mean = (sti_age[:, CONST.POP_NEVER:, 0] - 15.0) / (80.0 - 15.0)
+        par_size = sti_age[:, CONST.POP_NEVER:, 1]
+        alpha = (par_mean * par_size)[:,None,:]         # beta shape1 - 1, by sex, age and population
+        beta = ((1.0 - par_mean) * par_size)[:,None,:]  # beta shape2 - 1
+        age_ratio = np.exp(alpha * np.log(scale_age / scale_ref)[None,:,None]
+                           + beta * np.log((1.0 - scale_age) / (1.0 - scale_ref))[None,:,None])
+
+        # trend * ratio / (1 - trend + trend * ratio), evaluated as ratio / (1 + trend * (ratio - 1)) * trend
+        # in place so that no temporary arrays the size of out are needed
+        trend = sti_trend[yr_bgn:yr_end, :, CONST.POP_NEVER:][:,:,None,:]
+        sti = out[:, :, 0:(CONST.N_AGE_ADULT-1), CONST.POP_NEVER:]
+        np.multiply(trend, (age_ratio - 1.0)[None,:,:,:], out=sti)
+        sti += 1.0
+        np.divide(age_ratio[None,:,:,:], sti, out=sti)
+        sti *= trend
+        return out
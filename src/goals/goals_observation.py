@@ -0,0 +1,110 @@
+import numpy as np
+import goals.goals_const as CONST
+
+## Observation plans. Likelihood templates (e.g., from the percussion package)
+## list observations by year, sex, age range and, for prevalence, population.
+## These rows do not change from one projection to the next, so we translate
+## them into index arrays once. Model estimates for every row can then be
+## calculated with a few vectorized reductions: we sum model outputs over
+## HIV states, take cumulative sums over age, and then each row's estimate is
+## a difference of two cumulative sums masked by the row's sexes and populations.
+
+## Map from template population labels to [min, max) population indices
+POP_RANGES = {
+    'All'     : (CONST.POP_MIN,  CONST.POP_MAX  + 1),
+    'FSW'     : (CONST.POP_FSW,  CONST.POP_FSW  + 1),
+    'MSM'     : (CONST.POP_MSM,  CONST.POP_MSM  + 1),
+    'TGW'     : (CONST.POP_TGW,  CONST.POP_TGW  + 1),
+    'PWID'    : (CONST.POP_PWID, CONST.POP_PWID + 1),
+    'Clients' : (CONST.POP_CSW,  CONST.POP_CSW  + 1),
+}
+
+## Map from template gender labels to [min, max) sex and circumcision indices
+SEX_RANGES = {
+    'All'   : (CONST.SEX_MC_MIN, CONST.SEX_MC_MAX + 1),
+    'Women' : (CONST.SEX_FEMALE, CONST.SEX_FEMALE + 1),
+    'Men'   : (CONST.SEX_MALE_U, CONST.SEX_MALE_C + 1),
+}
+
+class ObservationPlan:
+    """! Precomputed indices for calculating adult model estimates that correspond to template rows"""
+
+    def __init__(self, template, year_first, by_population=True):
+        """! Build a plan from an observation template
+        @param template a data frame with Gender, Year, AgeMin and AgeMax columns, and Population if by_population is True
+        @param year_first the first year of projection
+        @param by_population True if rows are restricted to the populations in the template's Population column
+        """
+        year = np.asarray(template['Year'], dtype=int)
+        sex = np.asarray(template['Gender'])
+        pop = np.asarray(template['Population']) if by_population else np.full(len(year), 'All')
+        nobs = len(year)
+
+        # Model outputs are reduced only for years that have observations
+        self.row_years = year - year_first
+        self.years, self._row_year = np.unique(year - year_first, return_inverse=True)
+        self._age_min = np.asarray(template['AgeMin'], dtype=int) - CONST.AGE_ADULT_MIN
+        self._age_max = np.asarray(template['AgeMax'], dtype=int) - CONST.AGE_ADULT_MIN + 1
+
+        self._mask = np.zeros((nobs, CONST.N_SEX_MC, CONST.N_POP))
+        for row in range(nobs):
+            if pop[row] not in POP_RANGES:
+                raise ValueError('Unrecognized population %s' % (pop[row]))
+            if sex[row] not in SEX_RANGES:
+                raise ValueError('Unrecognized gender %s' % (sex[row]))
+            pop_min, pop_max = POP_RANGES[pop[row]]
+            sex_min, sex_max = SEX_RANGES[sex[row]]
+
+            # Model compartments track people by assigned sex at birth to speed up
+            # behavioral risk group dynamics calculations.
+            if pop[row] == 'TGW':
+                sex_min, sex_max = SEX_RANGES['Men']
+
+            self._mask[row, sex_min:sex_max, pop_min:pop_max] = 1.0
+
+    def __len__(self):
+        return self._mask.shape[0]
+
+    def range_sum(self, array):
+        """! Sum an adult model output over each row's sexes, ages and populations
+        @param array a model output indexed by year, sex, age, population, then optionally other dimensions
+        that are summed over (e.g., pop_adult_hiv or deaths_adult_neg)
+        @return a vector with one sum per template row
+        """
+        vals = array[self.years]
+        if vals.ndim > 4:
+            vals = vals.sum(axis=tuple(range(4, vals.ndim)))
+        csum = np.zeros((vals.shape[0], vals.shape[1], vals.shape[2] + 1, vals.shape[3]))
+        np.cumsum(vals, axis=2, out=csum[:,:,1:,:])
+        diff = csum[self._row_year, :, self._age_max, :] - csum[self._row_year, :, self._age_min, :]
+        return np.einsum('isp,isp->i', diff, self._mask)
+
+class PrevalencePlan(ObservationPlan):
+    """! Plan for HIV prevalence estimates (see percussion.hivprev.projection_template)"""
+
+    def __init__(self, template, year_first):
+        super().__init__(template, year_first, by_population=True)
+
+    def evaluate(self, hivsim):
+        """! Calculate HIV prevalence for each template row from a projected model"""
+        pop_hiv = self.range_sum(hivsim.pop_adult_hiv)
+        pop_neg = self.range_sum(hivsim.pop_adult_neg)
+        return pop_hiv / (pop_hiv + pop_neg)
+
+    def fill(self, hivsim, template):
+        """! Store HIV prevalence estimates in the template's Prevalence column"""
+        template['Prevalence'] = self.evaluate(hivsim)
+
+class DeathsPlan(ObservationPlan):
+    """! Plan for all-cause adult deaths estimates (see percussion.alldeaths.projection_template)"""
+
+    def __init__(self, template, year_first):
+        super().__init__(template, year_first, by_population=False)
+
+    def evaluate(self, hivsim):
+        """! Calculate all-cause deaths for each template row from a projected model"""
+        return self.range_sum(hivsim.deaths_adult_hiv) + self.range_sum(hivsim.deaths_adult_neg)
+
+    def fill(self, hivsim, template):
+        """! Store deaths estimates in the template's Deaths column"""
+        template['Deaths'] = self.evaluate(hivsim)
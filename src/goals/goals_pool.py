@@ -0,0 +1,53 @@
+import contextlib
+import threading
+from goals.goals_model import Model
+
+class ModelPool:
+    """! A pool of Goals models that are re-initialized between runs instead of rebuilt
+    @details Models handed out by the pool keep their calculation engine, UPD
+    demography and output storage (see Model.reinit_from_inputs). Idle models
+    whose configuration matches the requested inputs are preferred, since other
+    models must be initialized from scratch. The pool is thread-safe.
+    """
+
+    def __init__(self, model_type=Model):
+        """! Create an empty pool
+        @param model_type the class of models to create (e.g., goals_shared.SharedModel)
+        """
+        self._model_type = model_type
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        """! Number of idle models"""
+        return len(self._idle)
+
+    def acquire(self, inputs):
+        """! Take a model from the pool and initialize it
+        @param inputs a dict of raw inputs as returned by goals_utils.xlsx_load_inputs
+        @return an initialized model. Pass it to release when finished with it
+        """
+        with self._lock:
+            match = [k for k, model in enumerate(self._idle) if model._raw_inputs['config'] == inputs['config']]
+            if match:
+                model = self._idle.pop(match[0])
+            elif self._idle:
+                model = self._idle.pop()
+            else:
+                model = self._model_type()
+        model.reinit_from_inputs(inputs)
+        return model
+
+    def release(self, model):
+        """! Return a model to the pool. The caller must not use it afterward."""
+        with self._lock:
+            self._idle.append(model)
+
+    @contextlib.contextmanager
+    def model(self, inputs):
+        """! Context manager that acquires a model initialized from inputs and releases it on exit"""
+        model = self.acquire(inputs)
+        try:
+            yield model
+        finally:
+            self.release(model)
@@ -0,0 +1,114 @@
+import numpy as np
+import goals.goals_const as CONST
+
+## Output profiles. The calculation engine keeps the state of the population in
+## the model's double-precision output arrays and reads earlier years from them
+## while projecting, so those arrays must keep their full shape and precision.
+## Output profiles reduce outputs when they are stored instead: a profile lists
+## which outputs to keep, which dimensions to sum over, and the precision to
+## store values in. One model can then project many parameter draws and store
+## each draw compactly. For example, float32 storage of every output except
+## deaths, summed over CD4 and ART, takes about 2% of the memory of a model's outputs.
+
+class OutputProfile:
+    """! Selection, reduction and storage precision for retained model outputs"""
+
+    def __init__(self, dtype=np.float32, names=None, drop=(), collapse=()):
+        """! Define a profile
+        @param dtype storage type for output values
+        @param names outputs to keep (see goals_const.OUTPUT_DIMS). Defaults to all outputs
+        @param drop outputs to omit (e.g., CONST.OUTPUT_DEATHS to drop every death array)
+        @param collapse dimension labels to sum over (e.g., ('CD4', 'ART')), either as a list
+        applied to every output that has those dimensions, or as a dict from output names to lists
+        """
+        names = list(CONST.OUTPUT_DIMS.keys()) if names is None else list(names)
+        for name in list(names) + list(drop):
+            if name not in CONST.OUTPUT_DIMS:
+                raise ValueError('Unrecognized output %s' % (name))
+        self.dtype = np.dtype(dtype)
+        self.names = [name for name in names if name not in drop]
+
+        if isinstance(collapse, dict):
+            for name, dims in collapse.items():
+                for dim in dims:
+                    if dim not in CONST.OUTPUT_DIMS[name]:
+                        raise ValueError('%s has no %s dimension' % (name, dim))
+            by_name = collapse
+        else:
+            by_name = {name : collapse for name in self.names}
+        for dims in by_name.values():
+            if 'Year' in dims:
+                raise ValueError('Outputs cannot be summed over years')
+
+        self._axes = {} # output name -> axes summed over
+        self.dims = {}  # output name -> dimension labels kept
+        for name in self.names:
+            labels = CONST.OUTPUT_DIMS[name]
+            summed = [dim for dim in by_name.get(name, ()) if dim in labels]
+            self._axes[name] = tuple(labels.index(dim) for dim in summed)
+            self.dims[name] = [dim for dim in labels if dim not in summed]
+
+    def shape(self, model, name):
+        """! Shape of a stored output for one draw"""
+        shape = getattr(model, name).shape
+        return tuple(size for axis, size in enumerate(shape) if axis not in self._axes[name])
+
+    def nbytes(self, model):
+        """! Memory needed to store one draw of model outputs"""
+        return sum(int(np.prod(self.shape(model, name))) for name in self.names) * self.dtype.itemsize
+
+    def alloc(self, model, num_draws=None):
+        """! Allocate storage for model outputs
+        @param model an initialized Goals model
+        @param num_draws number of draws to store. If None, store a single draw without a draw dimension
+        @return a ProfiledOutputs object with zero-filled arrays
+        """
+        lead = () if num_draws is None else (num_draws,)
+        arrays = {name : np.zeros(lead + self.shape(model, name), dtype=self.dtype) for name in self.names}
+        return ProfiledOutputs(self, arrays, model.year_first, num_draws)
+
+    def store(self, model, outputs, draw=None, year=None):
+        """! Reduce model outputs and copy them into storage
+        @param model a projected Goals model
+        @param outputs storage returned by alloc
+        @param draw the draw to store into. Must be None if and only if outputs has no draw dimension
+        @param year a calendar year to store, or None to store every year. Storing one year at a time
+        works with Model.project_years
+        """
+        if (draw is None) != (outputs.num_draws is None):
+            raise ValueError('draw must be given if and only if outputs store several draws')
+        t = slice(None) if year is None else year - model.year_first
+        for name in self.names:
+            vals = getattr(model, name)[t]
+            axes = self._axes[name] if year is None else tuple(axis - 1 for axis in self._axes[name])
+            if axes:
+                vals = vals.sum(axis=axes)
+            target = outputs.arrays[name] if draw is None else outputs.arrays[name][draw]
+            target[t] = vals
+
+class ProfiledOutputs:
+    """! Model outputs stored according to an OutputProfile
+    @details Stored outputs are available as attributes named like Model outputs
+    (e.g., outputs.pop_adult_hiv). If the outputs store several draws, the first
+    dimension of each array indexes draws, followed by the profile's dimensions.
+    """
+
+    def __init__(self, profile, arrays, year_first, num_draws):
+        self.profile = profile
+        self.arrays = arrays
+        self.year_first = year_first
+        self.num_draws = num_draws
+
+    def __getattr__(self, name):
+        arrays = self.__dict__.get('arrays', {})
+        if name in arrays:
+            return arrays[name]
+        raise AttributeError(name)
+
+    def dims(self, name):
+        """! Dimension labels of a stored output, including 'Draw' first if outputs store several draws"""
+        return (['Draw'] if self.num_draws is not None else []) + self.profile.dims[name]
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in self.arrays.values())
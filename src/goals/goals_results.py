@@ -2,6 +2,16 @@ import numpy as np
 import goals.goals_const as CONST
 
 class Results:
+    """! Labeled, cached aggregation of Goals model outputs
+    @details Reductions of model outputs are cached by output name and the
+    dimensions kept. Cached values are stored by year, and years are recalculated
+    only after the model reprojects them (e.g., after Model.invalidate). Cached
+    values do not reflect direct modifications of model output arrays.
+    Dimension labels are listed in goals_const.OUTPUT_DIMS. Returned arrays may
+    be read-only views of cached values, so copy them to keep values across
+    reprojections.
+    """
+
     def __init__(self, model):
         """! Initialize the object with a Goals model
         @param model The Goals model
@@ -9,26 +19,111 @@ class Results:
         self._model = model
         self._dtype = model._dtype
         self._order = model._order
-    
+        self._cache = {} # (output name, kept dimensions, cumulative) -> [values by year, year versions]
+
+    def clear(self):
+        """! Discard cached reductions"""
+        self._cache.clear()
+
+    def marginal(self, name, by=('Year',), years=None):
+        """! Sum a model output over all dimensions except those listed in by
+        @param name name of the model output (e.g., 'pop_adult_hiv')
+        @param by labels of dimensions to keep (e.g., ('Year', 'Sex')). Kept dimensions retain their original order.
+        @param years a calendar year or an inclusive (first, last) pair of years to select. None selects all years
+        @return a read-only array. If 'Year' is not kept, the sum is over the selected years
+        """
+        keep = self._keep_axes(name, by)
+        vals = self._cached(name, keep, False)
+        return self._select_years(vals, years, 'Year' in by)
+
+    def age_range(self, name, age_min, age_max, by=('Year',), years=None):
+        """! Sum a model output over an age range and all dimensions except those listed in by
+        @param name name of the model output (e.g., 'pop_adult_hiv')
+        @param age_min youngest age to include
+        @param age_max oldest age to include
+        @param by labels of dimensions to keep, excluding 'Age'
+        @param years a calendar year or an inclusive (first, last) pair of years to select. None selects all years
+        @return a read-only array, as in marginal
+        @details Cumulative sums over age are cached, so sums over different age ranges are cheap.
+        """
+        if 'Age' in by:
+            raise ValueError('age_range cannot keep the Age dimension')
+        age_lo = CONST.OUTPUT_AGE_MIN[name]
+        age_hi = age_lo + getattr(self._model, name).shape[CONST.OUTPUT_DIMS[name].index('Age')] - 1
+        if age_min < age_lo or age_max > age_hi or age_min > age_max:
+            raise ValueError('Ages %d-%d are not in %s (ages %d-%d)' % (age_min, age_max, name, age_lo, age_hi))
+
+        keep = self._keep_axes(name, tuple(by) + ('Age',))
+        csum = self._cached(name, keep, True)
+        age_axis = keep.index(CONST.OUTPUT_DIMS[name].index('Age'))
+        vals = np.take(csum, age_max - age_lo + 1, axis=age_axis) - np.take(csum, age_min - age_lo, axis=age_axis)
+        return self._select_years(vals, years, 'Year' in by)
+
     def bigpop(self):
         """! Calculate the total population by year, sex, age"""
         rval = np.zeros((self._model.year_final - self._model.year_first + 1, CONST.N_SEX, CONST.N_AGE),
                         dtype=self._dtype, order=self._order)
+        by = ('Year', 'Sex', 'Age')
 
         ## Add up children. We must sum males across circumcision states
-        rval[:, CONST.SEX_MALE, CONST.AGE_CHILD_MIN:(CONST.AGE_CHILD_MAX+1)] \
-            = self._model.pop_child_neg[:,CONST.SEX_MALE_U:,:].sum((1)) \
-            + self._model.pop_child_hiv[:,CONST.SEX_MALE_U:,:,:,:].sum((1,3,4))
-        rval[:, CONST.SEX_FEMALE, CONST.AGE_CHILD_MIN:(CONST.AGE_CHILD_MAX+1)] \
-            = self._model.pop_child_neg[:,CONST.SEX_FEMALE,:] \
-            + self._model.pop_child_hiv[:,CONST.SEX_FEMALE,:,:,:].sum((2,3))
-        
+        child = self.marginal('pop_child_neg', by) + self.marginal('pop_child_hiv', by)
+        rval[:, CONST.SEX_MALE, CONST.AGE_CHILD_MIN:(CONST.AGE_CHILD_MAX+1)] = child[:,CONST.SEX_MALE_U:,:].sum((1))
+        rval[:, CONST.SEX_FEMALE, CONST.AGE_CHILD_MIN:(CONST.AGE_CHILD_MAX+1)] = child[:,CONST.SEX_FEMALE,:]
+
         ## Add up adults. We must sum males across circumcision states
-        rval[:, CONST.SEX_MALE, CONST.AGE_ADULT_MIN:] \
-            = self._model.pop_adult_neg[:,CONST.SEX_MALE_U:,:,:].sum((1,3)) \
-            + self._model.pop_adult_hiv[:,CONST.SEX_MALE_U:,:,:,:,:].sum((1,3,4,5))
-        rval[:, CONST.SEX_FEMALE, CONST.AGE_ADULT_MIN:] \
-            = self._model.pop_adult_neg[:,CONST.SEX_FEMALE,:,:].sum((2)) \
-            + self._model.pop_adult_hiv[:,CONST.SEX_FEMALE,:,:,:,:].sum((2,3,4))
-        
+        adult = self.marginal('pop_adult_neg', by) + self.marginal('pop_adult_hiv', by)
+        rval[:, CONST.SEX_MALE, CONST.AGE_ADULT_MIN:] = adult[:,CONST.SEX_MALE_U:,:].sum((1))
+        rval[:, CONST.SEX_FEMALE, CONST.AGE_ADULT_MIN:] = adult[:,CONST.SEX_FEMALE,:]
+
         return(rval)
+
+    def _keep_axes(self, name, by):
+        """! Convert dimension labels to a sorted tuple of axes, always including the year axis"""
+        dims = CONST.OUTPUT_DIMS[name]
+        for dim in by:
+            if dim not in dims:
+                raise ValueError('%s has no %s dimension' % (name, dim))
+        return tuple(sorted({dims.index(dim) for dim in by} | {0}))
+
+    def _cached(self, name, keep, cumulative):
+        """! Return a cached reduction by year, recalculating years the model has reprojected
+        @param cumulative True to take cumulative sums over age, padded with a leading zero
+        """
+        versions = self._model._year_version
+        key = (name, keep, cumulative)
+        entry = self._cache.get(key)
+        if entry is None or entry[1].shape != versions.shape:
+            entry = [self._reduce(name, keep, cumulative, slice(None)), versions.copy()]
+            self._cache[key] = entry
+        else:
+            stale = np.flatnonzero(entry[1] != versions)
+            if len(stale):
+                entry[0][stale] = self._reduce(name, keep, cumulative, stale)
+                entry[1][stale] = versions[stale]
+        return entry[0]
+
+    def _reduce(self, name, keep, cumulative, years):
+        array = getattr(self._model, name)[years]
+        vals = array.sum(axis=tuple(axis for axis in range(array.ndim) if axis not in keep))
+        if cumulative:
+            age_axis = keep.index(CONST.OUTPUT_DIMS[name].index('Age'))
+            shape = list(vals.shape)
+            shape[age_axis] += 1
+            csum = np.zeros(shape, dtype=self._dtype)
+            np.cumsum(vals, axis=age_axis, out=csum[(slice(None),) * age_axis + (slice(1, None),)])
+            vals = csum
+        return vals
+
+    def _select_years(self, vals, years, keep_year):
+        if years is not None:
+            first, last = (years, years) if np.isscalar(years) else years
+            vals = vals[(first - self._model.year_first):(last - self._model.year_first + 1)]
+            if np.isscalar(years) and keep_year:
+                vals = vals[0]
+        if not keep_year:
+            vals = vals.sum(axis=0)
+        if np.ndim(vals) == 0:
+            return vals
+        view = vals.view()
+        view.flags.writeable = False
+        return view
@@ -0,0 +1,174 @@
+import json
+import os
+import numpy as np
+
+## Affine-invariant ensemble MCMC (Goodman and Weare, 2010, Commun Appl Math
+## Comput Sci 5:65-80). The ensemble is split into two halves, and each walker in
+## one half proposes a "stretch move" along the line through another walker in
+## the other half. Proposals for a whole half are evaluated in one call, so a
+## process pool can evaluate them in parallel.
+##
+## The log density function may return extra per-draw values ("blobs") along
+## with the log density, such as indicator summaries. These are stored with the
+## chain so that uncertainty bounds on model outputs can be calculated without
+## keeping full model outputs for every draw.
+##
+## Chains can be checkpointed to an .npz file. A sampler created with the path
+## of an existing checkpoint resumes from it, including the random number
+## generator state, so a resumed run continues as if it had not stopped.
+
+class EnsembleSampler:
+    """! Affine-invariant ensemble MCMC sampler using the stretch move"""
+
+    def __init__(self, evaluate, num_walkers, num_dims, checkpoint=None, stretch=2.0, seed=None):
+        """! Create a sampler
+        @param evaluate function of a list of parameter vectors that returns a list with one
+        log density per vector. Each log density can be a number, or a (number, blobs) pair
+        where blobs is a dict from names to arrays of fixed shape, or None if the log density is -inf
+        @param num_walkers number of walkers. Must be even and at least twice num_dims
+        @param num_dims number of parameters
+        @param checkpoint optional .npz file name. If the file exists, the sampler resumes from it
+        @param stretch stretch move scale parameter a > 1
+        @param seed random number generator seed. Ignored when resuming from a checkpoint
+        """
+        if num_walkers % 2 != 0 or num_walkers < 2 * num_dims:
+            raise ValueError('The number of walkers must be even and at least twice the number of parameters')
+        self._evaluate = evaluate
+        self.num_walkers = num_walkers
+        self.num_dims = num_dims
+        self.stretch = stretch
+        self.checkpoint = checkpoint
+        self._rng = np.random.default_rng(seed)
+        self._chain = []      # one (num_walkers, num_dims) array per step
+        self._log_prob = []   # one (num_walkers,) array per step
+        self._blobs = {}      # name -> one (num_walkers, ...) array per step
+        self._accepted = np.zeros(num_walkers, dtype=int)
+        if checkpoint is not None and os.path.exists(checkpoint):
+            self._load(checkpoint)
+
+    @property
+    def num_steps(self):
+        return len(self._chain)
+
+    @property
+    def chain(self):
+        """! Walker positions indexed by step, walker and parameter"""
+        return np.array(self._chain).reshape((self.num_steps, self.num_walkers, self.num_dims))
+
+    @property
+    def log_prob(self):
+        """! Log densities indexed by step and walker"""
+        return np.array(self._log_prob).reshape((self.num_steps, self.num_walkers))
+
+    @property
+    def blobs(self):
+        """! A dict from blob names to arrays indexed by step, walker, then the blob's own dimensions"""
+        return {name : np.array(vals) for name, vals in self._blobs.items()}
+
+    @property
+    def acceptance_fraction(self):
+        """! Fraction of proposals accepted by each walker"""
+        return self._accepted / max(self.num_steps - 1, 1)
+
+    def flat_samples(self, burn=0, thin=1):
+        """! Pool draws from every walker
+        @param burn number of initial steps to discard
+        @param thin keep every thin-th step after burn-in
+        @return parameter draws, one row per draw
+        @return a dict of blobs, with one leading entry per draw
+        """
+        chain = self.chain[burn::thin]
+        blobs = {name : vals[burn::thin] for name, vals in self.blobs.items()}
+        return (chain.reshape((-1, self.num_dims)),
+                {name : vals.reshape((-1,) + vals.shape[2:]) for name, vals in blobs.items()})
+
+    def run(self, num_steps, initial=None, checkpoint_every=10):
+        """! Advance every walker
+        @param num_steps number of steps to take
+        @param initial starting positions, one row per walker. Required for a new chain, and
+        ignored when continuing a chain (e.g., one resumed from a checkpoint)
+        @param checkpoint_every save a checkpoint after this many steps, if the sampler has a checkpoint file
+        @return this sampler
+        """
+        if self.num_steps == 0:
+            if initial is None:
+                raise ValueError('Initial walker positions are required to start a chain')
+            position = np.array(initial, dtype=float).reshape((self.num_walkers, self.num_dims))
+            log_prob, blobs = self._call(position)
+            if not np.all(np.isfinite(log_prob)):
+                raise ValueError('Every initial walker position must have finite log density')
+            self._append(position, log_prob, blobs)
+            num_steps -= 1
+
+        position = self._chain[-1].copy()
+        log_prob = self._log_prob[-1].copy()
+        blobs = {name : vals[-1].copy() for name, vals in self._blobs.items()}
+        half = self.num_walkers // 2
+        halves = [np.arange(half), np.arange(half, self.num_walkers)]
+        for step in range(num_steps):
+            for active, other in (halves, halves[::-1]):
+                z = ((self.stretch - 1.0) * self._rng.uniform(size=half) + 1.0)**2 / self.stretch
+                partners = position[self._rng.choice(other, size=half)]
+                proposal = partners + z[:,None] * (position[active] - partners)
+                prop_log_prob, prop_blobs = self._call(proposal)
+                log_ratio = (self.num_dims - 1) * np.log(z) + prop_log_prob - log_prob[active]
+                accept = np.log(self._rng.uniform(size=half)) < log_ratio
+                index = active[accept]
+                position[index] = proposal[accept]
+                log_prob[index] = prop_log_prob[accept]
+                for name, vals in blobs.items():
+                    vals[index] = prop_blobs[name][accept]
+                self._accepted[index] += 1
+            self._append(position, log_prob, blobs)
+            if self.checkpoint is not None and (step + 1) % checkpoint_every == 0:
+                self.save(self.checkpoint)
+        if self.checkpoint is not None:
+            self.save(self.checkpoint)
+        return self
+
+    def _call(self, positions):
+        """! Evaluate log densities and collect blobs into arrays. Non-finite log densities are -inf"""
+        results = self._evaluate(list(positions))
+        log_prob = np.full(len(results), -np.inf)
+        blobs = {}
+        for k, result in enumerate(results):
+            val, blob = result if isinstance(result, tuple) else (result, None)
+            if np.isfinite(val):
+                log_prob[k] = val
+            for name, array in (blob or {}).items():
+                if name not in blobs:
+                    blobs[name] = np.zeros((len(results),) + np.shape(array), dtype=np.asarray(array).dtype)
+                blobs[name][k] = array
+        for name, vals in self._blobs.items():
+            if name not in blobs:
+                blobs[name] = np.zeros((len(results),) + vals[-1].shape[1:], dtype=vals[-1].dtype)
+        return log_prob, blobs
+
+    def _append(self, position, log_prob, blobs):
+        self._chain.append(position.copy())
+        self._log_prob.append(log_prob.copy())
+        for name, vals in blobs.items():
+            self._blobs.setdefault(name, []).append(vals.copy())
+
+    def save(self, file_name):
+        """! Save the chain and sampler state. The file is replaced atomically, so an
+        interrupted save leaves the previous checkpoint intact
+        """
+        arrays = {'chain' : self.chain, 'log_prob' : self.log_prob, 'accepted' : self._accepted,
+                  'rng' : np.array(json.dumps(self._rng.bit_generator.state))}
+        arrays.update({'blob_' + name : vals for name, vals in self.blobs.items()})
+        tmp_name = file_name + '.tmp'
+        with open(tmp_name, 'wb') as fh:
+            np.savez(fh, **arrays)
+        os.replace(tmp_name, file_name)
+
+    def _load(self, file_name):
+        with np.load(file_name) as data:
+            chain = data['chain']
+            if chain.shape[1:] != (self.num_walkers, self.num_dims):
+                raise ValueError('Checkpoint %s has %d walkers and %d parameters' % (file_name, chain.shape[1], chain.shape[2]))
+            self._chain = list(chain)
+            self._log_prob = list(data['log_prob'])
+            self._accepted = data['accepted']
+            self._blobs = {key[5:] : list(data[key]) for key in data.files if key.startswith('blob_')}
+            self._rng.bit_generator.state = json.loads(str(data['rng']))
@@ -0,0 +1,108 @@
+import multiprocessing.shared_memory as shared_memory
+import multiprocessing.util
+import numpy as np
+from goals.goals_model import Model
+
+## Goals models with outputs stored in shared memory. A SharedModel created in
+## one process (e.g., a worker in a multiprocessing pool) can describe where its
+## outputs live, and other processes can attach to those outputs without copying
+## or pickling them.
+
+class SharedModel(Model):
+    """! Goals model whose output arrays are allocated in named shared memory blocks"""
+
+    def __init__(self):
+        super().__init__()
+        self._shm = {}
+        # Release shared memory at interpreter exit, including in pool worker processes
+        self._finalizer = multiprocessing.util.Finalize(self, SharedModel._release, args=(self._shm,), exitpriority=10)
+
+    def _alloc_output(self, name, shape):
+        """! Allocate a zero-filled output array in a new shared memory block"""
+        if name in self._shm:
+            SharedModel._release({name : self._shm.pop(name)})
+        nbytes = max(1, int(np.prod(shape)) * np.dtype(self._dtype).itemsize)
+        shm = shared_memory.SharedMemory(create=True, size=nbytes)
+        self._shm[name] = shm
+        array = np.ndarray(shape, dtype=self._dtype, order=self._order, buffer=shm.buf)
+        array[...] = 0.0
+        return array
+
+    def describe_outputs(self):
+        """! Describe where this model's outputs are stored
+        @return a small picklable dict that can be passed to attach_outputs in another process
+        """
+        return {name : (shm.name, getattr(self, name).shape, np.dtype(self._dtype).str) for name, shm in self._shm.items()}
+
+    def export_outputs(self):
+        """! Copy this model's current outputs into new shared memory blocks
+        @return a picklable description of the copies, as in describe_outputs
+        @details The copies are not owned by this model and are unaffected by later projections.
+        The process that receives the description must release them, e.g., by attaching with
+        SharedOutputs(description, unlink=True) and closing it.
+        """
+        description = {}
+        for name in self._shm.keys():
+            array = getattr(self, name)
+            shm = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+            np.ndarray(array.shape, dtype=self._dtype, order=self._order, buffer=shm.buf)[...] = array
+            description[name] = (shm.name, array.shape, np.dtype(self._dtype).str)
+            _try_close(shm)
+        return description
+
+    def close(self):
+        """! Release this model's shared memory. The model's outputs must not be used afterward."""
+        self._finalizer()
+
+    @staticmethod
+    def _release(blocks):
+        for shm in blocks.values():
+            shm.unlink()
+            _try_close(shm)
+        blocks.clear()
+
+class SharedOutputs:
+    """! Read-only views of another process's SharedModel outputs"""
+
+    def __init__(self, description, unlink=False):
+        """! Attach to shared outputs
+        @param description the value returned by SharedModel.describe_outputs or export_outputs in another process
+        @param unlink True to release the shared memory blocks when this object is closed. Use this for
+        outputs from export_outputs, which no model owns
+        """
+        self._unlink = unlink
+        self._shm = {}
+        self.arrays = {}
+        for name, (shm_name, shape, dtype) in description.items():
+            shm = shared_memory.SharedMemory(name=shm_name)
+            self._shm[name] = shm
+            self.arrays[name] = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+            self.arrays[name].flags.writeable = False
+
+    def __getattr__(self, name):
+        try:
+            return self.__dict__['arrays'][name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """! Detach from shared outputs. Arrays returned earlier must not be used afterward."""
+        self.arrays.clear()
+        for shm in self._shm.values():
+            if self._unlink:
+                shm.unlink()
+            _try_close(shm)
+        self._shm.clear()
+
+def _try_close(shm):
+    """! Unmap a shared memory block. If arrays still refer to the block, it is unmapped once they are freed instead."""
+    try:
+        shm.close()
+    except BufferError:
+        pass
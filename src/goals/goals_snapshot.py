@@ -0,0 +1,128 @@
+import hashlib
+import json
+import os
+import numpy as np
+import goals.goals_utils as Utils
+
+## Compiled input snapshots. Parsing a Goals ARM workbook with openpyxl is slow,
+## so we can parse it once and store the raw inputs returned by
+## goals_utils.xlsx_load_inputs in an uncompressed numpy .npz archive. Arrays are
+## stored as archive members. Dicts and scalars are stored as JSON in the
+## SNAPSHOT_META member along with the source workbook's size, modification
+## time and SHA-256 digest, which are used to detect stale snapshots.
+
+SNAPSHOT_VERSION = 1
+SNAPSHOT_META = "__meta__"
+
+def file_digest(file_name, chunk_size=1 << 20):
+    """! Calculate the SHA-256 digest of a file
+    @param file_name the file to hash
+    @param chunk_size number of bytes to read at a time
+    @return the digest as a hexadecimal string
+    """
+    digest = hashlib.sha256()
+    with open(file_name, "rb") as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def snapshot_name(xlsx_name):
+    """! Return the default snapshot file name for an Excel workbook (e.g., inputs/x.xlsx -> inputs/x.npz)"""
+    return os.path.splitext(xlsx_name)[0] + ".npz"
+
+def compile_snapshot(xlsx_name, snap_name=None):
+    """! Parse an Excel workbook and save its inputs as a snapshot
+    @param xlsx_name An Excel workbook with Goals ARM inputs
+    @param snap_name The snapshot file to create. Defaults to snapshot_name(xlsx_name)
+    @return the dict of raw inputs stored in the snapshot
+    """
+    if snap_name is None:
+        snap_name = snapshot_name(xlsx_name)
+    stat = os.stat(xlsx_name)
+    inputs = Utils.xlsx_load_inputs(xlsx_name)
+    save_snapshot(snap_name, inputs, {'source'        : os.path.abspath(xlsx_name),
+                                      'source_size'   : stat.st_size,
+                                      'source_mtime'  : stat.st_mtime_ns,
+                                      'source_sha256' : file_digest(xlsx_name)})
+    return inputs
+
+def save_snapshot(snap_name, inputs, source):
+    """! Save raw inputs to a snapshot file
+    @param snap_name The snapshot file to create
+    @param inputs a dict of raw inputs as returned by goals_utils.xlsx_load_inputs
+    @param source a dict describing the workbook the inputs came from
+    """
+    arrays = {key : val for key, val in inputs.items() if isinstance(val, np.ndarray)}
+    values = {key : _prune_dict(val) if isinstance(val, dict) else val for key, val in inputs.items() if key not in arrays}
+    meta = {'version' : SNAPSHOT_VERSION, 'source' : source, 'values' : values}
+
+    # Write to a temporary file first so that a concurrent reader never sees a partial snapshot
+    temp_name = "%s.%d.tmp" % (snap_name, os.getpid())
+    with open(temp_name, "wb") as fh:
+        np.savez(fh, **arrays, **{SNAPSHOT_META : np.array(json.dumps(meta))})
+    os.replace(temp_name, snap_name)
+
+def read_snapshot(snap_name):
+    """! Read a snapshot file without checking if it is stale
+    @param snap_name The snapshot file to read
+    @return a dict of raw inputs
+    @return a dict describing the workbook the inputs came from
+    """
+    with np.load(snap_name, allow_pickle=False) as archive:
+        meta = json.loads(str(archive[SNAPSHOT_META]))
+        if meta['version'] != SNAPSHOT_VERSION:
+            raise ValueError('Unsupported snapshot version %s in %s' % (meta['version'], snap_name))
+        inputs = {key : archive[key] for key in archive.files if key != SNAPSHOT_META}
+    inputs.update(meta['values'])
+    return inputs, meta['source']
+
+def is_stale(source, xlsx_name=None):
+    """! Check if a snapshot is out of date with respect to its source workbook
+    @param source the workbook description returned by read_snapshot
+    @param xlsx_name The workbook to compare against. Defaults to the workbook recorded in source
+    @return True if the workbook contents differ from those used to compile the snapshot
+    """
+    if xlsx_name is None:
+        xlsx_name = source['source']
+    if _same_stat(source, os.stat(xlsx_name)):
+        return False
+    # The modification time can change without the contents changing (e.g., after a
+    # fresh checkout), so we only rebuild if the contents actually differ.
+    return file_digest(xlsx_name) != source['source_sha256']
+
+def load_snapshot(snap_name, xlsx_name=None):
+    """! Load inputs from a snapshot, recompiling the snapshot first if needed
+    @param snap_name The snapshot file to load
+    @param xlsx_name The workbook the snapshot should reflect. If None, the workbook
+    recorded in the snapshot is used if it still exists.
+    @return a dict of raw inputs as returned by goals_utils.xlsx_load_inputs
+    """
+    if not os.path.exists(snap_name):
+        if xlsx_name is None:
+            raise FileNotFoundError('Snapshot %s does not exist' % (snap_name))
+        return compile_snapshot(xlsx_name, snap_name)
+
+    inputs, source = read_snapshot(snap_name)
+    if xlsx_name is None and os.path.exists(source['source']):
+        xlsx_name = source['source']
+    if xlsx_name is not None:
+        stat = os.stat(xlsx_name)
+        if is_stale(source, xlsx_name):
+            inputs = compile_snapshot(xlsx_name, snap_name)
+        elif not _same_stat(source, stat):
+            # The contents are unchanged, so record the workbook's new size and modification
+            # time. Otherwise every later load would hash the workbook again.
+            source = dict(source, source_size=stat.st_size, source_mtime=stat.st_mtime_ns)
+            try:
+                save_snapshot(snap_name, inputs, source)
+            except OSError:
+                pass # the snapshot is still valid if it cannot be rewritten (e.g., a read-only directory)
+    return inputs
+
+def _same_stat(source, stat):
+    """! Check if a workbook's size and modification time match those recorded in a snapshot"""
+    return stat.st_size == source['source_size'] and stat.st_mtime_ns == source['source_mtime']
+
+def _prune_dict(d):
+    """! Drop empty rows (None keys) that JSON cannot represent faithfully"""
+    return {key : val for key, val in d.items() if key is not None}
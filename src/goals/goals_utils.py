@@ -1,4 +1,5 @@
 import numpy as np
+import openpyxl as xlsx
 import goals.goals_const as CONST
 
 def xlsx_load_range(tab, cell_first, cell_final, dtype=np.float64, order="C"):
@@ -168,3 +169,56 @@ def xlsx_load_fitting_pars(tab_fit):
     vals = [tuple(cell.value for cell in row) for row in tab_fit['B2:F%d' % (last_row)]]
     rval = dict(zip(keys, vals))
     return {key : rval[key] for key in keys if key != None} # Prune empty rows
+
+def xlsx_load_inputs(xlsx_name):
+    """! Load every raw input that Model needs from an Excel workbook
+    @param xlsx_name An Excel workbook with Goals ARM inputs
+    @return a dict mapping input names to raw values. Configuration, epidemiological and
+    likelihood options are stored as dicts under "config", "epi" and "likelihood". Other
+    entries are numpy arrays or scalars exactly as returned by the xlsx_load_* functions.
+    Tabs that the workbook configuration does not use are not loaded.
+    """
+    wb = xlsx.load_workbook(filename=xlsx_name, read_only=True)
+    cfg_opts = xlsx_load_config(wb[CONST.XLSX_TAB_CONFIG])
+    inputs = {'config'     : cfg_opts,
+              'epi'        : xlsx_load_epi(wb[CONST.XLSX_TAB_EPI]),
+              'likelihood' : xlsx_load_likelihood_pars(wb[CONST.XLSX_TAB_LIKELIHOOD])}
+
+    (inputs['med_age_debut'], inputs['med_age_union'], inputs['avg_dur_union'],
+     inputs['kp_size'], inputs['kp_stay'], inputs['kp_turnover']) = xlsx_load_popsize(wb[CONST.XLSX_TAB_POPSIZE])
+
+    if not cfg_opts[CONST.CFG_USE_UPD_PASFRS]:
+        inputs['pasfrs'] = xlsx_load_pasfrs(wb[CONST.XLSX_TAB_PASFRS])
+
+    if not cfg_opts[CONST.CFG_USE_UPD_MIGR]:
+        inputs['migr_net'], inputs['migr_dist_m'], inputs['migr_dist_f'] = xlsx_load_migr(wb[CONST.XLSX_TAB_MIGR])
+
+    if cfg_opts[CONST.CFG_USE_DIRECT_INCI]:
+        (inputs['inci'], inputs['sirr'], inputs['airr_m'], inputs['airr_f'],
+         inputs['rirr_m'], inputs['rirr_f']) = xlsx_load_inci(wb[CONST.XLSX_TAB_INCI])
+    else:
+        (inputs['partner_time_trend'], inputs['partner_age_params'],
+         inputs['partner_pop_ratios']) = xlsx_load_partner_rates(wb[CONST.XLSX_TAB_PARTNER])
+        inputs['age_prefs'], inputs['pop_prefs'], inputs['p_married'] = xlsx_load_partner_prefs(wb[CONST.XLSX_TAB_PARTNER])
+        inputs['mix_levels'] = xlsx_load_mixing_levels(wb[CONST.XLSX_TAB_MIXNG_MATRIX])
+        (inputs['sex_acts'], inputs['condom_freq'], inputs['pwid_force'],
+         inputs['needle_sharing']) = xlsx_load_contact_params(wb[CONST.XLSX_TAB_CONTACT])
+        inputs['sti_trend'], inputs['sti_age'] = xlsx_load_sti_prev(wb[CONST.XLSX_TAB_STIPREV])
+
+    if cfg_opts[CONST.CFG_USE_DIRECT_CLHIV]:
+        inputs['direct_clhiv'] = xlsx_load_direct_clhiv(wb[CONST.XLSX_TAB_DIRECT_CLHIV])
+
+    hiv_frr = xlsx_load_hiv_fert(wb[CONST.XLSX_TAB_HIV_FERT])
+    inputs['hiv_frr_age'] = hiv_frr['age']
+    inputs['hiv_frr_cd4'] = hiv_frr['cd4']
+    inputs['hiv_frr_art'] = hiv_frr['art']
+    inputs['hiv_frr_laf'] = hiv_frr['laf']
+
+    (inputs['prog_dist'], inputs['prog_rate'], inputs['prog_mort'],
+     inputs['art_mort1'], inputs['art_mort2'], inputs['art_mort3']) = xlsx_load_adult_prog(wb[CONST.XLSX_TAB_ADULT_PROG])
+    (inputs['art_elig'], inputs['art_num'], inputs['art_pct'],
+     inputs['art_stop'], inputs['art_mrr'], inputs['art_vs']) = xlsx_load_adult_art(wb[CONST.XLSX_TAB_ADULT_ART])
+    inputs['uptake_mc'] = xlsx_load_mc_uptake(wb[CONST.XLSX_TAB_MALE_CIRC])
+
+    wb.close()
+    return inputs
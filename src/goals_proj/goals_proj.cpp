@@ -1,7 +1,52 @@
+#include <array>
+#include <atomic>
+#include <filesystem>
 #include <format>
-#include <boost/math/interpolators/pchip.hpp>
+#include <map>
+#include <memory>
+#include <mutex>
+#include <tuple>
 #include "goals_proj.h"
 
+namespace {
+	/// Parsed UPD files by path, modification time, and first and final projection years.
+	/// Each entry is a projection that has only been initialized from the UPD file.
+	typedef std::tuple<std::string, std::filesystem::file_time_type, int, int> upd_key_t;
+	std::map<upd_key_t, std::shared_ptr<const DP::Projection>> upd_cache;
+	std::mutex upd_cache_mutex;
+
+	/// True if DP::Projection may be copied (see GoalsProj::enable_copies)
+	std::atomic<bool> copies_enabled(false);
+
+	/// Evaluate a piecewise cubic Hermite interpolating polynomial (PCHIP) through
+	/// evenly-spaced knots (k*h, y[k]), k=0,...,n-1, at the integers 0,...,m-1.
+	/// @param y knot values
+	/// @param h spacing between knots
+	/// @param dy_bgn, dy_end derivatives at the first and last knots
+	/// @param out output values, must have room for m values
+	/// @param m number of values to calculate. m-1 must not exceed (n-1)*h
+	/// @details Interior derivatives are calculated as in boost::math::interpolators::pchip.
+	/// boost uses a weighted harmonic mean of adjacent slopes, which simplifies to the
+	/// unweighted harmonic mean for evenly-spaced knots. This calculates every value in
+	/// one pass without allocating memory.
+	template<size_t n>
+	void pchip_uniform(const std::array<double, n>& y, const int h, const double dy_bgn, const double dy_end, double* out, const int m) {
+		std::array<double, n> dy;
+		dy[0] = dy_bgn;
+		dy[n-1] = dy_end;
+		for (size_t k(1); k < n - 1; ++k) {
+			const double slope_lo((y[k] - y[k-1]) / h), slope_hi((y[k+1] - y[k]) / h);
+			dy[k] = (slope_lo * slope_hi > 0.0) ? 2.0 / (1.0 / slope_lo + 1.0 / slope_hi) : 0.0;
+		}
+
+		for (int i(0); i < m; ++i) {
+			const int k(std::min(i / h, static_cast<int>(n) - 2));
+			const double dx(i - k * h), t(dx / h);
+			out[i] = (1.0 - t) * (1.0 - t) * (y[k] * (1.0 + 2.0 * t) + dy[k] * dx) + t * t * (y[k+1] * (3.0 - 2.0 * t) + h * dy[k+1] * (t - 1.0));
+		}
+	}
+}
+
 template<typename ValueType>
 ValueType* prepare_array(py::array_t<ValueType> arr, const size_t ndim, size_t* shape) {
 	auto buff = arr.request();
@@ -28,10 +73,17 @@ ValueType* prepare_array(py::array_t<ValueType> arr, const size_t ndim, size_t*
 }
 
 GoalsProj::GoalsProj(const int year_start, const int year_final)
-	: num_years(year_final - year_start + 1) {
+	: num_years(year_final - year_start + 1), year_first(year_start) {
 	proj = new DP::Projection(year_start, year_final);
 }
 
+GoalsProj::GoalsProj(const GoalsProj& other)
+	: num_years(other.num_years), year_first(other.year_first), cloned(true) {
+	// shared is left empty: the copied engine still points at the original's
+	// storage, which must not be restored by share_storage or written by project.
+	proj = new DP::Projection(*other.proj);
+}
+
 GoalsProj::~GoalsProj() {
 	if (proj != NULL) { delete proj; }
 }
@@ -45,17 +97,17 @@ void GoalsProj::share_output_population(
 	size_t shape_adult_hiv[] = {num_years, DP::N_SEX_MC, DP::N_AGE_ADULT, DP::N_POP, DP::N_HIV_ADULT, DP::N_DTX};
 	size_t shape_child_neg[] = {num_years, DP::N_SEX_MC, DP::N_AGE_CHILD};
 	size_t shape_child_hiv[] = {num_years, DP::N_SEX_MC, DP::N_AGE_CHILD, DP::N_HIV_CHILD, DP::N_DTX};
-	proj->pop.share_storage(
-		prepare_array(adult_neg, 4, shape_adult_neg),
-		prepare_array(adult_hiv, 6, shape_adult_hiv),
-		prepare_array(child_neg, 3, shape_child_neg),
-		prepare_array(child_hiv, 5, shape_child_hiv));
+	shared.pop_adult_neg = prepare_array(adult_neg, 4, shape_adult_neg);
+	shared.pop_adult_hiv = prepare_array(adult_hiv, 6, shape_adult_hiv);
+	shared.pop_child_neg = prepare_array(child_neg, 3, shape_child_neg);
+	shared.pop_child_hiv = prepare_array(child_hiv, 5, shape_child_hiv);
+	proj->pop.share_storage(shared.pop_adult_neg, shared.pop_adult_hiv, shared.pop_child_neg, shared.pop_child_hiv);
 }
 
 void GoalsProj::share_output_births(array_double_t births) {
 	size_t shape[] = {num_years, DP::N_SEX};
-	double* ptr_births(prepare_array(births, 2, shape));
-	proj->dat.share_births(ptr_births);
+	shared.births = prepare_array(births, 2, shape);
+	proj->dat.share_births(shared.births);
 }
 
 void GoalsProj::share_output_deaths(
@@ -67,53 +119,125 @@ void GoalsProj::share_output_deaths(
 	size_t shape_adult_hiv[] = {num_years, DP::N_SEX_MC, DP::N_AGE_ADULT, DP::N_POP, DP::N_HIV_ADULT, DP::N_DTX};
 	size_t shape_child_neg[] = {num_years, DP::N_SEX_MC, DP::N_AGE_CHILD};
 	size_t shape_child_hiv[] = {num_years, DP::N_SEX_MC, DP::N_AGE_CHILD, DP::N_HIV_CHILD, DP::N_DTX};
-	proj->dth.share_storage(
-		prepare_array(adult_neg, 4, shape_adult_neg),
-		prepare_array(adult_hiv, 6, shape_adult_hiv),
-		prepare_array(child_neg, 3, shape_child_neg),
-		prepare_array(child_hiv, 5, shape_child_hiv));
+	shared.dth_adult_neg = prepare_array(adult_neg, 4, shape_adult_neg);
+	shared.dth_adult_hiv = prepare_array(adult_hiv, 6, shape_adult_hiv);
+	shared.dth_child_neg = prepare_array(child_neg, 3, shape_child_neg);
+	shared.dth_child_hiv = prepare_array(child_hiv, 5, shape_child_hiv);
+	proj->dth.share_storage(shared.dth_adult_neg, shared.dth_adult_hiv, shared.dth_child_neg, shared.dth_child_hiv);
 }
 
 void GoalsProj::share_output_new_infections(array_double_t newhiv) {
 	size_t shape[] = {num_years, DP::N_SEX_MC, DP::N_AGE, DP::N_POP};
-	double* ptr_newhiv(prepare_array(newhiv, 4, shape));
-	proj->dat.share_new_infections(ptr_newhiv);
+	shared.new_infections = prepare_array(newhiv, 4, shape);
+	proj->dat.share_new_infections(shared.new_infections);
 }
 
 void GoalsProj::share_output_births_exposed(array_double_t births) {
 	size_t shape[] = {num_years};
-	double* ptr_births(prepare_array(births, 1, shape));
-	proj->dat.share_births_exposed(ptr_births);
+	shared.births_exposed = prepare_array(births, 1, shape);
+	proj->dat.share_births_exposed(shared.births_exposed);
 }
 
 void GoalsProj::share_input_partner_rate(array_double_t partner_rate) {
 	size_t shape[] = {num_years, DP::N_SEX, DP::N_AGE_ADULT, DP::N_POP};
-	double* ptr_partner_rate(prepare_array(partner_rate, 4, shape));
-	proj->dat.share_partner_rate(ptr_partner_rate);
+	shared.partner_rate = prepare_array(partner_rate, 4, shape);
+	proj->dat.share_partner_rate(shared.partner_rate);
 }
 
 void GoalsProj::share_input_age_mixing(array_double_t mix) {
 	size_t shape[] = {DP::N_SEX, DP::N_AGE_ADULT, DP::N_SEX, DP::N_AGE_ADULT};
-	double* ptr_mix(prepare_array(mix, 4, shape));
-	proj->dat.share_age_mixing(ptr_mix);
+	shared.age_mixing = prepare_array(mix, 4, shape);
+	proj->dat.share_age_mixing(shared.age_mixing);
 }
 
 void GoalsProj::share_input_pop_assort(array_double_t assort) {
 	size_t shape[] = {DP::N_SEX, DP::N_POP};
-	double* ptr_assort(prepare_array(assort, 2, shape));
-	proj->dat.share_pop_assortativity(ptr_assort);
+	shared.pop_assort = prepare_array(assort, 2, shape);
+	proj->dat.share_pop_assortativity(shared.pop_assort);
 }
 
 void GoalsProj::share_input_pwid_risk(array_double_t force, array_double_t needle_sharing) {
 	size_t shape_force[] = {num_years, DP::N_SEX};
 	size_t shape_share[] = {num_years};
-	double* ptr_force(prepare_array(force, 2, shape_force));
-	double* ptr_share(prepare_array(needle_sharing, 1, shape_share));
-	proj->dat.share_pwid_risk(ptr_force, ptr_share);
+	shared.pwid_force = prepare_array(force, 2, shape_force);
+	shared.needle_sharing = prepare_array(needle_sharing, 1, shape_share);
+	proj->dat.share_pwid_risk(shared.pwid_force, shared.needle_sharing);
 }
 
 void GoalsProj::initialize(const std::string& upd_filename) {
-	proj->initialize(upd_filename);
+	const int year_final(year_first + static_cast<int>(num_years) - 1);
+
+	// The cache copies DP::Projection instances, so it is only used if copies are enabled
+	if (!copies_enabled) {
+		proj->initialize(upd_filename);
+		return;
+	}
+
+	// Files we cannot stat are passed through so that the engine reports the error
+	std::error_code err;
+	const std::filesystem::path path(std::filesystem::absolute(upd_filename, err));
+	std::filesystem::file_time_type mtime;
+	if (!err) {
+		mtime = std::filesystem::last_write_time(path, err);
+	}
+	if (err) {
+		proj->initialize(upd_filename);
+		return;
+	}
+
+	const upd_key_t key(path.string(), mtime, year_first, year_final);
+	std::shared_ptr<const DP::Projection> base;
+	{
+		std::lock_guard<std::mutex> lock(upd_cache_mutex);
+		auto iter(upd_cache.find(key));
+		if (iter != upd_cache.end()) {
+			base = iter->second;
+		}
+	}
+
+	if (!base) {
+		// Parse outside the lock so that other files can be loaded concurrently. If two
+		// threads parse the same file, the first result cached is kept.
+		auto parsed(std::make_shared<DP::Projection>(year_first, year_final));
+		parsed->initialize(upd_filename);
+		std::lock_guard<std::mutex> lock(upd_cache_mutex);
+		for (auto iter(upd_cache.begin()); iter != upd_cache.end();) {
+			const bool stale(std::get<0>(iter->first) == std::get<0>(key) && std::get<1>(iter->first) != mtime);
+			iter = stale ? upd_cache.erase(iter) : std::next(iter);
+		}
+		base = upd_cache.try_emplace(key, parsed).first->second;
+	}
+
+	// The cached projection is copied by value, then pointed at every storage
+	// block shared so far, since the copy refers to none of them.
+	delete proj;
+	proj = new DP::Projection(*base);
+	share_storage(shared);
+}
+
+void GoalsProj::enable_copies(const bool flag) {
+	copies_enabled = flag;
+}
+
+bool GoalsProj::copies_allowed() {
+	return copies_enabled;
+}
+
+GoalsProj* GoalsProj::clone() const {
+	if (!copies_enabled) {
+		throw std::runtime_error("clone requires projection copies, which are disabled (see enable_projection_copies)");
+	}
+	return new GoalsProj(*this);
+}
+
+void GoalsProj::clear_upd_cache() {
+	std::lock_guard<std::mutex> lock(upd_cache_mutex);
+	upd_cache.clear();
+}
+
+size_t GoalsProj::upd_cache_size() {
+	std::lock_guard<std::mutex> lock(upd_cache_mutex);
+	return upd_cache.size();
 }
 
 void GoalsProj::init_pasfrs_from_5yr(array_double_t pasfrs5y) {
@@ -243,12 +367,13 @@ void GoalsProj::init_keypop_married(array_double_t prop_married) {
 void GoalsProj::init_mixing_matrix(array_double_t mix_levels) {
 	size_t shape[] = {DP::N_SEX, DP::N_POP, DP::N_SEX, DP::N_POP};
 	double* ptr_mix_levels(prepare_array(mix_levels, 4, shape));
-	boost::multi_array_ref<double, 4> arr_mix_levels(ptr_mix_levels, boost::extents[shape[0]][shape[1]][shape[2]][shape[3]]);
+	// Walk the contiguous input once instead of indexing it per element
+	const double* src(ptr_mix_levels);
 	for (int si(DP::SEX_MIN); si <= DP::SEX_MAX; ++si)
 		for (int ri(DP::POP_MIN); ri <= DP::POP_MAX; ++ri)
 			for (int sj(DP::SEX_MIN); sj <= DP::SEX_MAX; ++sj)
 				for (int rj(DP::POP_MIN); rj <= DP::POP_MAX; ++rj)
-					proj->dat.mix_structure(si, ri, sj, rj, arr_mix_levels[si][ri][sj][rj]);
+					proj->dat.mix_structure(si, ri, sj, rj, *src++);
 }
 
 void GoalsProj::init_sex_acts(array_double_t acts) {
@@ -260,23 +385,22 @@ void GoalsProj::init_sex_acts(array_double_t acts) {
 
 void GoalsProj::init_condom_freq(array_double_t freq) {
 	size_t shape[] = {num_years, DP::N_BOND};
-	double* ptr_freq(prepare_array(freq, 2, shape));
-	boost::multi_array_ref<double, 2> arr_freq(ptr_freq, boost::extents[shape[0]][shape[1]]);
-	for (int t(0); t < proj->num_years(); ++t)
+	const double* src(prepare_array(freq, 2, shape));
+	for (int t(0); t < shape[0]; ++t)
 		for (int q(DP::BOND_MIN); q <= DP::BOND_MAX; ++q)
-			proj->dat.condom_freq(t, q, arr_freq[t][q]);
+			proj->dat.condom_freq(t, q, *src++);
 }
 
 void GoalsProj::init_sti_prev(array_double_t sti_prev) {
 	const int ndim(4);
 	size_t shape[] = {num_years, DP::N_SEX, DP::N_AGE_ADULT, DP::N_POP};
-	double* ptr_sti_prev(prepare_array(sti_prev, ndim, shape));
-	boost::multi_array_ref<double, ndim> arr_sti_prev(ptr_sti_prev, boost::extents[shape[0]][shape[1]][shape[2]][shape[3]]);
+	const double* src(prepare_array(sti_prev, ndim, shape));
+	py::gil_scoped_release release;
 	for (int t(0); t < shape[0]; ++t)
 		for (int s(0); s < shape[1]; ++s)
 			for (int a(0); a < shape[2]; ++a)
 				for (int r(0); r < shape[3]; ++r)
-					proj->dat.sti_prev(t, s, a, r, arr_sti_prev[t][s][a][r]);
+					proj->dat.sti_prev(t, s, a, r, *src++);
 }
 
 void GoalsProj::init_epidemic_seed(const int seed_year, const double seed_prev) {
@@ -399,23 +523,23 @@ void GoalsProj::init_adult_art_suppressed(array_double_t art_supp_pct) {
 }
 
 void GoalsProj::init_male_circumcision_uptake(array_double_t uptake) {
-	using boost::math::interpolators::pchip;
-
 	const size_t n(17); // number of 5-year age groups
-	std::vector<double> x{0, 5, 10, 15, 20, 25, 30, 35, 40, 45, 50, 55, 60, 65, 70, 75, 80, 85};
-	std::vector<double> y(n + 1);
+	std::array<double, n + 1> y;  // cumulative exposure at ages 0, 5, ..., 85
+	std::array<double, DP::N_AGE + 1> cumul; // cumulative exposure at ages 0, 1, ..., N_AGE
 	double rate, prop;
 	double dy_bgn, dy_end; // derivatives at left and right boundaries
 
 	size_t shape[] = {num_years, n};
-	DP::year_age_ref_t arr_uptake(prepare_array(uptake, 2, shape), boost::extents[shape[0]][shape[1]]);
+	const double* ptr_uptake(prepare_array(uptake, 2, shape));
+	py::gil_scoped_release release;
 
 	y[0] = 0.0;
 	for (int t(0); t < proj->dat.num_years(); ++t) {
 		// Calculate cumulative exposure to circumcision uptake at the
 		// boundaries of five-year age groups
+		const double* row(ptr_uptake + t * n);
 		for (int a(0); a < n; ++a) {
-			prop = 0.01 * arr_uptake[t][a];
+			prop = 0.01 * row[a];
 			rate = -5.0 * log(1.0 - prop);
 			y[a+1] = y[a] + rate;
 		}
@@ -434,15 +558,13 @@ void GoalsProj::init_male_circumcision_uptake(array_double_t uptake) {
 		if (dy_bgn < 0.0) dy_bgn = 0.0;
 		if (dy_end < 0.0) dy_end = 0.0;
 
-		// Interpolate cumulative exposure at singles ages using PCHIP. We
-		// pass copies of vectors to pchip because it is allowed to modify
-		// its inputs, including resizing them
-		auto spline = pchip(std::vector<double>(x), std::vector<double>(y), dy_bgn, dy_end);
+		// Interpolate cumulative exposure at single ages using PCHIP
+		pchip_uniform(y, 5, dy_bgn, dy_end, cumul.data(), DP::N_AGE + 1);
 
 		// Calculate incremental uptake between consecutive ages and convert
 		// back from rates to proportions
 		for (int a(0); a < DP::N_AGE; ++a) {
-			rate = spline(a + 1) - spline(a);
+			rate = cumul[a+1] - cumul[a];
 			prop = 1.0 - exp(-rate);
 			proj->dat.uptake_male_circumcision(t, a, prop);
 		}
@@ -464,9 +586,149 @@ void GoalsProj::init_clhiv_agein(array_double_t clhiv) {
 }
 
 void GoalsProj::project(const int year_final) {
+	require_outputs();
 	proj->project(year_final);
 }
 
+void GoalsProj::project_batch(
+	const int year_final,
+	array_double_t partner_rate,
+	array_double_t pop_assort,
+	array_double_t pwid_force,
+	array_double_t transmission,
+	array_double_t seed_prev,
+	array_double_t adult_neg,
+	array_double_t adult_hiv,
+	array_double_t child_neg,
+	array_double_t child_hiv,
+	array_double_t births,
+	array_double_t deaths_adult_neg,
+	array_double_t deaths_adult_hiv,
+	array_double_t deaths_child_neg,
+	array_double_t deaths_child_hiv,
+	array_double_t newhiv,
+	array_double_t births_exposed) {
+	const size_t n_trans(10); // number of init_transmission arguments
+	const size_t n_sets(seed_prev.ndim() == 1 ? seed_prev.shape(0) : 0);
+
+	if (shared.needle_sharing == nullptr) {
+		throw std::runtime_error("project_batch requires inputs shared via share_input_pwid_risk");
+	}
+	require_outputs();
+
+	size_t shape_partner_rate[] = {n_sets, num_years, DP::N_SEX, DP::N_AGE_ADULT, DP::N_POP};
+	size_t shape_pop_assort[] = {n_sets, DP::N_SEX, DP::N_POP};
+	size_t shape_pwid_force[] = {n_sets, num_years, DP::N_SEX};
+	size_t shape_transmission[] = {n_sets, n_trans};
+	size_t shape_seed_prev[] = {n_sets};
+	size_t shape_adult_neg[] = {n_sets, num_years, DP::N_SEX_MC, DP::N_AGE_ADULT, DP::N_POP};
+	size_t shape_adult_hiv[] = {n_sets, num_years, DP::N_SEX_MC, DP::N_AGE_ADULT, DP::N_POP, DP::N_HIV_ADULT, DP::N_DTX};
+	size_t shape_child_neg[] = {n_sets, num_years, DP::N_SEX_MC, DP::N_AGE_CHILD};
+	size_t shape_child_hiv[] = {n_sets, num_years, DP::N_SEX_MC, DP::N_AGE_CHILD, DP::N_HIV_CHILD, DP::N_DTX};
+	size_t shape_births[] = {n_sets, num_years, DP::N_SEX};
+	size_t shape_newhiv[] = {n_sets, num_years, DP::N_SEX_MC, DP::N_AGE, DP::N_POP};
+	size_t shape_births_exposed[] = {n_sets, num_years};
+
+	double* ptr_partner_rate(prepare_array(partner_rate, 5, shape_partner_rate));
+	double* ptr_pop_assort(prepare_array(pop_assort, 3, shape_pop_assort));
+	double* ptr_pwid_force(prepare_array(pwid_force, 3, shape_pwid_force));
+	double* ptr_transmission(prepare_array(transmission, 2, shape_transmission));
+	double* ptr_seed_prev(prepare_array(seed_prev, 1, shape_seed_prev));
+
+	// Batched storage for set k starts k * stride elements into each array
+	SharedStorage batch;
+	batch.pop_adult_neg = prepare_array(adult_neg, 5, shape_adult_neg);
+	batch.pop_adult_hiv = prepare_array(adult_hiv, 7, shape_adult_hiv);
+	batch.pop_child_neg = prepare_array(child_neg, 4, shape_child_neg);
+	batch.pop_child_hiv = prepare_array(child_hiv, 6, shape_child_hiv);
+	batch.dth_adult_neg = prepare_array(deaths_adult_neg, 5, shape_adult_neg);
+	batch.dth_adult_hiv = prepare_array(deaths_adult_hiv, 7, shape_adult_hiv);
+	batch.dth_child_neg = prepare_array(deaths_child_neg, 4, shape_child_neg);
+	batch.dth_child_hiv = prepare_array(deaths_child_hiv, 6, shape_child_hiv);
+	batch.births = prepare_array(births, 3, shape_births);
+	batch.births_exposed = prepare_array(births_exposed, 2, shape_births_exposed);
+	batch.new_infections = prepare_array(newhiv, 5, shape_newhiv);
+	batch.partner_rate = ptr_partner_rate;
+	batch.pop_assort = ptr_pop_assort;
+	batch.pwid_force = ptr_pwid_force;
+	batch.needle_sharing = shared.needle_sharing;
+
+	if (n_sets == 0) return;
+
+	const size_t stride_adult_neg(adult_neg.size() / n_sets);
+	const size_t stride_adult_hiv(adult_hiv.size() / n_sets);
+	const size_t stride_child_neg(child_neg.size() / n_sets);
+	const size_t stride_child_hiv(child_hiv.size() / n_sets);
+	const size_t stride_births(births.size() / n_sets);
+	const size_t stride_births_exposed(births_exposed.size() / n_sets);
+	const size_t stride_newhiv(newhiv.size() / n_sets);
+	const size_t stride_partner_rate(partner_rate.size() / n_sets);
+	const size_t stride_pop_assort(pop_assort.size() / n_sets);
+	const size_t stride_pwid_force(pwid_force.size() / n_sets);
+
+	py::gil_scoped_release release;
+	try {
+		for (size_t k(0); k < n_sets; ++k) {
+			const double* par(ptr_transmission + k * n_trans);
+			share_storage(batch);
+			DP::set_transmission(proj->dat, par[0], par[1], par[2], par[3], par[4], par[5], par[6], par[7], par[8], par[9]);
+			proj->dat.seed_prevalence(ptr_seed_prev[k]);
+			proj->invalidate(-1);
+			proj->project(year_final);
+
+			batch.pop_adult_neg += stride_adult_neg;
+			batch.pop_adult_hiv += stride_adult_hiv;
+			batch.pop_child_neg += stride_child_neg;
+			batch.pop_child_hiv += stride_child_hiv;
+			batch.dth_adult_neg += stride_adult_neg;
+			batch.dth_adult_hiv += stride_adult_hiv;
+			batch.dth_child_neg += stride_child_neg;
+			batch.dth_child_hiv += stride_child_hiv;
+			batch.births += stride_births;
+			batch.births_exposed += stride_births_exposed;
+			batch.new_infections += stride_newhiv;
+			batch.partner_rate += stride_partner_rate;
+			batch.pop_assort += stride_pop_assort;
+			batch.pwid_force += stride_pwid_force;
+		}
+	} catch (...) {
+		share_storage(shared);
+		proj->invalidate(-1);
+		throw;
+	}
+
+	share_storage(shared);
+	proj->invalidate(-1);
+}
+
+void GoalsProj::require_outputs() const {
+	const bool outputs_shared(
+		shared.pop_adult_neg != nullptr &&
+		shared.dth_adult_neg != nullptr &&
+		shared.births != nullptr &&
+		shared.births_exposed != nullptr &&
+		shared.new_infections != nullptr);
+	if (cloned && !outputs_shared) {
+		throw std::runtime_error("a cloned projection must be passed storage via every share_output_* method before projecting");
+	}
+}
+
+void GoalsProj::share_storage(const SharedStorage& storage) {
+	if (storage.pop_adult_neg != nullptr) {
+		proj->pop.share_storage(storage.pop_adult_neg, storage.pop_adult_hiv, storage.pop_child_neg, storage.pop_child_hiv);
+	}
+	if (storage.dth_adult_neg != nullptr) {
+		proj->dth.share_storage(storage.dth_adult_neg, storage.dth_adult_hiv, storage.dth_child_neg, storage.dth_child_hiv);
+	}
+	if (storage.births != nullptr) proj->dat.share_births(storage.births);
+	if (storage.births_exposed != nullptr) proj->dat.share_births_exposed(storage.births_exposed);
+	if (storage.new_infections != nullptr) proj->dat.share_new_infections(storage.new_infections);
+	if (storage.partner_rate != nullptr) proj->dat.share_partner_rate(storage.partner_rate);
+	if (storage.age_mixing != nullptr) proj->dat.share_age_mixing(storage.age_mixing);
+	if (storage.pop_assort != nullptr) proj->dat.share_pop_assortativity(storage.pop_assort);
+	if (storage.pwid_force != nullptr) proj->dat.share_pwid_risk(storage.pwid_force, storage.needle_sharing);
+}
+
 void GoalsProj::invalidate(const int year) {
 	proj->invalidate(year);
 }
@@ -15,6 +15,31 @@ public:
 	GoalsProj(const int year_start, const int year_final);
 	~GoalsProj();
 
+	/// Copy a projection, including its inputs and its calculation state
+	/// @details The copy does not record the original's client storage, but its
+	/// engine still refers to that storage until the client passes new storage
+	/// via share_input_* and share_output_*. project and project_batch throw
+	/// until new storage has been passed via every share_output_* method.
+	/// This relies on DP::Projection's copy constructor copying the engine's
+	/// state by value, so clients should use clone, which checks enable_copies.
+	GoalsProj(const GoalsProj& other);
+	GoalsProj& operator=(const GoalsProj&) = delete;
+
+	/// Copy a projection as in the copy constructor
+	/// @return a new projection owned by the caller
+	/// @details Throws unless copies have been enabled via enable_copies.
+	GoalsProj* clone() const;
+
+	/// Allow or forbid copying DP::Projection instances process-wide
+	/// @param flag true to allow copies
+	/// @details Copies are disabled by default until DP::Projection's copy
+	/// semantics are confirmed for the GoalsARM version the module is built
+	/// against. Clients that cannot copy projections initialize new ones instead.
+	static void enable_copies(const bool flag);
+
+	/// Return true if copies are allowed (see enable_copies)
+	static bool copies_allowed();
+
 	/// Pass memory for storing output population sizes.
 	/// @param adult_neg HIV-negative adults, by year, sex, age, risk
 	/// @param adult_hiv HIV-positive adults, by year, sex, age, risk, CD4, and care status
@@ -73,8 +98,20 @@ public:
 
 	/// Use a UPD file to initialize demographic inputs
 	/// @param upd_filename UPD file name
+	/// @details If copies are enabled (see enable_copies), parsed UPD files are cached
+	/// process-wide by path, modification time and projection years. The first
+	/// projection to use a file parses it, and later projections copy the cached
+	/// result instead of reading the file again. Otherwise every call parses the file. Storage
+	/// passed via share_input_* and share_output_* is kept. A cached copy replaces
+	/// inputs set earlier via init_* and use_direct_incidence, so call this first.
 	void initialize(const std::string& upd_filename);
 
+	/// Discard every cached UPD file (see initialize)
+	static void clear_upd_cache();
+
+	/// Return the number of cached UPD files
+	static size_t upd_cache_size();
+
 	/// Initialize proportionate age-specific fertility (PASFR) from inputs by five-year age group
 	/// @param pasfrs5y an array by year and age group (15-19, 20-24, ..., 45-49)
 	/// This initialization method is provided for compatibility with Spectrum.
@@ -278,9 +315,49 @@ public:
 	/// @param year_final the last year to project
 	/// @details If project(...) is called repeatedly, each calculation will
 	/// resume from the latest year calculated in previous calls. Use invalidate(...)
-	/// to resume calculations from an earlier year.
+	/// to resume calculations from an earlier year. The GIL is released during
+	/// the calculation.
 	void project(const int year_final);
 
+	/// Calculate projections for several sets of inputs in a single call
+	/// @param year_final the last year to project
+	/// @param partner_rate partner rates by set, then as in share_input_partner_rate
+	/// @param pop_assort assortativity parameters by set, then as in share_input_pop_assort
+	/// @param pwid_force force of infection among PWID by set, year and sex
+	/// @param transmission transmission parameters by set. Each set has 10 values,
+	/// ordered as the arguments to init_transmission
+	/// @param seed_prev HIV prevalence in the first year of the HIV epidemic by set
+	/// @param adult_neg, adult_hiv, child_neg, child_hiv population outputs by set, then as in share_output_population
+	/// @param births births by set, then as in share_output_births
+	/// @param deaths_adult_neg, deaths_adult_hiv, deaths_child_neg, deaths_child_hiv deaths by set, then as in share_output_deaths
+	/// @param newhiv new HIV infections by set, then as in share_output_new_infections
+	/// @param births_exposed births to mothers living with HIV by set, then as in share_output_births_exposed
+	/// @details Each set is projected from the first year after pointing the
+	/// engine at that set's slice of the input and output arrays. Other inputs are
+	/// shared by all sets. The GIL is released while sets are projected. When the
+	/// batch finishes, storage shared via share_input_* and share_output_* is
+	/// restored and the projection is invalidated. Transmission parameters and
+	/// seed prevalence are left at the values of the final set, so clients should
+	/// reinitialize them via init_transmission and init_epidemic_seed.
+	void project_batch(
+		const int year_final,
+		array_double_t partner_rate,
+		array_double_t pop_assort,
+		array_double_t pwid_force,
+		array_double_t transmission,
+		array_double_t seed_prev,
+		array_double_t adult_neg,
+		array_double_t adult_hiv,
+		array_double_t child_neg,
+		array_double_t child_hiv,
+		array_double_t births,
+		array_double_t deaths_adult_neg,
+		array_double_t deaths_adult_hiv,
+		array_double_t deaths_child_neg,
+		array_double_t deaths_child_hiv,
+		array_double_t newhiv,
+		array_double_t births_exposed);
+
 
 	/// Invalidate projected calculations from year onward.
 	/// @param year Invalidate calculated outcomes from this year onward.
@@ -296,8 +373,39 @@ public:
 	void use_direct_incidence(const bool flag);
 
 private:
+	/// Pointers to client memory shared via share_input_* and share_output_*.
+	/// We keep these so that methods that temporarily redirect the engine to
+	/// other storage can restore the client's storage afterward.
+	struct SharedStorage {
+		double* pop_adult_neg = nullptr;
+		double* pop_adult_hiv = nullptr;
+		double* pop_child_neg = nullptr;
+		double* pop_child_hiv = nullptr;
+		double* dth_adult_neg = nullptr;
+		double* dth_adult_hiv = nullptr;
+		double* dth_child_neg = nullptr;
+		double* dth_child_hiv = nullptr;
+		double* births = nullptr;
+		double* births_exposed = nullptr;
+		double* new_infections = nullptr;
+		double* partner_rate = nullptr;
+		double* age_mixing = nullptr;
+		double* pop_assort = nullptr;
+		double* pwid_force = nullptr;
+		double* needle_sharing = nullptr;
+	};
+
+	/// Point the calculation engine at storage. Null pointers are skipped.
+	void share_storage(const SharedStorage& storage);
+
+	/// Throw if this is a copy that has not been passed its own output storage
+	void require_outputs() const;
+
 	DP::Projection* proj;
 	size_t num_years;
+	int year_first;
+	SharedStorage shared;
+	bool cloned = false;
 };
 
 // GoalsProj is an interface to the calculation engine
@@ -321,6 +429,13 @@ private:
 // 
 // py::keep_alive<1,n>() keeps the garbage collector from deallocating argument 
 // n so long as the GoalsProj instance (argument 1) is still alive
+// 
+// Threading: methods that do not take array arguments and may run for a while
+// (initialize, project) release the GIL via py::call_guard. Methods that take
+// arrays must hold the GIL while the array buffers are requested, so heavier
+// ones (project_batch, init_sti_prev, init_male_circumcision_uptake) release
+// it internally with py::gil_scoped_release once that is done. Distinct
+// GoalsProj instances may then be used concurrently from different threads.
 PYBIND11_MODULE(goals_proj, m) {
 	py::class_<GoalsProj>(m, "Projection")
 		.def(py::init<const int, const int>())
@@ -335,7 +450,7 @@ PYBIND11_MODULE(goals_proj, m) {
 		.def("share_input_pop_assort",	    &GoalsProj::share_input_pop_assort,      py::keep_alive<1,2>())
 		.def("share_input_pwid_risk",       &GoalsProj::share_input_pwid_risk,       py::keep_alive<1,2>(), py::keep_alive<1,3>())
 
-		.def("initialize",                    &GoalsProj::initialize)
+		.def("initialize",                    &GoalsProj::initialize, py::call_guard<py::gil_scoped_release>())
 		.def("init_pasfrs_from_5yr",          &GoalsProj::init_pasfrs_from_5yr)
 		.def("init_migr_from_5yr",            &GoalsProj::init_migr_from_5yr)
 		.def("init_direct_incidence",         &GoalsProj::init_direct_incidence)
@@ -362,13 +477,20 @@ PYBIND11_MODULE(goals_proj, m) {
 		.def("init_effect_vmmc",              &GoalsProj::init_effect_vmmc)
 		.def("init_effect_condom",            &GoalsProj::init_effect_condom)
 
-		.def("project",    &GoalsProj::project)
-		.def("invalidate", &GoalsProj::invalidate)
+		.def("project",       &GoalsProj::project, py::call_guard<py::gil_scoped_release>())
+		.def("project_batch", &GoalsProj::project_batch)
+		.def("invalidate",    &GoalsProj::invalidate)
+		.def("clone",         &GoalsProj::clone)
 
 		.def("use_direct_incidence", &GoalsProj::use_direct_incidence)
 
 		;
 
+	m.def("enable_projection_copies",  &GoalsProj::enable_copies);
+	m.def("projection_copies_enabled", &GoalsProj::copies_allowed);
+	m.def("upd_cache_clear",           &GoalsProj::clear_upd_cache);
+	m.def("upd_cache_size",            &GoalsProj::upd_cache_size);
+
 #ifdef VERSION_INFO
 #else
 	m.attr("__version__") = "dev";
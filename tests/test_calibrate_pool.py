@@ -0,0 +1,33 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from goals.goals_shared import SharedOutputs
+
+## Tests of process-pool calibration in scripts/calibrate.py
+
+@pytest.fixture(scope="module")
+def calibrate():
+    pytest.importorskip("percussion")
+    pytest.importorskip("plotnine")
+    sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+    import calibrate
+    return calibrate
+
+def test_pool_posterior_outputs(calibrate):
+    xlsx_name = str(Path("inputs") / "example-inputs.xlsx")
+    fitter = calibrate.GoalsFitter(xlsx_name, None, None, None)
+    p_init = np.array([fitter._pardat[key].initial_value for key in fitter._par_keys])
+    param_sets = [p_init * scale for scale in np.linspace(0.9, 1.1, 5)]
+
+    ## Each worker evaluates several parameter sets in one map call
+    with calibrate.FitterPool(2, xlsx_name, None, None, None) as pool:
+        results = pool.posterior(param_sets)
+
+    for params, (post_val, description) in zip(param_sets, results):
+        assert post_val == fitter.posterior(params)
+        with SharedOutputs(description, unlink=True) as outputs:
+            np.testing.assert_array_equal(outputs.pop_adult_hiv, fitter.hivsim.pop_adult_hiv)
+            np.testing.assert_array_equal(outputs.births, fitter.hivsim.births)
@@ -0,0 +1,62 @@
+from pathlib import Path
+
+import numpy as np
+import openpyxl
+import pytest
+
+import goals.goals_const as CONST
+import goals.goals_utils as Utils
+from goals.goals_model import Model
+
+## Unit tests for batched projection
+
+@pytest.fixture(scope="module")
+def model():
+    goals = Model()
+    goals.init_from_xlsx(Path(__file__).parent.parent / "inputs" / "example-inputs.xlsx")
+    return goals
+
+
+def test_batch_matches_serial(model):
+    model.invalidate(-1)
+    model.project(model.year_final)
+    pop_adult_hiv = model.pop_adult_hiv.copy()
+    births_exposed = model.births_exposed.copy()
+
+    inputs = model.batch_inputs(3)
+    inputs['seed_prev'][1] *= 2.0
+    inputs['transmission'][2,0] *= 0.5
+    outputs = model.project_batch(model.year_final, inputs)
+
+    ## Sets with unchanged inputs reproduce the serial projection
+    np.testing.assert_allclose(outputs['pop_adult_hiv'][0], pop_adult_hiv, rtol=1e-12)
+    np.testing.assert_allclose(outputs['births_exposed'][0], births_exposed, rtol=1e-12)
+    assert not np.allclose(outputs['pop_adult_hiv'][1], pop_adult_hiv)
+    assert not np.allclose(outputs['pop_adult_hiv'][2], pop_adult_hiv)
+
+    ## The model's own outputs are untouched and it reprojects to the same values
+    np.testing.assert_array_equal(model.pop_adult_hiv, pop_adult_hiv)
+    model.project(model.year_final)
+    np.testing.assert_allclose(model.pop_adult_hiv, pop_adult_hiv, rtol=1e-12)
+
+
+def test_batch_shape(model):
+    inputs = model.batch_inputs(2)
+    inputs['pop_assort'] = np.zeros((3, CONST.N_SEX, CONST.N_POP))
+    with pytest.raises(RuntimeError):
+        model.project_batch(model.year_final, inputs)
+
+
+def test_batch_direct_incidence():
+    ## Switch the example inputs to the direct incidence inputs in the same workbook
+    xlsx_name = Path(__file__).parent.parent / "inputs" / "example-inputs.xlsx"
+    inputs = Utils.xlsx_load_inputs(xlsx_name)
+    inputs['config'] = dict(inputs['config'], **{CONST.CFG_USE_DIRECT_INCI : True})
+    wb = openpyxl.load_workbook(filename=xlsx_name, read_only=True)
+    (inputs['inci'], inputs['sirr'], inputs['airr_m'], inputs['airr_f'],
+     inputs['rirr_m'], inputs['rirr_f']) = Utils.xlsx_load_inci(wb[CONST.XLSX_TAB_INCI])
+
+    goals = Model()
+    goals.reinit_from_inputs(inputs)
+    with pytest.raises(ValueError, match="direct incidence"):
+        goals.batch_inputs(2)
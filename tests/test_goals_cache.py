@@ -0,0 +1,48 @@
+import numpy as np
+
+import goals.goals_cache as Cache
+
+## Unit tests for the evaluation cache
+
+def test_lru_eviction():
+    cache = Cache.EvaluationCache(capacity=2)
+    for k in range(3):
+        cache.put(np.array([k, 0.5]), [float(k)])
+    assert len(cache) == 2
+    assert cache.get(np.array([0, 0.5])) is None
+    assert cache.get(np.array([2, 0.5]))[0][0] == 2.0
+
+def test_disk_tier(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    summary = {'plhiv' : np.arange(6, dtype=np.float32).reshape((3, 2))}
+    first = Cache.EvaluationCache(capacity=1, path=path, fingerprint='abc')
+    first.put([1.0, 2.0], [-3.0, -1.0, -2.0], summary)
+    first.put([1.0, 3.0], [-4.0, -2.0, -2.0])
+    first.close()
+
+    second = Cache.EvaluationCache(path=path, fingerprint='abc')
+    values, stored = second.get([1.0, 2.0])
+    np.testing.assert_array_equal(values, [-3.0, -1.0, -2.0])
+    np.testing.assert_array_equal(stored['plhiv'], summary['plhiv'])
+    assert second.get([1.0, 3.0])[1] is None
+    assert (second.hits, second.misses) == (2, 0)
+
+    other = Cache.EvaluationCache(path=path, fingerprint='xyz')
+    assert other.get([1.0, 2.0]) is None
+
+def test_fingerprint(tmp_path):
+    file_name = tmp_path / 'inputs.csv'
+    file_name.write_text('a,b\n1,2\n')
+    before = Cache.fingerprint(str(file_name), None)
+    assert before != Cache.fingerprint(None, str(file_name))
+    file_name.write_text('a,b\n1,3\n')
+    assert before != Cache.fingerprint(str(file_name), None)
+
+def test_code_fingerprint(tmp_path):
+    file_name = tmp_path / 'script.py'
+    file_name.write_text('x = 1\n')
+    before = Cache.code_fingerprint(str(file_name))
+    assert before == Cache.code_fingerprint(str(file_name))
+    assert before.endswith('-%d' % (Cache.CACHE_VERSION))
+    file_name.write_text('x = 2\n')
+    assert before != Cache.code_fingerprint(str(file_name))
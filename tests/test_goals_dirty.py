@@ -0,0 +1,43 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+import goals.goals_const as CONST
+from goals.goals_model import Model
+
+## Unit tests for incremental reprojection after input changes
+
+@pytest.fixture(scope="module")
+def model():
+    goals = Model()
+    goals.init_from_xlsx(Path(__file__).parent.parent / "inputs" / "example-inputs.xlsx")
+    goals.project(goals.year_final)
+    return goals
+
+
+def full_reprojection(model):
+    model.invalidate(-1)
+    model.project(model.year_final)
+    return model.pop_adult_hiv.copy()
+
+
+def test_likelihood_pars_keep_projection(model):
+    model.likelihood_par[CONST.LHOOD_ANCSS_BIAS] += 0.1
+    model.project(model.year_final)
+    assert model.last_valid_year() == model.year_final
+
+
+@pytest.mark.parametrize("change", ["transmission", "pwid_force", "partner_time_trend", "hiv_frr", "sti_prev", "condom_freq", "art_prop"])
+def test_incremental_matches_full(model, change):
+    match change:
+        case "transmission":       model.epi_pars[CONST.EPI_TRANSMIT_M2F] *= 1.1
+        case "pwid_force":         model.pwid_force[30:,:] *= 0.5
+        case "partner_time_trend": model.partner_time_trend[CONST.SEX_MALE,:] *= 1.1
+        case "hiv_frr":            model.hiv_frr['laf'] *= 0.9
+        case "sti_prev":           model.sti_prev[40:] *= 2.0
+        case "condom_freq":        model.condom_freq[35:,:] *= 0.5
+        case "art_prop":           model.art_prop[45:,:] = np.minimum(model.art_prop[45:,:] + 0.1, 1.0)
+    model.project(model.year_final)
+    pop_adult_hiv = model.pop_adult_hiv.copy()
+    np.testing.assert_allclose(pop_adult_hiv, full_reprojection(model), rtol=1e-12)
@@ -0,0 +1,32 @@
+import numpy as np
+
+import goals.goals_emulator as Emulator
+
+## Unit tests for surrogate-assisted minimization
+
+def test_gaussian_process_interpolates():
+    rng = np.random.default_rng(1)
+    func = lambda x : np.sin(3.0 * x[:,0]) + x[:,1]**2
+    x = rng.uniform(size=(40, 2))
+    gp = Emulator.GaussianProcess().fit(x, func(x))
+    x_new = rng.uniform(size=(100, 2))
+    mean = gp.predict(x_new)[0]
+    np.testing.assert_allclose(mean, func(x_new), atol=1e-2)
+    assert np.all(gp.predict(x)[1] < 1e-2)
+
+def test_minimize_components():
+    calls = []
+    def func(x):
+        calls.append(x)
+        return np.array([(x[0] - 0.3)**2, 2.0 * (x[1] + 0.2)**2])
+    res = Emulator.minimize(func, [-1.0, -1.0], [1.0, 1.0], exact=lambda x : 0.1 * x[0]**2, max_evals=60, seed=0)
+    np.testing.assert_allclose(res.x, [0.3 / 1.1, -0.2], atol=2e-2)
+    assert res.nfev == len(calls) <= 60
+    assert res.fun == sum(func(res.x)) + 0.1 * res.x[0]**2
+
+def test_minimize_caps_design():
+    func = lambda x : np.array([np.sum((x - 0.1)**2)])
+    res = Emulator.minimize(func, [-1.0] * 3, [1.0] * 3, num_design=30, max_evals=10, seed=0)
+    assert res.nfev <= 10
+    assert res.nit >= 5
+    assert res.emulator is not None
@@ -0,0 +1,30 @@
+from pathlib import Path
+
+import numpy as np
+
+import goals.goals_const as CONST
+from goals.goals_ensemble import Ensemble
+from goals.goals_model import Model
+
+## Unit tests for thread-pool ensembles
+
+def test_ensemble_matches_serial():
+    xlsx_name = Path("inputs") / "example-inputs.xlsx"
+    ref = Model()
+    ref.init_from_xlsx(xlsx_name)
+    ref.project(ref.year_final)
+
+    def setup(model, k):
+        ## Vary seed prevalence for all but the first model
+        if k > 0:
+            model._proj.init_epidemic_seed(model.epi_pars[CONST.EPI_INITIAL_YEAR] - model.year_first,
+                                           model.epi_pars[CONST.EPI_INITIAL_PREV] * (1.0 + k))
+
+    with Ensemble(3, xlsx_name, max_workers=3) as ensemble:
+        ensemble.project(ref.year_final, setup)
+        models = ensemble.models
+
+    assert len({id(model.pop_adult_hiv) for model in models}) == 3
+    np.testing.assert_allclose(models[0].pop_adult_hiv, ref.pop_adult_hiv, rtol=1e-12)
+    assert not np.allclose(models[1].pop_adult_hiv, ref.pop_adult_hiv)
+    assert not np.allclose(models[1].pop_adult_hiv, models[2].pop_adult_hiv)
@@ -42,3 +42,21 @@ def test_external_clhiv():
     np.testing.assert_allclose(out_by_age, ref_by_age, rtol=1e-10)
     np.testing.assert_allclose(out_by_cd4[:6], ref_by_cd4, rtol=1e-10)
     np.testing.assert_allclose(out_by_art, ref_by_art, rtol=1e-10)
+
+
+def test_init_from_snapshot(tmp_path):
+    xlsx_name = Path("inputs") / "example-inputs.xlsx"
+    snap_name = tmp_path / "example-inputs.npz"
+
+    ref = Model()
+    ref.init_from_xlsx(xlsx_name)
+    ref.project(ref.year_final)
+
+    ## The first call compiles the snapshot, the second reads it
+    for _ in range(2):
+        out = Model()
+        out.init_from_snapshot(snap_name, xlsx_name)
+        out.project(out.year_final)
+        np.testing.assert_allclose(out.pop_adult_hiv, ref.pop_adult_hiv, rtol=1e-12)
+        np.testing.assert_allclose(out.pop_adult_neg, ref.pop_adult_neg, rtol=1e-12)
+        np.testing.assert_allclose(out.births, ref.births, rtol=1e-12)
@@ -0,0 +1,123 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+import goals_proj as Goals
+import goals.goals_const as CONST
+from goals.goals_model import Model
+
+## Unit tests for checkpointing and forking projections
+
+@pytest.fixture(scope="module")
+def model():
+    goals = Model()
+    goals.init_from_xlsx(Path(__file__).parent.parent / "inputs" / "example-inputs.xlsx")
+    return goals
+
+
+@pytest.fixture(autouse=True)
+def restore_copies():
+    enabled = Goals.projection_copies_enabled()
+    yield
+    Goals.enable_projection_copies(enabled)
+
+
+@pytest.fixture(params=[False, True], ids=["reinit", "copy"])
+def copies(request):
+    """! Run a test with forks that initialize new engines, then with forks that copy engines"""
+    Goals.enable_projection_copies(request.param)
+    return request.param
+
+
+def test_fork_resumes_from_checkpoint(model, copies):
+    year = 2010
+    base = model.checkpoint(year)
+    assert base.last_valid_year() == year
+
+    ## A scenario that changes inputs after the checkpoint
+    scenario = base.fork()
+    scenario.pwid_force[(year + 1 - scenario.year_first):,:] *= 0.5
+    scenario.project(scenario.year_final)
+
+    ## The same scenario projected from the first year
+    model.pwid_force[(year + 1 - model.year_first):,:] *= 0.5
+    model.invalidate(-1)
+    model.project(model.year_final)
+
+    np.testing.assert_allclose(scenario.pop_adult_hiv, model.pop_adult_hiv, rtol=1e-12)
+    np.testing.assert_allclose(scenario.new_infections, model.new_infections, rtol=1e-12)
+
+
+def test_fork_is_independent(model, copies):
+    model.project(model.year_final)
+    pop_adult_hiv = model.pop_adult_hiv.copy()
+
+    other = model.fork()
+    other.epi_pars[CONST.EPI_TRANSMIT_F2M] *= 2.0
+    other.project(other.year_final)
+
+    assert not np.allclose(other.pop_adult_hiv, pop_adult_hiv)
+    np.testing.assert_array_equal(model.pop_adult_hiv, pop_adult_hiv)
+    assert model.epi_pars[CONST.EPI_TRANSMIT_F2M] != other.epi_pars[CONST.EPI_TRANSMIT_F2M]
+
+
+def test_fork_and_parent_diverge(model, copies):
+    model.invalidate(-1)
+    model.project(model.year_final)
+    other = model.fork()
+
+    ## Project the parent and the fork to different inputs
+    model.epi_pars[CONST.EPI_TRANSMIT_F2M] *= 0.5
+    other.epi_pars[CONST.EPI_TRANSMIT_F2M] *= 2.0
+    model.project(model.year_final)
+    other.project(other.year_final)
+    parent_hiv, other_hiv = model.pop_adult_hiv.copy(), other.pop_adult_hiv.copy()
+
+    ## Reprojecting either one from the first year reproduces its own outputs
+    model.invalidate(-1)
+    model.project(model.year_final)
+    other.invalidate(-1)
+    other.project(other.year_final)
+    assert not np.allclose(parent_hiv, other_hiv)
+    np.testing.assert_allclose(model.pop_adult_hiv, parent_hiv, rtol=1e-12)
+    np.testing.assert_allclose(other.pop_adult_hiv, other_hiv, rtol=1e-12)
+    model.epi_pars[CONST.EPI_TRANSMIT_F2M] *= 2.0
+
+
+def test_fork_without_copies_keeps_inputs(model):
+    Goals.enable_projection_copies(False)
+    model.pwid_force *= 0.5
+    other = model.fork()
+    model.pwid_force *= 2.0
+    np.testing.assert_array_equal(other.pwid_force, 0.5 * model.pwid_force)
+    assert other.last_valid_year() == model.last_valid_year()
+
+
+def test_clone_leaves_source_untouched(model):
+    model.project(model.year_final)
+    before = {name : getattr(model, name).copy() for name in model._output_names}
+
+    ## Clones are only allowed once copies are enabled
+    Goals.enable_projection_copies(False)
+    with pytest.raises(RuntimeError):
+        model._proj.clone()
+    Goals.enable_projection_copies(True)
+
+    ## A clone must be given its own output storage before it projects
+    proj = model._proj.clone()
+    with pytest.raises(RuntimeError):
+        proj.project(model.year_final)
+
+    outputs = {name : np.zeros_like(getattr(model, name)) for name in model._output_names}
+    proj.share_output_population(outputs['pop_adult_neg'], outputs['pop_adult_hiv'], outputs['pop_child_neg'], outputs['pop_child_hiv'])
+    proj.share_output_births(outputs['births'])
+    proj.share_output_deaths(outputs['deaths_adult_neg'], outputs['deaths_adult_hiv'], outputs['deaths_child_neg'], outputs['deaths_child_hiv'])
+    proj.share_output_new_infections(outputs['new_infections'])
+    proj.share_output_births_exposed(outputs['births_exposed'])
+    proj.invalidate(-1)
+    proj.project(model.year_final)
+
+    for name in model._output_names:
+        np.testing.assert_array_equal(getattr(model, name), before[name])
+        np.testing.assert_allclose(outputs[name], before[name], rtol=1e-12)
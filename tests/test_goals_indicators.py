@@ -0,0 +1,51 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import goals.goals_const as CONST
+import goals.goals_indicators as Indicators
+
+## Unit tests for standard indicators. These compare indicators calculated from
+## random outputs to direct calculations from the full output arrays.
+
+NUM_YEARS = 4
+
+@pytest.fixture
+def model():
+    rng = np.random.default_rng(11)
+    shp_adult_neg = (NUM_YEARS, CONST.N_SEX_MC, CONST.N_AGE_ADULT, CONST.N_POP)
+    shp_adult_hiv = shp_adult_neg + (CONST.N_HIV_ADULT, CONST.N_DTX)
+    return SimpleNamespace(year_first=2010, year_final=2010 + NUM_YEARS - 1, _dtype=np.float64, _order="C",
+                           _year_version=np.ones(NUM_YEARS, dtype=np.int64),
+                           pop_adult_neg=rng.uniform(size=shp_adult_neg),
+                           pop_adult_hiv=rng.uniform(size=shp_adult_hiv),
+                           deaths_adult_hiv=rng.uniform(size=shp_adult_hiv),
+                           new_infections=rng.uniform(size=(NUM_YEARS, CONST.N_SEX_MC, CONST.N_AGE, CONST.N_POP)))
+
+def by_sex(vals):
+    return np.stack([vals[:,CONST.SEX_FEMALE], vals[:,CONST.SEX_MALE_U:].sum(axis=1)], axis=1)
+
+def test_indicators(model):
+    ind = Indicators.calc_indicators(model)
+    hiv = by_sex(model.pop_adult_hiv)
+    neg = by_sex(model.pop_adult_neg)
+    hiv_15_49 = hiv[:,:,0:35].sum((2,3,4,5))
+    neg_15_49 = neg[:,:,0:35].sum((2,3))
+
+    np.testing.assert_allclose(ind['plhiv'].values, hiv.sum((2,3,4,5)))
+    np.testing.assert_allclose(ind['prevalence_15_49'].values, hiv_15_49 / (hiv_15_49 + neg_15_49))
+    np.testing.assert_allclose(ind['plhiv_by_age'].values[:,:,1], hiv[:,:,5:10].sum((2,3,4,5)))
+    np.testing.assert_allclose(ind['plhiv_by_age'].values[:,:,-1], hiv[:,:,65].sum((2,3,4)))
+    np.testing.assert_allclose(ind['art_coverage'].values, hiv[...,CONST.DTX_ART_MIN:].sum((2,3,4,5)) / hiv.sum((2,3,4,5)))
+    np.testing.assert_allclose(ind['incidence_15_49'].values[1:], by_sex(model.new_infections)[1:,:,15:50].sum((2,3)) / neg_15_49[:-1])
+    assert np.isnan(ind['incidence_15_49'].values[0]).all()
+    np.testing.assert_allclose(ind['deaths_plhiv'].values, by_sex(model.deaths_adult_hiv).sum((2,3,4,5)))
+
+    assert ind['plhiv_by_age'].dims == ['Year', 'Sex', 'AgeGroup']
+    assert ind['plhiv_by_age'].coords['AgeGroup'][-1] == '80+'
+    assert ind['plhiv'].coords['Year'] == list(range(2010, 2010 + NUM_YEARS))
+
+def test_unrecognized_indicator(model):
+    with pytest.raises(ValueError):
+        Indicators.calc_indicators(model, ['prevalence_unicorns'])
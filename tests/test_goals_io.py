@@ -0,0 +1,49 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import goals.goals_const as CONST
+import goals.goals_io as Io
+
+## Unit tests for model output writers
+
+pytest.importorskip("pyarrow")
+
+@pytest.fixture
+def model():
+    rng = np.random.default_rng(42)
+    num_years = 5
+    return SimpleNamespace(year_first=1970,
+                           births=rng.uniform(size=(num_years, CONST.N_SEX)),
+                           births_exposed=rng.uniform(size=(num_years,)),
+                           pop_adult_hiv=rng.uniform(size=(num_years, CONST.N_SEX_MC, CONST.N_AGE_ADULT, CONST.N_POP, CONST.N_HIV_ADULT, CONST.N_DTX)))
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+def test_round_trip(model, tmp_path, fmt):
+    names = ['births', 'births_exposed', 'pop_adult_hiv']
+    files = Io.write_outputs(model, tmp_path, fmt, names)
+    for name, file_name in zip(names, files):
+        array, meta = Io.read_output(file_name)
+        np.testing.assert_array_equal(array, getattr(model, name))
+        assert meta['dims'] == Io.OUTPUTS[name][1]
+        assert meta['year_first'] == model.year_first
+
+def test_long_format(model, tmp_path):
+    import pyarrow.parquet as pq
+    file_name = Io.write_outputs(model, tmp_path, 'parquet', ['births'])[0]
+    table = pq.read_table(file_name).to_pydict()
+    for year, sex, value in zip(table['Year'], table['Sex'], table['Value']):
+        assert model.births[year, sex] == value
+
+def test_csv_matches(model, tmp_path):
+    pd = pytest.importorskip("pandas")
+    file_name = Io.write_outputs(model, tmp_path, 'csv', ['births'])[0]
+    frame = pd.read_csv(file_name)
+    np.testing.assert_allclose(frame['Value'].to_numpy().reshape(model.births.shape), model.births)
+
+def test_csv_options(model, tmp_path):
+    pd = pytest.importorskip("pandas")
+    file_name = Io.write_outputs(model, tmp_path, 'csv', ['births'], float_format='%.3f')[0]
+    frame = pd.read_csv(file_name)
+    np.testing.assert_array_equal(frame['Value'].to_numpy().reshape(model.births.shape), np.round(model.births, 3))
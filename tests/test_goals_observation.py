@@ -0,0 +1,65 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import goals.goals_const as CONST
+import goals.goals_observation as Observation
+
+## Unit tests for observation plans. These compare plan estimates to direct
+## sums over model outputs, so they do not need a projection.
+
+YEAR_FIRST = 1970
+NUM_YEARS = 12
+
+@pytest.fixture
+def hivsim():
+    rng = np.random.default_rng(2024)
+    shp_neg = (NUM_YEARS, CONST.N_SEX_MC, CONST.N_AGE_ADULT, CONST.N_POP)
+    shp_hiv = shp_neg + (CONST.N_HIV_ADULT, CONST.N_DTX)
+    return SimpleNamespace(year_first=YEAR_FIRST,
+                           pop_adult_neg=rng.uniform(0, 1000, shp_neg),
+                           pop_adult_hiv=rng.uniform(0, 10, shp_hiv),
+                           deaths_adult_neg=rng.uniform(0, 10, shp_neg),
+                           deaths_adult_hiv=rng.uniform(0, 1, shp_hiv))
+
+def direct_sum(array, year, sex, amin, amax, pop):
+    sex_min, sex_max = Observation.SEX_RANGES['Men' if pop == 'TGW' else sex]
+    pop_min, pop_max = Observation.POP_RANGES[pop]
+    return array[year - YEAR_FIRST, sex_min:sex_max, amin-CONST.AGE_ADULT_MIN:amax-CONST.AGE_ADULT_MIN+1, pop_min:pop_max].sum()
+
+def test_prevalence_plan(hivsim):
+    template = pd.DataFrame({'Population' : ['All', 'All', 'FSW', 'MSM', 'TGW', 'PWID', 'Clients', 'All'],
+                             'Gender'     : ['All', 'Women', 'Women', 'Men', 'All', 'Men', 'Men', 'Men'],
+                             'Year'       : [1975, 1975, 1980, 1971, 1981, 1970, 1980, 1975],
+                             'AgeMin'     : [15, 15, 15, 20, 15, 25, 15, 80],
+                             'AgeMax'     : [49, 24, 49, 29, 80, 25, 64, 80]})
+    Observation.PrevalencePlan(template, YEAR_FIRST).fill(hivsim, template)
+    for row in template.itertuples():
+        args = (row.Year, row.Gender, row.AgeMin, row.AgeMax, row.Population)
+        pop_hiv = direct_sum(hivsim.pop_adult_hiv, *args)
+        pop_neg = direct_sum(hivsim.pop_adult_neg, *args)
+        assert row.Prevalence == pytest.approx(pop_hiv / (pop_hiv + pop_neg), rel=1e-12)
+
+def test_deaths_plan(hivsim):
+    template = pd.DataFrame({'Gender' : ['All', 'Women', 'Men'],
+                             'Year'   : [1972, 1972, 1979],
+                             'AgeMin' : [15, 15, 50],
+                             'AgeMax' : [80, 49, 54]})
+    Observation.DeathsPlan(template, YEAR_FIRST).fill(hivsim, template)
+    for row in template.itertuples():
+        args = (row.Year, row.Gender, row.AgeMin, row.AgeMax, 'All')
+        deaths = direct_sum(hivsim.deaths_adult_hiv, *args) + direct_sum(hivsim.deaths_adult_neg, *args)
+        assert row.Deaths == pytest.approx(deaths, rel=1e-12)
+
+def test_empty_template(hivsim):
+    template = pd.DataFrame(columns=['Population', 'Gender', 'Year', 'AgeMin', 'AgeMax'])
+    plan = Observation.PrevalencePlan(template, YEAR_FIRST)
+    assert len(plan) == 0
+    assert plan.evaluate(hivsim).shape == (0,)
+
+def test_unrecognized_population():
+    template = pd.DataFrame({'Population' : ['Truckers'], 'Gender' : ['Men'], 'Year' : [1970], 'AgeMin' : [15], 'AgeMax' : [49]})
+    with pytest.raises(ValueError):
+        Observation.PrevalencePlan(template, YEAR_FIRST)
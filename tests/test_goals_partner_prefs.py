@@ -0,0 +1,63 @@
+import math
+import warnings
+
+import numpy as np
+import pytest
+import scipy as sp
+
+import goals.goals_const as CONST
+import goals.goals_model as Goals
+
+## Unit tests for partner age mixing preferences
+
+def reference_prefs(age_prefs):
+    """! Direct loop calculation of age mixing preferences, for comparison"""
+    m, v = age_prefs[0] + 10.0, age_prefs[1]
+    target = m * m / (m * m + v)
+    x = 0.5 * math.pi - target
+    for k in range(5):
+        x = x - (x / math.tan(x) - target) / (1.0 / math.tan(x) - x / math.sin(x)**2)
+    oppo_dist = sp.stats.fisk(math.pi / x, -10, m * math.sin(x) / x)
+    same_dist = sp.stats.norm(0.0, math.sqrt(age_prefs[2]))
+
+    oppo_raw = np.zeros((CONST.N_AGE_ADULT, CONST.N_AGE_ADULT))
+    same_raw = np.zeros((CONST.N_AGE_ADULT, CONST.N_AGE_ADULT))
+    for a in range(CONST.AGE_ADULT_MIN, CONST.AGE_ADULT_MAX):
+        b = a - CONST.AGE_ADULT_MIN
+        diffs = range(CONST.AGE_ADULT_MIN - a, CONST.AGE_ADULT_MAX - a + 1)
+        oppo_raw[b,:-1] = np.diff(oppo_dist.cdf(diffs))
+        same_raw[b,:-1] = np.diff(same_dist.cdf(diffs))
+
+    mix = np.zeros((CONST.N_SEX, CONST.N_AGE_ADULT, CONST.N_SEX, CONST.N_AGE_ADULT))
+    for b in range(CONST.N_AGE_ADULT - 1):
+        mix[CONST.SEX_FEMALE, b, CONST.SEX_MALE,   :] = oppo_raw[b,:] / oppo_raw[b,:].sum()
+        mix[CONST.SEX_MALE,   b, CONST.SEX_FEMALE, :] = oppo_raw[:,b] / oppo_raw[:,b].sum()
+        mix[CONST.SEX_MALE,   b, CONST.SEX_MALE,   :] = same_raw[b,:] / same_raw[b,:].sum()
+    return mix
+
+
+@pytest.mark.parametrize("age_prefs", [[4.5, 20.0, 30.0], [2.0, 10.0, 5.0], [8.0, 40.0, 60.0]])
+def test_partner_prefs_match_reference(age_prefs):
+    mix = Goals.Model().calc_partner_prefs(np.array(age_prefs))
+    np.testing.assert_allclose(mix, reference_prefs(age_prefs), rtol=1e-12, atol=1e-15)
+
+
+def test_partner_prefs_cached():
+    Goals.calc_partner_prefs_cached.cache_clear()
+    model = Goals.Model()
+    mix1 = model.calc_partner_prefs(np.array([3.0, 15.0, 25.0]))
+    mix2 = model.calc_partner_prefs(np.array([3.0, 15.0, 25.0]))
+    assert Goals.calc_partner_prefs_cached.cache_info().hits == 1
+
+    ## Callers get their own writable copies
+    mix1[0,0,1,0] = -1.0
+    assert mix2[0,0,1,0] != -1.0
+
+
+def test_partner_prefs_workbook_shape():
+    ## The workbook loader returns age preferences as a column
+    age_prefs = np.array([[4.5], [20.0], [30.0]])
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        mix = Goals.Model().calc_partner_prefs(age_prefs)
+    np.testing.assert_allclose(mix, reference_prefs(age_prefs.ravel()), rtol=1e-12, atol=1e-15)
@@ -0,0 +1,46 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import goals.goals_const as CONST
+from goals.goals_profile import OutputProfile
+
+## Unit tests for output profiles. These use random outputs in place of a projection.
+
+NUM_YEARS = 4
+
+@pytest.fixture
+def model():
+    rng = np.random.default_rng(11)
+    shp_adult_neg = (NUM_YEARS, CONST.N_SEX_MC, CONST.N_AGE_ADULT, CONST.N_POP)
+    return SimpleNamespace(year_first=2000,
+                           births=rng.uniform(size=(NUM_YEARS, CONST.N_SEX)),
+                           pop_adult_hiv=rng.uniform(size=shp_adult_neg + (CONST.N_HIV_ADULT, CONST.N_DTX)),
+                           deaths_adult_hiv=rng.uniform(size=shp_adult_neg + (CONST.N_HIV_ADULT, CONST.N_DTX)))
+
+def test_collapse(model):
+    profile = OutputProfile(names=['births', 'pop_adult_hiv', 'deaths_adult_hiv'], drop=CONST.OUTPUT_DEATHS, collapse=['CD4', 'ART'])
+    assert profile.names == ['births', 'pop_adult_hiv']
+    outputs = profile.alloc(model)
+    profile.store(model, outputs)
+    assert outputs.pop_adult_hiv.dtype == np.float32
+    assert outputs.dims('pop_adult_hiv') == ['Year', 'Sex', 'Age', 'Risk']
+    np.testing.assert_allclose(outputs.pop_adult_hiv, model.pop_adult_hiv.sum((4,5)), rtol=1e-6)
+    np.testing.assert_allclose(outputs.births, model.births, rtol=1e-6)
+
+def test_draws_by_year(model):
+    profile = OutputProfile(np.float64, names=['pop_adult_hiv'], collapse={'pop_adult_hiv' : ['ART']})
+    outputs = profile.alloc(model, num_draws=2)
+    for year in range(model.year_first, model.year_first + NUM_YEARS):
+        profile.store(model, outputs, draw=1, year=year)
+    np.testing.assert_allclose(outputs.pop_adult_hiv[1], model.pop_adult_hiv.sum(5))
+    assert not outputs.pop_adult_hiv[0].any()
+    with pytest.raises(ValueError):
+        profile.store(model, outputs)
+
+def test_invalid():
+    with pytest.raises(ValueError):
+        OutputProfile(collapse=['Year'])
+    with pytest.raises(ValueError):
+        OutputProfile(collapse={'births' : ['CD4']})
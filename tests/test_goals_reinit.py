@@ -0,0 +1,68 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+import goals.goals_const as CONST
+import goals.goals_utils as Utils
+from goals.goals_model import Model
+from goals.goals_pool import ModelPool
+from goals.goals_results import Results
+
+## Unit tests for re-initializing models in place
+
+@pytest.fixture(scope="module")
+def inputs():
+    return Utils.xlsx_load_inputs(Path(__file__).parent.parent / "inputs" / "example-inputs.xlsx")
+
+
+def changed_inputs(inputs):
+    other = dict(inputs)
+    other['epi'] = dict(inputs['epi'])
+    other['epi'][CONST.EPI_TRANSMIT_M2F] *= 1.5
+    other['art_num'] = inputs['art_num'] * 0.5
+    return other
+
+
+def test_reinit_matches_fresh_model(inputs):
+    other = changed_inputs(inputs)
+    fresh = Model()
+    fresh._init_from_inputs(other)
+    fresh.project(fresh.year_final)
+
+    model = Model()
+    model._init_from_inputs(inputs)
+    model.project(model.year_final)
+    pop_adult_hiv = model.pop_adult_hiv
+
+    model.epi_pars[CONST.EPI_TRANSMIT_F2M] *= 2.0 # reset by reinit_from_inputs
+    model.reinit_from_inputs(other)
+    assert model.pop_adult_hiv is pop_adult_hiv
+    assert model.last_valid_year() == -1
+    model.project(model.year_final)
+
+    np.testing.assert_allclose(model.pop_adult_hiv, fresh.pop_adult_hiv, rtol=1e-12)
+    np.testing.assert_allclose(model.births, fresh.births, rtol=1e-12)
+
+
+def test_pool_reuses_models(inputs):
+    pool = ModelPool()
+    with pool.model(inputs) as model:
+        model.project(model.year_final)
+        first = model
+    with pool.model(changed_inputs(inputs)) as model:
+        assert model is first
+    assert len(pool) == 1
+
+
+def test_results_after_full_reinit(inputs):
+    model = Model()
+    model._init_from_inputs(inputs)
+    model.project(model.year_final)
+    results = Results(model)
+    results.marginal('pop_adult_hiv', ('Year',))
+
+    ## A full re-initialization allocates new outputs; cached sums must not be reused
+    model._init_from_inputs(changed_inputs(inputs))
+    model.project(model.year_final)
+    np.testing.assert_allclose(results.marginal('pop_adult_hiv', ('Year',)), model.pop_adult_hiv.sum((1,2,3,4,5)))
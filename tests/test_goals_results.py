@@ -0,0 +1,68 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import goals.goals_const as CONST
+from goals.goals_results import Results
+
+## Unit tests for cached output aggregation. These use random outputs in place
+## of a projection and mimic Model's bookkeeping of reprojected years.
+
+NUM_YEARS = 6
+
+@pytest.fixture
+def model():
+    rng = np.random.default_rng(7)
+    shp_adult_neg = (NUM_YEARS, CONST.N_SEX_MC, CONST.N_AGE_ADULT, CONST.N_POP)
+    shp_child_neg = (NUM_YEARS, CONST.N_SEX_MC, CONST.N_AGE_CHILD)
+    return SimpleNamespace(year_first=2000, year_final=2000 + NUM_YEARS - 1, _dtype=np.float64, _order="C",
+                           _year_version=np.ones(NUM_YEARS, dtype=np.int64),
+                           pop_adult_neg=rng.uniform(size=shp_adult_neg),
+                           pop_adult_hiv=rng.uniform(size=shp_adult_neg + (CONST.N_HIV_ADULT, CONST.N_DTX)),
+                           pop_child_neg=rng.uniform(size=shp_child_neg),
+                           pop_child_hiv=rng.uniform(size=shp_child_neg + (CONST.N_HIV_CHILD, CONST.N_DTX)),
+                           births_exposed=rng.uniform(size=(NUM_YEARS,)))
+
+def test_marginal(model):
+    results = Results(model)
+    np.testing.assert_allclose(results.marginal('pop_adult_hiv', ('Year', 'Sex')), model.pop_adult_hiv.sum((2,3,4,5)))
+    np.testing.assert_allclose(results.marginal('pop_adult_hiv', ('Risk', 'ART'), years=(2001, 2003)), model.pop_adult_hiv[1:4].sum((0,1,2,4)))
+    np.testing.assert_allclose(results.marginal('pop_adult_hiv', ('Year', 'CD4'), years=2004), model.pop_adult_hiv[4].sum((0,1,2,4)))
+    assert results.marginal('births_exposed', (), years=2002) == pytest.approx(model.births_exposed[2])
+    with pytest.raises(ValueError):
+        results.marginal('pop_adult_neg', ('CD4',))
+
+def test_age_range(model):
+    results = Results(model)
+    vals = results.age_range('pop_adult_neg', 15, 49, ('Year', 'Sex'))
+    np.testing.assert_allclose(vals, model.pop_adult_neg[:,:,0:35,:].sum((2,3)))
+    vals = results.age_range('pop_adult_hiv', 25, 25, ('Risk',), years=2005)
+    np.testing.assert_allclose(vals, model.pop_adult_hiv[5,:,10,:,:,:].sum((0,2,3)))
+    with pytest.raises(ValueError):
+        results.age_range('pop_adult_neg', 10, 49)
+
+def test_reprojected_years(model):
+    results = Results(model)
+    before = results.marginal('pop_adult_hiv', ('Year',)).copy()
+    model.pop_adult_hiv[3:] *= 2.0
+    np.testing.assert_array_equal(results.marginal('pop_adult_hiv', ('Year',)), before) # cached
+    model._year_version[3:] += 1
+    after = results.marginal('pop_adult_hiv', ('Year',))
+    np.testing.assert_array_equal(after[:3], before[:3])
+    np.testing.assert_allclose(after[3:], 2.0 * before[3:])
+
+def test_reinitialized_model(model):
+    results = Results(model)
+    results.marginal('pop_adult_hiv', ('Year',))
+    ## Mimic re-initialization with fewer years followed by one projection
+    model.pop_adult_hiv = 2.0 * model.pop_adult_hiv[:-1]
+    model._year_version = np.full(NUM_YEARS - 1, model._year_version.max() + 2)
+    np.testing.assert_allclose(results.marginal('pop_adult_hiv', ('Year',)), model.pop_adult_hiv.sum((1,2,3,4,5)))
+
+def test_bigpop(model):
+    bigpop = Results(model).bigpop()
+    np.testing.assert_allclose(bigpop[:, CONST.SEX_FEMALE, CONST.AGE_ADULT_MIN:],
+                               model.pop_adult_neg[:,CONST.SEX_FEMALE].sum((2)) + model.pop_adult_hiv[:,CONST.SEX_FEMALE].sum((2,3,4)))
+    np.testing.assert_allclose(bigpop[:, CONST.SEX_MALE, CONST.AGE_CHILD_MIN:(CONST.AGE_CHILD_MAX+1)],
+                               model.pop_child_neg[:,CONST.SEX_MALE_U:].sum((1)) + model.pop_child_hiv[:,CONST.SEX_MALE_U:].sum((1,3,4)))
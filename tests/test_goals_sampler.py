@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from goals.goals_sampler import EnsembleSampler
+
+## Unit tests for the ensemble MCMC sampler, using a correlated normal target
+
+MEAN = np.array([1.0, -2.0])
+COV = np.array([[1.0, 0.5], [0.5, 2.0]])
+PRECISION = np.linalg.inv(COV)
+
+def evaluate(positions):
+    rval = []
+    for x in positions:
+        d = x - MEAN
+        rval.append((-0.5 * d @ PRECISION @ d, {'total' : np.array([x.sum()], dtype=np.float32)}))
+    return rval
+
+def initial(num_walkers, seed=1):
+    return MEAN + 0.1 * np.random.default_rng(seed).normal(size=(num_walkers, 2))
+
+def test_target_moments():
+    sampler = EnsembleSampler(evaluate, 16, 2, seed=0).run(2000, initial(16))
+    draws, blobs = sampler.flat_samples(burn=500)
+    np.testing.assert_allclose(draws.mean(axis=0), MEAN, atol=0.15)
+    np.testing.assert_allclose(np.cov(draws.T), COV, atol=0.3)
+    np.testing.assert_allclose(blobs['total'][:,0], draws.sum(axis=1), rtol=1e-5)
+    assert np.all((sampler.acceptance_fraction > 0.2) & (sampler.acceptance_fraction < 0.9))
+
+def test_checkpoint_resume(tmp_path):
+    file_name = str(tmp_path / 'chain.npz')
+    full = EnsembleSampler(evaluate, 8, 2, seed=3).run(40, initial(8))
+    EnsembleSampler(evaluate, 8, 2, checkpoint=file_name, seed=3).run(25, initial(8))
+    resumed = EnsembleSampler(evaluate, 8, 2, checkpoint=file_name).run(15)
+    np.testing.assert_array_equal(resumed.chain, full.chain)
+    np.testing.assert_array_equal(resumed.blobs['total'], full.blobs['total'])
+
+def test_rejects_invalid_start():
+    sampler = EnsembleSampler(lambda xs : [-np.inf] * len(xs), 4, 2)
+    with pytest.raises(ValueError):
+        sampler.run(5, initial(4))
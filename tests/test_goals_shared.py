@@ -0,0 +1,44 @@
+import multiprocessing
+from pathlib import Path
+
+import numpy as np
+
+import goals.goals_const as CONST
+from goals.goals_shared import SharedModel, SharedOutputs
+
+## Unit tests for models with outputs in shared memory
+
+def _total_plhiv(description):
+    with SharedOutputs(description) as outputs:
+        return outputs.pop_adult_hiv.sum()
+
+
+def test_shared_outputs():
+    model = SharedModel()
+    model.init_from_xlsx(Path("inputs") / "example-inputs.xlsx")
+    model.project(model.year_final)
+    description = model.describe_outputs()
+
+    with SharedOutputs(description) as outputs:
+        np.testing.assert_array_equal(outputs.pop_adult_hiv, model.pop_adult_hiv)
+        np.testing.assert_array_equal(outputs.births, model.births)
+
+    ## Another process sees the same memory
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        total = pool.apply(_total_plhiv, (description,))
+    assert total == model.pop_adult_hiv.sum()
+    model.close()
+
+def test_exported_outputs():
+    model = SharedModel()
+    model.init_from_xlsx(Path("inputs") / "example-inputs.xlsx")
+    model.project(model.year_final)
+    description = model.export_outputs()
+    expected = model.pop_adult_hiv.copy()
+
+    ## Exported outputs are copies, so reprojecting the model does not change them
+    model.epi_pars[CONST.EPI_TRANSMIT_F2M] *= 0.5
+    model.project(model.year_final)
+    with SharedOutputs(description, unlink=True) as outputs:
+        np.testing.assert_array_equal(outputs.pop_adult_hiv, expected)
+    model.close()
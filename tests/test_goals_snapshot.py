@@ -0,0 +1,67 @@
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+import goals.goals_snapshot as Snapshot
+import goals.goals_utils as Utils
+
+## Unit tests for compiled input snapshots
+
+def test_snapshot_round_trip(tmp_path):
+    xlsx_name = Path("inputs") / "example-inputs.xlsx"
+    snap_name = tmp_path / "example-inputs.npz"
+    ref = Utils.xlsx_load_inputs(xlsx_name)
+    Snapshot.compile_snapshot(xlsx_name, snap_name)
+    out, source = Snapshot.read_snapshot(snap_name)
+
+    assert source['source_sha256'] == Snapshot.file_digest(xlsx_name)
+    assert sorted(out.keys()) == sorted(ref.keys())
+    for key, val in ref.items():
+        if isinstance(val, np.ndarray):
+            assert out[key].dtype == val.dtype
+            np.testing.assert_array_equal(out[key], val)
+        elif isinstance(val, dict):
+            assert out[key] == {k : v for k, v in val.items() if k is not None}
+        else:
+            assert out[key] == val
+
+
+def test_snapshot_stale(tmp_path):
+    xlsx_name = tmp_path / "inputs.xlsx"
+    snap_name = tmp_path / "inputs.npz"
+    shutil.copyfile(Path("inputs") / "example-inputs.xlsx", xlsx_name)
+    Snapshot.compile_snapshot(xlsx_name, snap_name)
+    _, source = Snapshot.read_snapshot(snap_name)
+    assert not Snapshot.is_stale(source)
+
+    ## Touching the workbook without changing its contents does not invalidate the snapshot
+    stat = os.stat(xlsx_name)
+    os.utime(xlsx_name, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert not Snapshot.is_stale(source)
+
+    with open(xlsx_name, "ab") as fh:
+        fh.write(b"\0")
+    assert Snapshot.is_stale(source)
+
+
+def test_snapshot_refreshes_mtime(tmp_path):
+    xlsx_name = tmp_path / "inputs.xlsx"
+    snap_name = tmp_path / "inputs.npz"
+    shutil.copyfile(Path("inputs") / "example-inputs.xlsx", xlsx_name)
+    Snapshot.compile_snapshot(xlsx_name, snap_name)
+
+    ## Loading after a touch records the new modification time instead of recompiling
+    stat = os.stat(xlsx_name)
+    os.utime(xlsx_name, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    Snapshot.load_snapshot(snap_name, xlsx_name)
+    _, source = Snapshot.read_snapshot(snap_name)
+    assert source['source_mtime'] == stat.st_mtime_ns + 10**9
+    assert source['source_sha256'] == Snapshot.file_digest(xlsx_name)
+
+
+def test_snapshot_missing():
+    with pytest.raises(FileNotFoundError):
+        Snapshot.load_snapshot("does-not-exist.npz")
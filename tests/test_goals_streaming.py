@@ -0,0 +1,39 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from goals.goals_model import Model
+
+## Unit tests for year-by-year projection
+
+@pytest.fixture(scope="module")
+def model():
+    goals = Model()
+    goals.init_from_xlsx(Path(__file__).parent.parent / "inputs" / "example-inputs.xlsx")
+    return goals
+
+
+def test_stepping_matches_projection(model):
+    model.invalidate(-1)
+    model.project(model.year_final)
+    pop_adult_hiv = model.pop_adult_hiv.copy()
+
+    model.invalidate(-1)
+    plhiv = {}
+    for year, outputs in model.project_years(model.year_final):
+        plhiv[year] = outputs['pop_adult_hiv'].sum()
+    np.testing.assert_allclose(model.pop_adult_hiv, pop_adult_hiv, rtol=1e-12)
+    assert sorted(plhiv.keys()) == list(range(model.year_first, model.year_final + 1))
+    assert plhiv[model.year_final] == pytest.approx(pop_adult_hiv[-1].sum())
+
+
+def test_callback_stops_early(model):
+    model.invalidate(-1)
+    year_stop = model.year_first + 10
+    model.project(model.year_final, callback=lambda year, outputs: year < year_stop)
+    assert model.last_valid_year() == year_stop
+
+    ## Projection resumes from where the callback stopped it
+    model.project(model.year_final)
+    assert model.last_valid_year() == model.year_final
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+import scipy as sp
+
+import goals.goals_const as CONST
+import goals.goals_model as Goals
+import goals.goals_utils as Utils
+
+## Equivalence tests for input transformations against direct loop calculations
+
+@pytest.fixture(scope="module")
+def raw_inputs():
+    return Utils.xlsx_load_inputs("inputs/mwi-2023-inputs.xlsx")
+
+@pytest.fixture
+def model(raw_inputs):
+    model = Goals.Model()
+    model.year_first = raw_inputs['config'][CONST.CFG_FIRST_YEAR]
+    model.year_final = raw_inputs['config'][CONST.CFG_FINAL_YEAR]
+    return model
+
+def reference_partner_rates(model, time_trend, age_params, pop_ratios):
+    raw_ages = np.array(range(CONST.AGE_ADULT_MIN, CONST.AGE_ADULT_MAX + 1))
+    std_ages = (raw_ages - CONST.AGE_ADULT_MIN) / (CONST.AGE_ADULT_MAX - CONST.AGE_ADULT_MIN)
+    age_ratios = np.zeros((CONST.N_SEX, CONST.N_AGE_ADULT))
+    for s in range(CONST.N_SEX):
+        std_mean = (age_params[0,s] - CONST.AGE_ADULT_MIN) / (CONST.AGE_ADULT_MAX - CONST.AGE_ADULT_MIN)
+        dist = sp.stats.beta(age_params[1,s] * std_mean, age_params[1,s] * (1.0 - std_mean))
+        age_ratios[s,0:(CONST.N_AGE_ADULT - 1)] = np.diff(dist.cdf(std_ages))
+
+    pop_ratios_aug = np.zeros((CONST.N_POP, CONST.N_SEX))
+    pop_ratios_aug[CONST.POP_NEVER:(CONST.POP_FSW+1), CONST.SEX_FEMALE] = pop_ratios[0:5, CONST.SEX_FEMALE]
+    pop_ratios_aug[CONST.POP_NEVER:(CONST.POP_MSM+1), CONST.SEX_MALE  ] = pop_ratios[0:6, CONST.SEX_MALE  ]
+    pop_ratios_aug[CONST.POP_TGW, CONST.SEX_MALE] = pop_ratios[6, CONST.SEX_FEMALE]
+
+    yr_bgn = model.year_first - CONST.XLSX_FIRST_YEAR
+    num_yrs = model.year_final - model.year_first + 1
+    partner_rate = np.zeros((num_yrs, CONST.N_SEX, CONST.N_AGE_ADULT, CONST.N_POP))
+    for s in range(CONST.N_SEX):
+        for a in range(CONST.N_AGE_ADULT):
+            for r in range(CONST.N_POP):
+                partner_rate[:,s,a,r] = time_trend[s,yr_bgn:(yr_bgn+num_yrs)] * age_ratios[s,a] * pop_ratios_aug[r,s]
+    return partner_rate
+
+def reference_sti_prev(model, sti_trend, sti_age):
+    yr_bgn = model.year_first - CONST.XLSX_FIRST_YEAR
+    num_yrs = model.year_final - model.year_first + 1
+    sti = np.zeros((num_yrs, CONST.N_SEX, CONST.N_AGE_ADULT, CONST.N_POP))
+    scale_age = (np.array(range(CONST.AGE_ADULT_MIN, CONST.AGE_ADULT_MAX)) + 0.5 - 15.0) / (80.0 - 15.0)
+    scale_ref = (27.5 - 15.0) / (80 - 15.0)
+    for sex in range(CONST.N_SEX):
+        for pop in range(CONST.POP_NEVER, CONST.N_POP):
+            par_mean = (sti_age[sex, pop, 0] - 15.0) / (80.0 - 15.0)
+            par_size = sti_age[sex, pop, 1]
+            dist = sp.stats.beta(1.0 + par_mean * par_size, 1.0 + (1.0 - par_mean) * par_size)
+            a_mtx = np.tile(dist.pdf(scale_age) / dist.pdf(scale_ref), (num_yrs, 1))
+            t_mtx = np.tile(sti_trend[yr_bgn:(yr_bgn+num_yrs),sex,pop], (CONST.N_AGE_ADULT - 1, 1)).transpose()
+            sti[:, sex, 0:(CONST.N_AGE_ADULT-1), pop] = t_mtx * a_mtx / (1.0 - t_mtx + t_mtx * a_mtx)
+    return sti
+
+@pytest.mark.parametrize("scale", [1.0, 0.5, 1.7])
+def test_partner_rates_match_reference(model, raw_inputs, scale):
+    time_trend = raw_inputs['partner_time_trend'] * scale
+    age_params = raw_inputs['partner_age_params'].copy()
+    age_params[1,:] *= scale
+    pop_ratios = raw_inputs['partner_pop_ratios'] * scale
+    expected = reference_partner_rates(model, time_trend, age_params, pop_ratios)
+    np.testing.assert_allclose(model.calc_partner_rates(time_trend, age_params, pop_ratios), expected, rtol=1e-12, atol=1e-15)
+
+    out = np.full(expected.shape, np.nan)
+    assert model.calc_partner_rates(time_trend, age_params, pop_ratios, out=out) is out
+    np.testing.assert_allclose(out, expected, rtol=1e-12, atol=1e-15)
+
+@pytest.mark.parametrize("scale", [1.0, 0.5, 1.5])
+def test_sti_prev_matches_reference(model, raw_inputs, scale):
+    sti_trend = np.minimum(raw_inputs['sti_trend'] * scale, 1.0)
+    sti_age = raw_inputs['sti_age'].copy()
+    sti_age[:,:,1] *= scale
+    expected = reference_sti_prev(model, sti_trend, sti_age)
+    np.testing.assert_allclose(model.calc_sti_prev(sti_trend, sti_age), expected, rtol=1e-12, atol=1e-15)
+
+    out = np.full(expected.shape, np.nan)
+    assert model.calc_sti_prev(sti_trend, sti_age, out=out) is out
+    np.testing.assert_allclose(out, expected, rtol=1e-12, atol=1e-15)
@@ -0,0 +1,42 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+import goals_proj as Goals
+from goals.goals_model import Model
+
+## Unit tests for sharing parsed UPD files between projections
+
+XLSX_NAME = Path(__file__).parent.parent / "inputs" / "example-inputs.xlsx"
+
+@pytest.fixture(autouse=True)
+def restore_copies():
+    enabled = Goals.projection_copies_enabled()
+    yield
+    Goals.enable_projection_copies(enabled)
+
+
+def test_upd_cache_disabled():
+    Goals.enable_projection_copies(False)
+    Goals.upd_cache_clear()
+    Model().init_from_xlsx(XLSX_NAME)
+    assert Goals.upd_cache_size() == 0
+
+
+def test_cached_upd_matches_parsed():
+    ## The cache copies parsed projections, so it needs projection copies
+    Goals.enable_projection_copies(True)
+    Goals.upd_cache_clear()
+    first = Model()
+    first.init_from_xlsx(XLSX_NAME)
+    assert Goals.upd_cache_size() == 1
+
+    second = Model()
+    second.init_from_xlsx(XLSX_NAME)
+    assert Goals.upd_cache_size() == 1
+
+    first.project(first.year_final)
+    second.project(second.year_final)
+    np.testing.assert_array_equal(first.pop_adult_neg, second.pop_adult_neg)
+    np.testing.assert_array_equal(first.births, second.births)